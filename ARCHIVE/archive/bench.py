@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : mesures de performance de la calculatrice
+
+Usage: python bench.py [--quick] [--save results.json] [--compare baseline.json]
+       python bench.py --engines   (comparaisons des moteurs, lexers, tokens et fichiers)
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+import definitions as defs
+import lexer
+import parser
+import factorials
+import calc
+import pratt
+import rattrapage
+import push
+
+
+#################################
+## Générateurs d'entrées
+
+# n calculs séparés par ';', chacun réutilisant le résultat du précédent
+def gen_statements(n):
+    return "1;" + "".join("#{0}+{1};".format(i-1, i) for i in range(2, n+1))
+
+# n calculs mêlant tous les opérateurs et les parenthèses
+def gen_expressions(n):
+    return "1;" + "".join("{0} + 2 * 3 - 4 / (5 - -6) ^ 2 + 3! * (#{1} - 1);".format(i, i-1)
+                          for i in range(2, n+1))
+
+# Les calculs suivants ont une forme fixe (les parsers LL(1) sont récursifs:
+# une expression trop profonde ou trop longue dépasserait la pile) ; seul leur nombre varie.
+DIGITS = 60  # chiffres des longs nombres
+DEPTH = 30   # profondeur des parenthèses
+CHAIN = 40   # opérandes des longues sommes et des longs produits
+REFS = 8     # références #n par calcul
+FACT = 2000  # plus petite factorielle calculée
+
+# n calculs sur de longs nombres (partie entière, décimale et exposant)
+def gen_long_numbers(n):
+    digits = "1234567890" * (DIGITS // 10)
+    return "".join("{0}.{1}e-{2} + {1}{0};".format(digits, i, i % 300) for i in range(n))
+
+# n calculs de DEPTH parenthèses imbriquées
+def gen_deep_parentheses(n):
+    return "".join("(" * DEPTH + str(i) + " + 1)" * DEPTH + ";" for i in range(n))
+
+# n sommes de CHAIN termes
+def gen_sums(n):
+    return "".join(" + ".join(str(i + k) for k in range(CHAIN)) + ";" for i in range(n))
+
+# n produits de CHAIN facteurs (de valeur 1, pour ne pas déborder)
+def gen_products(n):
+    return "".join("{0} * ".format(i) + " * ".join("2 * 0.5" for _ in range(CHAIN // 2)) + ";"
+                   for i in range(1, n+1))
+
+# n calculs réutilisant chacun REFS résultats précédents, proches ou lointains
+def gen_references(n):
+    lines = ["1;"]
+    for i in range(2, n+1):
+        refs = sorted({1 + (i - 1) * k // REFS for k in range(REFS)} | {i - 1})
+        lines.append("(" + " + ".join("#{0}".format(j) for j in refs) + ") / {0};".format(len(refs)))
+    return "".join(lines)
+
+# n grandes factorielles, de FACT! à (FACT+n-1)!
+def gen_factorials(n):
+    return "".join("({0} + 1)!;".format(FACT + i - 1) for i in range(n))
+
+# Les charges de travail du banc de mesures: nom -> générateur de n calculs
+WORKLOADS = {
+    'statements': gen_statements,
+    'expressions': gen_expressions,
+    'long_numbers': gen_long_numbers,
+    'parentheses': gen_deep_parentheses,
+    'sums': gen_sums,
+    'products': gen_products,
+    'references': gen_references,
+    'factorials': gen_factorials,
+}
+
+
+#################################
+## Mesures
+
+# Meilleur temps sur plusieurs exécutions de parse sur text (setup est appelée avant chacune)
+def time_parse(parse, text, repeat=3, setup=None):
+    best = float('inf')
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        stream = io.StringIO(text + defs.EOI)
+        start = time.perf_counter()
+        parse(stream)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# Temps de la seule analyse lexicale de text (lexer par défaut, ou de type kind)
+def lex_all(stream, kind=None):
+    lx = lexer.make_lexer(stream, kind)
+    while lx.next_token()[0] != defs.V_T.END:
+        pass
+
+# Les analyses mesurées: nom -> fonction lisant le flot jusqu'à EOI
+TARGETS = {
+    'lexer': lambda stream: lex_all(stream),
+    'parser': parser.parse,
+    'calc': calc.parse,
+    'pratt': pratt.parse,
+    'rattrapage': rattrapage.parse,
+    'push': push.parse,
+}
+
+
+#################################
+## Banc de mesures: chaque charge de travail, pour chaque analyse et chaque taille
+
+SIZES = (500, 2000, 8000)
+QUICK_SIZES = (100, 400)
+
+# Pic de mémoire allouée (en octets) pendant parse sur text
+def peak_memory(parse, text):
+    stream = io.StringIO(text + defs.EOI)
+    tracemalloc.start()
+    try:
+        parse(stream)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+# Mesures de la fonction target sur text: temps, débits et pic de mémoire.
+# Chaque exécution part d'un cache des factorielles vide, pour ne pas mesurer que le cache.
+# Une analyse qui échoue sur cette charge (calcul non supporté, ...) est notée comme telle.
+def measure(target, text, tokens, statements, repeat=3):
+    parse = TARGETS[target]
+    try:
+        seconds = time_parse(parse, text, repeat, factorials.CACHE.clear)
+        factorials.CACHE.clear()
+        peak = peak_memory(parse, text)
+    except Exception as e:
+        return {'error': "{0}: {1}".format(type(e).__name__, e)}
+    return {'seconds': seconds,
+            'tokens_per_s': tokens / seconds,
+            'statements_per_s': statements / seconds,
+            'peak_bytes': peak}
+
+# Liste des mesures (dictionnaires) des analyses targets sur les charges workloads
+def run_suite(workloads=None, targets=None, sizes=SIZES, repeat=3, out=sys.stdout):
+    results = []
+    for workload in workloads or WORKLOADS:
+        for n in sizes:
+            text = WORKLOADS[workload](n)
+            tokens = len(lexer.tokenize_all(io.StringIO(text + defs.EOI)))
+            statements = text.count(';')
+            for target in targets or TARGETS:
+                result = {'workload': workload, 'target': target, 'size': n,
+                          'tokens': tokens, 'statements': statements}
+                result.update(measure(target, text, tokens, statements, repeat))
+                results.append(result)
+                if out is not None:
+                    print(format_result(result), file=out)
+    return results
+
+def format_result(result):
+    head = "@ {workload:<13} {target:<11} n = {size:>6}".format(**result)
+    if 'error' in result:
+        return head + "  échec: " + result['error']
+    return head + "  {0:8.4f} s  {1:>10.0f} tokens/s  {2:>9.0f} calculs/s  {3:>8.1f} Kio".format(
+        result['seconds'], result['tokens_per_s'], result['statements_per_s'], result['peak_bytes'] / 1024)
+
+# Courbes de passage à l'échelle: pour chaque (charge, analyse), l'exposant k tel que
+# le temps soit proportionnel à n**k entre la plus petite et la plus grande taille
+# (k voisin de 1: temps linéaire en le nombre de calculs)
+def scaling(results):
+    curves = {}
+    for result in results:
+        if 'error' not in result:
+            curves.setdefault((result['workload'], result['target']), []).append(
+                (result['size'], result['seconds']))
+    exponents = {}
+    for key, points in curves.items():
+        points.sort()
+        (n1, t1), (n2, t2) = points[0], points[-1]
+        if n2 > n1 and t1 > 0:
+            exponents[key] = math.log(t2 / t1) / math.log(n2 / n1)
+    return exponents
+
+def print_scaling(results, out=sys.stdout):
+    print("@ passage à l'échelle (temps ~ n**k)", file=out)
+    for (workload, target), k in sorted(scaling(results).items()):
+        print("@ {0:<13} {1:<11} k = {2:5.2f}{3}".format(
+            workload, target, k, "  (!)" if k > 1.3 else ""), file=out)
+
+
+#################################
+## Sauvegarde et comparaison avec une référence
+
+def save(results, path):
+    data = {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'results': results}
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+# Compare les mesures à celles de la référence baseline (mêmes charge, analyse et taille):
+# renvoie la liste des (clé, rapport des temps) des ralentissements de plus de tolerance
+def compare(results, baseline, tolerance=0.10, out=sys.stdout):
+    old = {(r['workload'], r['target'], r['size']): r for r in baseline}
+    slower = []
+    if out is not None:
+        print("@ comparaison avec la référence (rapport des temps, < 1: plus rapide)", file=out)
+    for result in results:
+        key = (result['workload'], result['target'], result['size'])
+        before = old.get(key)
+        if before is None or 'error' in result or 'error' in before:
+            continue
+        ratio = result['seconds'] / before['seconds']
+        if ratio > 1 + tolerance:
+            slower.append((key, ratio))
+        if out is not None:
+            print("@ {0:<13} {1:<11} n = {2:>6}  x{3:5.2f}  mémoire x{4:5.2f}{5}".format(
+                *key, ratio, result['peak_bytes'] / max(before['peak_bytes'], 1),
+                "  (plus lent)" if ratio > 1 + tolerance else ""), file=out)
+    return slower
+
+
+#################################
+## Comparaisons des moteurs
+
+# Le temps par calcul doit rester constant quand le nombre de calculs augmente
+def bench_history(sizes=(10**3, 10**4, 10**5)):
+    print("@ calc.parse sur n calculs")
+    for n in sizes:
+        t = time_parse(calc.parse, gen_statements(n))
+        print("@ n = {0:>7}  {1:8.3f} s  {2:8.2f} µs/calcul".format(n, t, t / n * 1e6))
+    print()
+
+# Analyse LL(1) (calc.py) contre analyse par précédence d'opérateurs (pratt.py)
+def bench_engines(n=20000):
+    print("@ moteurs d'expressions sur", n, "calculs")
+    text = gen_expressions(n)
+    t_lex = time_parse(lex_all, text)
+    t_ll1 = time_parse(calc.parse, text)
+    t_pratt = time_parse(pratt.parse, text)
+    print("@ lexer  {0:8.3f} s".format(t_lex))
+    print("@ LL(1)  {0:8.3f} s  dont analyse {1:8.3f} s".format(t_ll1, t_ll1 - t_lex))
+    print("@ Pratt  {0:8.3f} s  dont analyse {1:8.3f} s  (x{2:.1f})".format(
+        t_pratt, t_pratt - t_lex, (t_ll1 - t_lex) / (t_pratt - t_lex)))
+    print()
+
+# Lexer par automates contre lexer par expression régulière
+def bench_lexers(n=20000):
+    print("@ lexers sur", n, "calculs")
+    text = gen_expressions(n)
+    for kind in lexer.LEXERS:
+        t = time_parse(lambda stream: lex_all(stream, kind), text)
+        print("@ {0:<10} {1:8.3f} s".format(kind, t))
+    print()
+
+# Lexers alimentés caractère par caractère (lexer.PushLexer): le temps par caractère doit
+# rester constant quand les séparateurs et les nombres s'allongent
+def bench_push(sizes=(10**3, 10**4, 10**5)):
+    print("@ lexers alimentés caractère par caractère")
+    for kind in lexer.PUSH_LEXERS:
+        for n in sizes:
+            text = " " * n + "1" * n + ";" + defs.EOI
+            push_lexer = lexer.make_push_lexer(kind)
+            start = time.perf_counter()
+            for c in text:
+                push_lexer.feed(c)
+            push_lexer.close()
+            t = time.perf_counter() - start
+            print("@ {0:<10} n = {1:>7}  {2:8.3f} s  {3:8.2f} µs/caractère".format(kind, n, t, t / len(text) * 1e6))
+    print()
+
+# Analyse d'une entrée déjà découpée en tokens (lexer.tokenize_all), à comparer à bench_engines
+def bench_tokens(n=20000):
+    print("@ tokens lus d'avance sur", n, "calculs")
+    text = gen_expressions(n)
+    for kind in lexer.LEXERS:
+        t = time_parse(lambda stream: lexer.tokenize_all(stream, kind), text)
+        print("@ tokenize_all {0:<10} {1:8.3f} s".format(kind, t))
+    tokens = lexer.tokenize_all(io.StringIO(text + defs.EOI))
+    for name, parse in [("LL(1)", calc.parse), ("Pratt", pratt.parse)]:
+        t = time_parse(lambda stream: parse(tokens), "")
+        print("@ {0:<6} {1:8.3f} s".format(name, t))
+    print()
+
+# Lecture d'un fichier comme flot de texte, ou projeté en mémoire (calc.parse_file)
+def bench_file(n=20000):
+    print("@ fichier de", n, "calculs")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calculs.txt")
+        with open(path, "w") as f:
+            f.write(gen_expressions(n) + defs.EOI)
+        def parse_text():
+            with open(path) as f:
+                return calc.parse(f)
+        for name, parse in [("texte", parse_text), ("mmap", lambda: calc.parse_file(path))]:
+            best = float('inf')
+            for _ in range(3):
+                start = time.perf_counter()
+                parse()
+                best = min(best, time.perf_counter() - start)
+            print("@ {0:<6} {1:8.3f} s".format(name, best))
+    print()
+
+
+def main(argv=None):
+    options = argparse.ArgumentParser(description="Mesures de performance de la calculatrice")
+    options.add_argument('--workloads', nargs='+', choices=list(WORKLOADS), help="charges de travail")
+    options.add_argument('--targets', nargs='+', choices=list(TARGETS), help="analyses mesurées")
+    options.add_argument('--sizes', nargs='+', type=int, help="nombres de calculs")
+    options.add_argument('--quick', action='store_true', help="petites tailles: " + repr(QUICK_SIZES))
+    options.add_argument('--repeat', type=int, default=3, help="exécutions par mesure (le meilleur temps est gardé)")
+    options.add_argument('--save', metavar='PATH', help="enregistre les mesures (JSON)")
+    options.add_argument('--compare', metavar='PATH', help="compare à des mesures enregistrées")
+    options.add_argument('--tolerance', type=float, default=0.10, help="ralentissement toléré par --compare")
+    options.add_argument('--engines', action='store_true', help="comparaisons des moteurs uniquement")
+    args = options.parse_args(argv)
+
+    if args.engines:
+        bench_history()
+        bench_engines()
+        bench_lexers()
+        bench_push()
+        bench_tokens()
+        bench_file()
+        return 0
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    results = run_suite(args.workloads, args.targets, sizes, args.repeat)
+    print()
+    print_scaling(results)
+    if args.save:
+        save(results, args.save)
+    if args.compare:
+        print()
+        if compare(results, load(args.compare), args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,18 +4,15 @@
 Projet TL : parser - requires Python version >= 3.10
 """
 
+import os
 import sys
-from math import factorial
+import mmap
 assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
 
 import lexer
+import numeric
 from definitions import V_T, str_attr_token
-
-#####
-# Variables internes (à ne pas utiliser directement)
-
-_current_token = V_T.END
-_value = None  # attribut du token renvoyé par le lexer
+from factorials import factorial
 
 #####
 # Fonctions génériques
@@ -23,232 +20,282 @@ _value = None  # attribut du token renvoyé par le lexer
 class ParserError(Exception):
     pass
 
-def unexpected_token(expected):
-    return ParserError("Found token '" + str_attr_token(_current_token, _value) + "' but expected " + expected)
-
-def get_current():
-    return _current_token
-
-def init_parser(stream):
-    global _current_token, _value
-    lexer.reinit(stream)
-    _current_token, _value = lexer.next_token()
-    # print("@ init parser on",  repr(str_attr_token(_current, _value)))  # for DEBUGGING
-
-def consume_token(tok):
-    # Vérifie que le prochain token est tok ;
-    # si oui, le consomme et renvoie son attribut ; si non, lève une exception
-    global _current_token, _value
-    if _current_token != tok:
-        raise unexpected_token(tok.name)
-    if _current_token != V_T.END:
-        old = _value
-        _current_token, _value = lexer.next_token()
-        return old
-
-#########################
-## Parsing de input et exp
-"""
-================================================================================
-GRAMMAIRE ATTRIBUÉE (Notation Partiels - Variables n1, n2)
-================================================================================
-LÉGENDE :
-  ↓ : Attribut Hérité (descendant / argument)
-  ↑ : Attribut Synthétisé (remontant / return)
-  l : La liste mémoire
-  ε : Epsilon
-
-Input ↓l ↑l'  -> Exp5 ↓l ↑n   SEQ   Input ↓(l + [n]) ↑l'
-               | ε            (l' = l)
-
-Exp5 ↓l ↑n    -> Exp4 ↓l ↑n1   Z ↓l ↓n1 ↑n
-
-Z ↓l ↓n1 ↑n   -> Exp5Bis ↓l ↓n1 ↑n2   Z ↓l ↓n2 ↑n
-               | ε             (n = n1)
-
-Exp5Bis ↓l ↓n1 ↑n
-              -> ADD   Exp4 ↓l ↑n2    (n = n1 + n2)
-               | SUB   Exp4 ↓l ↑n2    (n = n1 - n2)
-
-Exp4 ↓l ↑n    -> Exp3 ↓l ↑n1   Y ↓l ↓n1 ↑n
-
-Y ↓l ↓n1 ↑n   -> Exp4Bis ↓l ↓n1 ↑n2   Y ↓l ↓n2 ↑n
-               | ε             (n = n1)
-
-Exp4Bis ↓l ↓n1 ↑n
-              -> MUL   Exp3 ↓l ↑n2    (n = n1 * n2)
-               | DIV   Exp3 ↓l ↑n2    (n = n1 / n2)
-
-Exp3 ↓l ↑n    -> SUB   Exp3 ↓l ↑n1    (n = -n1)
-               | Exp2 ↓l ↑n
-
-Exp2 ↓l ↑n    -> Exp1 ↓l ↑n1   Exp2Bis ↓n1 ↑n
-
-Exp2Bis ↓n1 ↑n-> FACT          (n = n1!)
-               | ε             (n = n1)
-
-Exp1 ↓l ↑n    -> Exp0 ↓l ↑n1   Exp1Bis ↓l ↓n1 ↑n
-
-Exp1Bis ↓l ↓n1 ↑n
-              -> POW   Exp1 ↓l ↑n2    (n = n1 ** n2)
-               | ε             (n = n1)
-
-Exp0 ↓l ↑n    -> NUM ↑n
-               | CALC ↑i       (n = l[i-1])
-               | ( Exp5 ↓l ↑n )
-"""
-def parse_input(L=[]):
-    match get_current():
-        case V_T.END:
-            return L
-        case V_T.NUM | V_T.CALC | V_T.OPAR | V_T.SUB:
-            n = parse_exp5(L)
-            consume_token(V_T.SEQ)
-            L = L + [n]
-            L = parse_input(L)
-
-            return L
-        case _:
-            raise unexpected_token("NUM, CALC, OPAR, SUB, END")
-
-def parse_exp5(L):
-    match get_current():
-        case V_T.NUM | V_T.CALC | V_T.OPAR | V_T.SUB:
-            n_1 = parse_exp4(L)
-            n = parse_Z(L,n_1)
-            return n
-        case _:
-            raise unexpected_token("NUM, CALC, OPAR, SUB")
-
-def parse_Z(L,n_1):
-    match get_current():
-        case V_T.ADD | V_T.SUB:
-            n_2 = parse_exp5_bis(L,n_1)
-            n_3 = parse_Z(L,n_2)
-            return n_3
-        case V_T.CPAR | V_T.SEQ:
-            return n_1
-        case _:
-            raise unexpected_token("NADD, SUB, CPAR, SEQ")
-
-def parse_exp5_bis(L,n_1):
-    match get_current():
-        case V_T.ADD:
-            consume_token(V_T.ADD)
-            n_2 = parse_exp4(L)
-            return n_1 + n_2
-        case V_T.SUB:
-            consume_token(V_T.SUB)
-            n_2 = parse_exp4(L)
-            return n_1 - n_2
-        case _:
-            raise unexpected_token("ADD, SUB")
-
-def parse_exp4(L):
-    match get_current():
-        case V_T.NUM | V_T.CALC | V_T.OPAR | V_T.SUB:
-            n_1 = parse_exp3(L)
-            n = parse_Y(L,n_1)
-            return n
-        case _:
-            raise unexpected_token("NUM, CALC, OPAR, SUB")
-
-def parse_Y(L,n_1):
-    match get_current():
-        case V_T.MUL | V_T.DIV:
-            n_2 = parse_exp4_bis(L,n_1)
-            n_3 = parse_Y(L,n_2)
-            return n_3
-        case V_T.CPAR | V_T.ADD | V_T.SUB | V_T.SEQ:
-            n_3 = n_1
-            return n_3
-        case _:
-            raise unexpected_token("MUL, DIV, CPAR, ADD, SUB, SEQ")
-
-def parse_exp4_bis(L,n_1):
-    match get_current():
-        case V_T.MUL:
-            consume_token(V_T.MUL)
-            n_2 = parse_exp3(L)
-            n = n_1 * n_2
-            return n
-        case V_T.DIV:
-            consume_token(V_T.DIV)
-            n_2 = parse_exp3(L)
-            return n_1 / n_2
-        case _:
-            raise unexpected_token("MUL, DIV")
-
-def parse_exp3(L):   
-    match get_current():
-        case V_T.SUB:
-            consume_token(V_T.SUB)
-            n_1 = parse_exp3(L)
-            n = -1 * n_1
-            return n
-        case V_T.NUM | V_T.CALC | V_T.OPAR:
-            n = parse_exp2(L)
-            return n 
-        case _:
-            raise unexpected_token("SUB, NUM, CALC, OPAR")
-
-def parse_exp2(L):
-    match get_current():
-        case V_T.NUM | V_T.CALC | V_T.OPAR:
-            n_1 = parse_exp1(L)
-            n = parse_exp2_bis(n_1)
-            return n
-        case _:
-            raise unexpected_token("NUM, CALC, OPAR")
-
-def parse_exp2_bis(n):
-    match get_current():
-        case V_T.FACT:
-            consume_token(V_T.FACT)
-            return factorial(int(n))
-        case V_T.CPAR | V_T.MUL | V_T.DIV | V_T.ADD | V_T.SUB | V_T.SEQ:
-            return n
-        case _:
-            raise unexpected_token("FACT, CPAR, MUL, DIV, ADD, SUB, SEQ")
-
-def parse_exp1(L):
-    match get_current():
-        case V_T.NUM | V_T.CALC | V_T.OPAR:
-            n_1 = parse_exp0(L)
-            n = parse_exp1_bis(L,n_1)
-            return n
-        case _:
-            raise unexpected_token("NUM, CALC, OPAR")
-
-def parse_exp1_bis(L,n):
-    match get_current():
-        case V_T.POW:
-            consume_token(V_T.POW)
-            n_1 = parse_exp1(L)
-            return n**n_1
-        case V_T.CPAR | V_T.FACT | V_T.MUL | V_T.DIV | V_T.ADD | V_T.SUB | V_T.SEQ:
-            return n
-        case _:
-            raise unexpected_token("POW, CPAR, FACT, MUL, DIV, ADD, SUB, SEQ")
-
-def parse_exp0(L):
-    match get_current():
-        case V_T.NUM:
-            n = consume_token(V_T.NUM)
-            return n
-        case V_T.CALC:
-            i = consume_token(V_T.CALC)
-            print(i)
-            n = L[i-1]
-            return n
-        case V_T.OPAR:
-            consume_token(V_T.OPAR)
-            n = parse_exp5(L)
-            consume_token(V_T.CPAR)
-            return n
-        case _:
-            raise unexpected_token("NUM, CALC, OPAR")
 
+#####
+# La calculatrice: chaque instance possède son lexer, son token courant et l'historique
+# de ses calculs, si bien que plusieurs calculs peuvent être menés en même temps.
+
+class Calculator:
+
+    def __init__(self, history=None, backend=None):
+        # Variables internes (à ne pas utiliser directement)
+        self.lexer = None
+        self._current_token = V_T.END
+        self._value = None  # attribut du token renvoyé par le lexer
+        # valeurs des calculs déjà effectués, référencées par #n (une liste, ou voir history.py)
+        self.history = [] if history is None else history
+        # représentation des nombres (float, Decimal, Fraction: voir numeric.py)
+        self.backend = numeric.backend(backend)
+
+    def unexpected_token(self, expected):
+        return ParserError("Found token '" + str_attr_token(self._current_token, self._value) + "' but expected " + expected)
+
+    def get_current(self):
+        return self._current_token
+
+    # stream est un flot de caractères, ou des tokens déjà lus par lexer.tokenize_all
+    def init_parser(self, stream, eoi=None, line_buffered=None):
+        if isinstance(stream, lexer.Tokens):
+            self.lexer = stream.reader()
+        else:
+            self.lexer = lexer.make_lexer(stream, eoi=eoi, line_buffered=line_buffered, backend=self.backend)
+        self._current_token, self._value = self.lexer.next_token()
+        # print("@ init parser on",  repr(str_attr_token(_current, self._value)))  # for DEBUGGING
+
+    def consume_token(self, tok):
+        # Vérifie que le prochain token est tok ;
+        # si oui, le consomme et renvoie son attribut ; si non, lève une exception
+        if self._current_token != tok:
+            raise self.unexpected_token(tok.name)
+        if self._current_token != V_T.END:
+            old = self._value
+            self._current_token, self._value = self.lexer.next_token()
+            return old
+
+    #########################
+    ## Parsing de input et exp
+    """
+    ================================================================================
+    GRAMMAIRE ATTRIBUÉE (Notation Partiels - Variables n1, n2)
+    ================================================================================
+    LÉGENDE :
+      ↓ : Attribut Hérité (descendant / argument)
+      ↑ : Attribut Synthétisé (remontant / return)
+      l : La liste mémoire
+      ε : Epsilon
+
+    Input ↓l ↑l'  -> Exp5 ↓l ↑n   SEQ   Input ↓(l + [n]) ↑l'
+                   | ε            (l' = l)
+
+    Exp5 ↓l ↑n    -> Exp4 ↓l ↑n1   Z ↓l ↓n1 ↑n
+
+    Z ↓l ↓n1 ↑n   -> Exp5Bis ↓l ↓n1 ↑n2   Z ↓l ↓n2 ↑n
+                   | ε             (n = n1)
+
+    Exp5Bis ↓l ↓n1 ↑n
+                  -> ADD   Exp4 ↓l ↑n2    (n = n1 + n2)
+                   | SUB   Exp4 ↓l ↑n2    (n = n1 - n2)
+
+    Exp4 ↓l ↑n    -> Exp3 ↓l ↑n1   Y ↓l ↓n1 ↑n
+
+    Y ↓l ↓n1 ↑n   -> Exp4Bis ↓l ↓n1 ↑n2   Y ↓l ↓n2 ↑n
+                   | ε             (n = n1)
+
+    Exp4Bis ↓l ↓n1 ↑n
+                  -> MUL   Exp3 ↓l ↑n2    (n = n1 * n2)
+                   | DIV   Exp3 ↓l ↑n2    (n = n1 / n2)
+
+    Exp3 ↓l ↑n    -> SUB   Exp3 ↓l ↑n1    (n = -n1)
+                   | Exp2 ↓l ↑n
+
+    Exp2 ↓l ↑n    -> Exp1 ↓l ↑n1   Exp2Bis ↓n1 ↑n
+
+    Exp2Bis ↓n1 ↑n-> FACT          (n = n1!)
+                   | ε             (n = n1)
+
+    Exp1 ↓l ↑n    -> Exp0 ↓l ↑n1   Exp1Bis ↓l ↓n1 ↑n
+
+    Exp1Bis ↓l ↓n1 ↑n
+                  -> POW   Exp1 ↓l ↑n2    (n = n1 ** n2)
+                   | ε             (n = n1)
+
+    Exp0 ↓l ↑n    -> NUM ↑n
+                   | CALC ↑i       (n = l[i-1])
+                   | ( Exp5 ↓l ↑n )
+    """
+    # Input -> Exp5 SEQ Input | epsilon : la récursion terminale est écrite comme une boucle,
+    # pour que la profondeur de pile ne dépende pas du nombre de calculs.
+    # L est l'historique: chaque valeur calculée y est ajoutée en place, puis renvoyée
+    # avec son numéro dès que SEQ est reconnu, avant de lire la suite du flot.
+    def iter_input(self, L):
+        while True:
+            match self.get_current():
+                case V_T.END:
+                    return
+                case V_T.NUM | V_T.CALC | V_T.OPAR | V_T.SUB:
+                    n = self.parse_exp5(L)
+                    if self._current_token != V_T.SEQ:
+                        raise self.unexpected_token(V_T.SEQ.name)
+                    L.append(n)
+                    yield len(L), n
+                    self.consume_token(V_T.SEQ)
+                case _:
+                    raise self.unexpected_token("NUM, CALC, OPAR, SUB, END")
+
+    # Renvoie les valeurs des calculs de l'entrée (et non L, qui peut ne garder que
+    # les dernières valeurs, voir history.py)
+    def parse_input(self, L):
+        return [n for _, n in self.iter_input(L)]
+
+    def parse_exp5(self, L):
+        match self.get_current():
+            case V_T.NUM | V_T.CALC | V_T.OPAR | V_T.SUB:
+                n_1 = self.parse_exp4(L)
+                n = self.parse_Z(L,n_1)
+                return n
+            case _:
+                raise self.unexpected_token("NUM, CALC, OPAR, SUB")
+
+    def parse_Z(self, L,n_1):
+        match self.get_current():
+            case V_T.ADD | V_T.SUB:
+                n_2 = self.parse_exp5_bis(L,n_1)
+                n_3 = self.parse_Z(L,n_2)
+                return n_3
+            case V_T.CPAR | V_T.SEQ:
+                return n_1
+            case _:
+                raise self.unexpected_token("NADD, SUB, CPAR, SEQ")
+
+    def parse_exp5_bis(self, L,n_1):
+        match self.get_current():
+            case V_T.ADD:
+                self.consume_token(V_T.ADD)
+                n_2 = self.parse_exp4(L)
+                return n_1 + n_2
+            case V_T.SUB:
+                self.consume_token(V_T.SUB)
+                n_2 = self.parse_exp4(L)
+                return n_1 - n_2
+            case _:
+                raise self.unexpected_token("ADD, SUB")
+
+    def parse_exp4(self, L):
+        match self.get_current():
+            case V_T.NUM | V_T.CALC | V_T.OPAR | V_T.SUB:
+                n_1 = self.parse_exp3(L)
+                n = self.parse_Y(L,n_1)
+                return n
+            case _:
+                raise self.unexpected_token("NUM, CALC, OPAR, SUB")
+
+    def parse_Y(self, L,n_1):
+        match self.get_current():
+            case V_T.MUL | V_T.DIV:
+                n_2 = self.parse_exp4_bis(L,n_1)
+                n_3 = self.parse_Y(L,n_2)
+                return n_3
+            case V_T.CPAR | V_T.ADD | V_T.SUB | V_T.SEQ:
+                n_3 = n_1
+                return n_3
+            case _:
+                raise self.unexpected_token("MUL, DIV, CPAR, ADD, SUB, SEQ")
+
+    def parse_exp4_bis(self, L,n_1):
+        match self.get_current():
+            case V_T.MUL:
+                self.consume_token(V_T.MUL)
+                n_2 = self.parse_exp3(L)
+                n = n_1 * n_2
+                return n
+            case V_T.DIV:
+                self.consume_token(V_T.DIV)
+                n_2 = self.parse_exp3(L)
+                return n_1 / n_2
+            case _:
+                raise self.unexpected_token("MUL, DIV")
+
+    def parse_exp3(self, L):   
+        match self.get_current():
+            case V_T.SUB:
+                self.consume_token(V_T.SUB)
+                n_1 = self.parse_exp3(L)
+                n = -1 * n_1
+                return n
+            case V_T.NUM | V_T.CALC | V_T.OPAR:
+                n = self.parse_exp2(L)
+                return n 
+            case _:
+                raise self.unexpected_token("SUB, NUM, CALC, OPAR")
+
+    def parse_exp2(self, L):
+        match self.get_current():
+            case V_T.NUM | V_T.CALC | V_T.OPAR:
+                n_1 = self.parse_exp1(L)
+                n = self.parse_exp2_bis(n_1)
+                return n
+            case _:
+                raise self.unexpected_token("NUM, CALC, OPAR")
+
+    def parse_exp2_bis(self, n):
+        match self.get_current():
+            case V_T.FACT:
+                self.consume_token(V_T.FACT)
+                return factorial(int(n))
+            case V_T.CPAR | V_T.MUL | V_T.DIV | V_T.ADD | V_T.SUB | V_T.SEQ:
+                return n
+            case _:
+                raise self.unexpected_token("FACT, CPAR, MUL, DIV, ADD, SUB, SEQ")
+
+    def parse_exp1(self, L):
+        match self.get_current():
+            case V_T.NUM | V_T.CALC | V_T.OPAR:
+                n_1 = self.parse_exp0(L)
+                n = self.parse_exp1_bis(L,n_1)
+                return n
+            case _:
+                raise self.unexpected_token("NUM, CALC, OPAR")
+
+    def parse_exp1_bis(self, L,n):
+        match self.get_current():
+            case V_T.POW:
+                self.consume_token(V_T.POW)
+                n_1 = self.parse_exp1(L)
+                return self.backend.pow(n, n_1)
+            case V_T.CPAR | V_T.FACT | V_T.MUL | V_T.DIV | V_T.ADD | V_T.SUB | V_T.SEQ:
+                return n
+            case _:
+                raise self.unexpected_token("POW, CPAR, FACT, MUL, DIV, ADD, SUB, SEQ")
+
+    def parse_exp0(self, L):
+        match self.get_current():
+            case V_T.NUM:
+                n = self.consume_token(V_T.NUM)
+                return n
+            case V_T.CALC:
+                i = self.consume_token(V_T.CALC)
+                n = L[i-1]
+                return n
+            case V_T.OPAR:
+                self.consume_token(V_T.OPAR)
+                n = self.parse_exp5(L)
+                self.consume_token(V_T.CPAR)
+                return n
+            case _:
+                raise self.unexpected_token("NUM, CALC, OPAR")
+
+    # Analyse et calcule le flot ; renvoie la liste des valeurs de ses calculs.
+    # Ces valeurs s'ajoutent à l'historique, qui est conservé d'un appel à l'autre.
+    def parse(self, stream=sys.stdin):
+        with self.backend.scope():
+            self.init_parser(stream)
+            values = self.parse_input(self.history)
+            self.consume_token(V_T.END)
+        return values
+
+    # Comme parse, mais renvoie les couples (numéro, valeur) des calculs au fur et à mesure.
+    # Le contexte des calculs n'est actif que pendant l'analyse, pas entre deux valeurs.
+    def iter_parse(self, stream=sys.stdin, eoi=None, line_buffered=None):
+        with self.backend.scope():
+            self.init_parser(stream, eoi, line_buffered)
+        steps = self.iter_input(self.history)
+        while True:
+            with self.backend.scope():
+                step = next(steps, None)
+                if step is None:
+                    self.consume_token(V_T.END)
+                    return
+            yield step
 
 
 #####################################
@@ -256,12 +303,45 @@ def parse_exp0(L):
 ## Appelle l'analyseur grammatical et retourne
 ## - None sans les attributs
 ## - la liste des valeurs des calculs avec les attributs
+## - avec ast=True, la liste des arbres des calculs (voir tree.py),
+##   à évaluer ensuite autant de fois que nécessaire
+## - avec parallel=True (ou un nombre de processus), la liste des valeurs des calculs,
+##   les calculs indépendants étant évalués en parallèle (voir parallel.py)
+## backend choisit la représentation des nombres: 'float' (défaut), 'decimal' ou 'fraction',
+## ou une instance de numeric.DecimalBackend pour donner un contexte (voir numeric.py)
+
+def parse(stream=sys.stdin, ast=False, parallel=False, backend=None):
+    if ast:
+        import tree  # tree dépend de ce module
+        return tree.parse(stream, backend)
+    if parallel:
+        import parallel as par
+        return par.parse(stream, None if parallel is True else parallel, backend=backend)
+    return Calculator(backend=backend).parse(stream)
+
+## Comme parse, sur le contenu du fichier path, projeté en mémoire (mmap): ses octets
+## sont analysés directement (voir lexer.BytesLexer), sans être décodés ni copiés,
+## et le système ne lit les pages du fichier qu'au fur et à mesure de l'analyse.
+
+def parse_file(path, ast=False, parallel=False, backend=None):
+    backend = numeric.backend(backend)  # la même pour le lexer et la calculatrice
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return parse(b'', ast, parallel, backend)  # mmap refuse les fichiers vides
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return parse(data, ast, parallel, backend)
+
+## Générateur des couples (numéro, valeur) des calculs, lus ligne à ligne dans le flot:
+## avec un autre caractère eoi que '\n', on peut ainsi traiter un flot continu de calculs.
+## Avec keep, seules les keep dernières valeurs sont gardées (voir history.RingHistory)
+## et la mémoire utilisée reste bornée.
+
+def iter_parse(stream=sys.stdin, keep=None, eoi=None, line_buffered=True, backend=None):
+    if keep is None:
+        return Calculator(backend=backend).iter_parse(stream, eoi, line_buffered)
+    import history
+    return Calculator(history.RingHistory(keep), backend).iter_parse(stream, eoi, line_buffered)
 
-def parse(stream=sys.stdin):
-    init_parser(stream)
-    l = parse_input()
-    consume_token(V_T.END)
-    return l
 
 #####################################
 ## Test depuis la ligne de commande
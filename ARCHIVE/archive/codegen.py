@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : compilation des calculs en code Python, pour les évaluer de nombreuses fois
+"""
+
+import io
+import sys
+import math
+import functools
+from decimal import Decimal
+from fractions import Fraction
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+import definitions as defs
+import tree
+import numeric
+from definitions import V_T
+from factorials import factorial
+
+#####
+# Génération du texte Python d'une expression
+# Les opérations sont exactement celles de calc.py: n_1 + n_2, ..., power(n, n_1)
+# (la puissance de la représentation des nombres, voir numeric.py), -1 * n pour SUB unaire
+# et factorial(int(n)) pour FACT. Les nombres sont écrits par repr: Decimal('1.5') ou
+# Fraction(3, 2) selon la représentation choisie par tree.parse.
+# On ne met que les parenthèses nécessaires, sans jamais réassocier les opérations.
+
+# Priorités des expressions Python produites
+PREC_ADD = 10
+PREC_MUL = 20
+PREC_ATOM = 40
+
+BINARY = {
+    V_T.ADD: (" + ", PREC_ADD),
+    V_T.SUB: (" - ", PREC_ADD),
+    V_T.MUL: (" * ", PREC_MUL),
+    V_T.DIV: (" / ", PREC_MUL),
+}
+
+def paren(source, prec, needed):
+    return "(" + source + ")" if prec < needed else source
+
+# Renvoie le texte de ast et sa priorité ; H est le nom de la liste d'historique
+def expression_source(ast, H):
+    t = type(ast)
+    if t is tree.Num:
+        v = ast.value
+        if isinstance(v, float) and not math.isfinite(v):
+            return "float('" + repr(v) + "')", PREC_ATOM
+        if v < 0:
+            return "(" + repr(v) + ")", PREC_ATOM
+        return repr(v), PREC_ATOM
+    if t is tree.Ref:
+        return H + "[" + repr(ast.index-1) + "]", PREC_ATOM
+    if t is tree.Fact:
+        return "factorial(int(" + expression_source(ast.operand, H)[0] + "))", PREC_ATOM
+    if t is tree.Neg:
+        return "-1 * " + paren(*expression_source(ast.operand, H), PREC_MUL + 1), PREC_MUL
+    if t is tree.BinOp:
+        if ast.op == V_T.POW:  # backend.pow, avec les limites de power.py
+            return ("power(" + expression_source(ast.left, H)[0] + ", "
+                    + expression_source(ast.right, H)[0] + ")", PREC_ATOM)
+        op, prec = BINARY[ast.op]  # associatifs à gauche
+        left = paren(*expression_source(ast.left, H), prec)
+        right = paren(*expression_source(ast.right, H), prec + 1)
+        return left + op + right, prec
+    raise TypeError("Unknown node " + repr(ast))
+
+# Texte d'une fonction Python calculant les valeurs du programme à partir de l'historique H ;
+# elle renvoie la liste de ces valeurs (sans modifier H)
+def program_source(program):
+    if len(program) == 1:
+        return "def calculate(H):\n    return [" + expression_source(program[0], "H")[0] + "]\n"
+    lines = ["def calculate(H):",
+             "    L = list(H)"]
+    for ast in program:
+        lines.append("    L.append(" + expression_source(ast, "L")[0] + ")")
+    lines.append("    return L[len(H):]")
+    return "\n".join(lines) + "\n"
+
+
+#####
+# Compilation
+
+# Repli sur l'évaluation de l'arbre, pour les expressions trop profondes pour le compilateur Python
+def tree_walker(program, backend):
+    def calculate(H):
+        return tree.evaluate_program(program, list(H), backend)
+    return calculate
+
+# Compile une liste d'arbres en une fonction calculate(history) -> liste des valeurs,
+# calculées avec la représentation des nombres backend (celle donnée à tree.parse)
+def compile_program(program, backend=None):
+    backend = numeric.backend(backend)
+    try:
+        code = compile(program_source(program), "<calc>", "exec")
+    except (RecursionError, MemoryError, SyntaxError):
+        return tree_walker(program, backend)
+    namespace = {'factorial': factorial, 'power': backend.pow, 'Decimal': Decimal, 'Fraction': Fraction}
+    exec(code, namespace)
+    calculate = namespace['calculate']
+    # dans le contexte des calculs (précision decimal, ...), comme tree.evaluate_program
+    def calculate_in_scope(H):
+        with backend.scope():
+            return calculate(H)
+    return calculate_in_scope
+
+# Compile le texte d'un programme (EOI final facultatif) ;
+# les compilations sont gardées en cache, indexées par le texte et la représentation
+@functools.lru_cache(maxsize=1024)
+def compile_source(text, backend=None):
+    if not text.endswith(defs.EOI):
+        text = text + defs.EOI
+    return compile_program(tree.parse(io.StringIO(text), backend), backend)
+
+
+#####################################
+## Test depuis la ligne de commande
+
+if __name__ == "__main__":
+    print("@ Compiling the calculator program in infix syntax.")
+    program = tree.parse()
+    print(program_source(program))
+    print("@ result = ", repr(compile_program(program)([])))
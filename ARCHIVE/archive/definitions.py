@@ -27,8 +27,9 @@ V = set(tuple(V_C) + (EOI,) + tuple(SEP))
 #########################
 # Definition des tokens
 
+# (qualname permet à pickle de retrouver la classe sous le nom V_T)
 V_T = enum.Enum('Token', ['NUM', 'ADD', 'SUB', 'MUL', 'DIV', 'POW', 'FACT',
-                          'OPAR', 'CPAR', 'CALC', 'SEQ', 'END'], start=0)
+                          'OPAR', 'CPAR', 'CALC', 'SEQ', 'END'], start=0, qualname='V_T')
 
 # Les premiers caractères de chaque token (excepté NUM)
 PREFIX = ('', '+', '-', '*', '/', '^', '!', '(', ')', '#', ';', EOI)
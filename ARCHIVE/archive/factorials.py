@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : cache des factorielles (FACT), de taille mémoire bornée
+"""
+
+import sys
+import math
+import bisect
+import threading
+import collections
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+# En dessous, math.factorial est plus rapide que la recherche dans le cache
+SMALL = 64
+
+# Taille par défaut du cache, en octets
+MAX_BYTES = 64 << 20
+
+# Cache des factorielles: n! est calculée à partir du plus grand k! du cache avec k < n,
+# en multipliant par (k+1)...(n) (math.perm(n, n-k)), si k est assez proche de n.
+# Les valeurs les moins récemment utilisées sont oubliées quand la taille totale
+# des entiers gardés dépasse max_bytes.
+class FactorialCache:
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0          # n! trouvée dans le cache
+        self.partial_hits = 0  # n! calculée à partir d'un k! du cache
+        self.misses = 0        # n! calculée par math.factorial
+        self.bytes = 0         # taille totale des valeurs gardées
+        self._values = collections.OrderedDict()  # n -> n!, du moins au plus récemment utilisé
+        self._keys = []        # les n du cache, triés
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def __call__(self, n):
+        # les cas d'erreur (flottant, négatif, ...) sont ceux de math.factorial
+        if type(n) is not int or n < SMALL:
+            return math.factorial(n)
+        with self._lock:
+            value = self._values.get(n)
+            if value is not None:
+                self._values.move_to_end(n)
+                self.hits += 1
+                return value
+            i = bisect.bisect_left(self._keys, n) - 1
+            k = self._keys[i] if i >= 0 else 0
+            base = self._values[k] if k >= n // 2 else None
+        if base is not None:
+            value = base * math.perm(n, n - k)
+        else:
+            value = math.factorial(n)
+        with self._lock:
+            if base is not None:
+                self.partial_hits += 1
+            else:
+                self.misses += 1
+            self._store(n, value)
+        return value
+
+    def _store(self, n, value):
+        if n in self._values:
+            return
+        size = (value.bit_length() + 7) // 8
+        if size > self.max_bytes:
+            return
+        self._values[n] = value
+        bisect.insort(self._keys, n)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            old, v = self._values.popitem(last=False)
+            del self._keys[bisect.bisect_left(self._keys, old)]
+            self.bytes -= (v.bit_length() + 7) // 8
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._keys.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'partial_hits': self.partial_hits, 'misses': self.misses,
+                'entries': len(self._values), 'bytes': self.bytes}
+
+
+# Cache partagé par les calculatrices
+CACHE = FactorialCache()
+
+def factorial(n):
+    return CACHE(n)
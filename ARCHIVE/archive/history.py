@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : historiques des calculs, référencés par #n
+"""
+
+import sys
+import mmap
+import pickle
+import struct
+import tempfile
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+#####
+# Un historique s'utilise comme la liste L de calc.py: L.append(n), len(L) et L[i-1]
+# pour la référence #i (les indices négatifs comptant depuis la fin, comme pour une liste).
+# Il se donne à la calculatrice par Calculator(history=...) ; par défaut, c'est une liste.
+
+# Historique borné: seules les window dernières valeurs sont gardées, dans un tableau
+# circulaire ; une référence à une valeur plus ancienne lève une IndexError.
+class RingHistory:
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be positive")
+        self.window = window
+        self._values = []
+        self._count = 0  # nombre de valeurs ajoutées depuis le début
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value):
+        if len(self._values) < self.window:
+            self._values.append(value)
+        else:
+            self._values[self._count % self.window] = value
+        self._count += 1
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(self._count))]
+        if k < 0:
+            k += self._count
+        if not 0 <= k < self._count:
+            raise IndexError("history index out of range")
+        if k < self._count - self.window:
+            return self._old(k)
+        return self._values[k % self.window]
+
+    # Valeur d'indice k, sortie de la fenêtre
+    def _old(self, k):
+        raise IndexError("#{0} is no longer in the history (window of {1})".format(k+1, self.window))
+
+    def __iter__(self):
+        return iter(self[max(0, self._count - self.window):])
+
+    def __repr__(self):
+        return "RingHistory({0}, {1})".format(self.window, self[max(0, self._count - self.window):])
+
+
+# Historique sans limite de taille, mais de mémoire bornée: les window dernières valeurs
+# restent en mémoire, les plus anciennes sont écrites sur disque quand elles sortent
+# de la fenêtre. Le fichier des valeurs contient les valeurs sérialisées (pickle) les unes
+# à la suite des autres ; le fichier d'index contient la position de chacune (8 octets),
+# et il est lu par mmap. Les deux fichiers sont temporaires, supprimés par close().
+class DiskHistory(RingHistory):
+
+    OFFSET = struct.Struct('<Q')
+
+    def __init__(self, window=1024, dir=None):
+        super().__init__(window)
+        self._data = tempfile.TemporaryFile(dir=dir)
+        self._index = tempfile.TemporaryFile(dir=dir)
+        self._map = None   # projection du fichier d'index, refaite quand il a grandi
+        self._spilled = 0  # nombre de valeurs écrites sur disque
+
+    def append(self, value):
+        if self._count >= self.window:
+            self._spill(self._values[self._count % self.window])
+        super().append(value)
+
+    def _spill(self, value):
+        offset = self._data.seek(0, 2)
+        pickle.dump(value, self._data, pickle.HIGHEST_PROTOCOL)
+        self._index.write(self.OFFSET.pack(offset))
+        self._spilled += 1
+
+    def _old(self, k):
+        if self._map is None or len(self._map) < (k+1) * self.OFFSET.size:
+            self._index.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._index.fileno(), self._spilled * self.OFFSET.size,
+                                  access=mmap.ACCESS_READ)
+        offset, = self.OFFSET.unpack_from(self._map, k * self.OFFSET.size)
+        self._data.flush()
+        self._data.seek(offset)
+        return pickle.load(self._data)
+
+    def __iter__(self):
+        return (self[k] for k in range(self._count))
+
+    def __repr__(self):
+        return "DiskHistory({0}, {1} values, {2} on disk)".format(self.window, self._count, self._spilled)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : mesures du lexer, de l'analyse et des calculs (compteurs et temps)
+"""
+
+import sys
+import json
+import time
+import inspect
+import functools
+import collections
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+import calc
+import pratt
+import rattrapage
+import tree
+from definitions import V_T
+
+#####
+# Les calculatrices ne sont pas modifiées: profiled(cls) en construit une sous-classe
+# qui enregistre ses mesures dans un objet Stats. Sans elle, rien n'est mesuré et
+# rien ne coûte. On compte:
+# - les caractères lus et les tokens produits, par type (V_T)
+# - les productions de la grammaire (méthodes parse_*), avec leur temps propre:
+#   celui des productions appelées et du lexer en est retiré
+# - les opérateurs évalués, avec leur temps: pour les analyseurs LL(1), celui de la
+#   production qui applique l'opérateur ; pour Pratt, celui de son action sémantique.
+# Chaque production mesurée ajoute un appel de fonction à la pile: les expressions
+# très imbriquées atteignent donc plus tôt la limite de récursion.
+
+# Opérateur appliqué par une production, selon le token courant à son entrée
+OPERATOR_RULES = {
+    # calc.py
+    'parse_exp5_bis': {V_T.ADD: 'ADD', V_T.SUB: 'SUB'},
+    'parse_exp4_bis': {V_T.MUL: 'MUL', V_T.DIV: 'DIV'},
+    'parse_exp2_bis': {V_T.FACT: 'FACT'},
+    'parse_exp1_bis': {V_T.POW: 'POW'},
+    # rattrapage.py
+    'parse_exp5_prime': {V_T.ADD: 'ADD', V_T.SUB: 'SUB'},
+    'parse_exp4_prime': {V_T.MUL: 'MUL', V_T.DIV: 'DIV'},
+    'parse_exp2_prime': {V_T.FACT: 'FACT'},
+    'parse_exp1_prime': {V_T.POW: 'POW'},
+    # les deux
+    'parse_exp3': {V_T.SUB: 'NEG'},
+}
+
+class Stats:
+
+    def __init__(self):
+        self.parses = 0         # appels de parse et iter_parse
+        self.seconds = 0.0      # leur temps total
+        self.chars = 0          # caractères lus (octets pour un fichier, voir calc.parse_file)
+        self.tokens = collections.Counter()  # nom du token -> nombre
+        self.lexer = [0, 0.0]   # appels de next_token, temps
+        self.productions = {}   # nom de la production -> [appels, temps propre]
+        self.operators = {}     # nom de l'opérateur -> [évaluations, temps]
+        # temps des mesures imbriquées dans chaque mesure en cours, à retirer de son temps propre
+        self._nested = [0.0]
+
+    def start(self):
+        self._nested.append(0.0)
+        return time.perf_counter()
+
+    # Fin d'une mesure commencée par start ; renvoie son temps propre
+    def stop(self, start):
+        elapsed = time.perf_counter() - start
+        nested = self._nested.pop()
+        self._nested[-1] += elapsed
+        return elapsed - nested
+
+    @staticmethod
+    def add(table, key, seconds):
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+
+    # Les mesures, dans un dictionnaire sérialisable en JSON
+    def to_dict(self):
+        return {
+            'parses': self.parses,
+            'seconds': self.seconds,
+            'chars': self.chars,
+            'tokens': {t.name: self.tokens[t.name] for t in V_T if t.name in self.tokens},
+            'lexer': {'calls': self.lexer[0], 'seconds': self.lexer[1]},
+            'productions': {name: {'calls': calls, 'seconds': seconds}
+                            for name, (calls, seconds) in self.productions.items()},
+            'operators': {name: {'count': count, 'seconds': seconds}
+                          for name, (count, seconds) in self.operators.items()},
+        }
+
+    def to_json(self, indent=None):
+        return json.dumps(self.to_dict(), indent=indent)
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.parses = data['parses']
+        stats.seconds = data['seconds']
+        stats.chars = data['chars']
+        stats.tokens.update(data['tokens'])
+        stats.lexer = [data['lexer']['calls'], data['lexer']['seconds']]
+        stats.productions = {name: [d['calls'], d['seconds']] for name, d in data['productions'].items()}
+        stats.operators = {name: [d['count'], d['seconds']] for name, d in data['operators'].items()}
+        return stats
+
+    # Ajoute les mesures de other (d'une autre calculatrice, d'un autre processus, ...)
+    def merge(self, other):
+        self.parses += other.parses
+        self.seconds += other.seconds
+        self.chars += other.chars
+        self.tokens.update(other.tokens)
+        self.lexer[0] += other.lexer[0]
+        self.lexer[1] += other.lexer[1]
+        for mine, theirs in ((self.productions, other.productions), (self.operators, other.operators)):
+            for name, (count, seconds) in theirs.items():
+                entry = mine.setdefault(name, [0, 0.0])
+                entry[0] += count
+                entry[1] += seconds
+        return self
+
+    # Texte lisible, les entrées les plus coûteuses d'abord
+    def report(self):
+        lines = ["analyses: {0} en {1:.6f} s".format(self.parses, self.seconds),
+                 "caractères: {0}".format(self.chars),
+                 "lexer: {0} tokens en {1:.6f} s".format(*self.lexer)]
+        lines += ["  {0:<6} {1:>10}".format(name, count) for name, count in self.to_dict()['tokens'].items()]
+        for title, table in (("productions", self.productions), ("opérateurs", self.operators)):
+            lines.append(title + ":")
+            for name, (count, seconds) in sorted(table.items(), key=lambda item: -item[1][1]):
+                lines.append("  {0:<16} {1:>10} {2:12.6f} s".format(name, count, seconds))
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return "Stats(" + self.to_json() + ")"
+
+
+#####
+# Le lexer mesuré: même interface que celui de la calculatrice
+
+class ProfiledLexer:
+
+    def __init__(self, lexer, stats):
+        self._lexer = lexer
+        self._stats = stats
+
+    def next_token(self):
+        stats = self._stats
+        start = stats.start()
+        try:
+            token = self._lexer.next_token()
+        finally:
+            seconds = stats.stop(start)
+            stats.lexer[0] += 1
+            stats.lexer[1] += seconds
+        stats.tokens[token[0].name] += 1
+        return token
+
+    def __getattr__(self, name):
+        return getattr(self._lexer, name)
+
+
+# Remplace la production method par sa version mesurée
+def profiled_production(method):
+    name = method.__name__
+    rule = name[len('parse_'):]
+    operators = OPERATOR_RULES.get(name, {})
+
+    @functools.wraps(method)
+    def production(self, *args):
+        stats = self.stats
+        operator = operators.get(self._current_token)
+        start = stats.start()
+        try:
+            return method(self, *args)
+        finally:
+            seconds = stats.stop(start)
+            Stats.add(stats.productions, rule, seconds)
+            if operator is not None:
+                Stats.add(stats.operators, operator, seconds)
+    return production
+
+# Remplace l'action sémantique function de l'opérateur name par sa version mesurée
+def profiled_action(stats, name, function):
+    def action(*args):
+        start = stats.start()
+        try:
+            return function(*args)
+        finally:
+            Stats.add(stats.operators, name, stats.stop(start))
+    return action
+
+
+# La sous-classe mesurée de la calculatrice cls ; son constructeur accepte stats
+# (un Stats partagé, par exemple entre plusieurs calculatrices), créé sinon.
+@functools.cache
+def profiled(cls):
+
+    def __init__(self, history=None, backend=None, stats=None):
+        # avant super().__init__, qui appelle binary_actions pour Pratt
+        self.stats = Stats() if stats is None else stats
+        super(subclass, self).__init__(history, backend)
+
+    def init_parser(self, stream, eoi=None, line_buffered=None):
+        stats = self.stats
+        start = stats.start()
+        try:
+            super(subclass, self).init_parser(stream, eoi, line_buffered)
+        finally:
+            # le premier token, lu par init_parser
+            Stats.add(stats.productions, 'init_parser', stats.stop(start))
+        stats.tokens[self._current_token.name] += 1
+        self.lexer = self._profiled_lexer = ProfiledLexer(self.lexer, stats)
+
+    # Fin de parse ou de iter_parse: les caractères lus par le lexer de cette analyse
+    def finish(self, start):
+        stats = self.stats
+        stats.parses += 1
+        stats.seconds += time.perf_counter() - start
+        lexer = self.__dict__.pop('_profiled_lexer', None)
+        if lexer is not None:
+            stats.chars += lexer.chars_read()
+
+    def parse(self, stream=sys.stdin):
+        start = time.perf_counter()
+        try:
+            return super(subclass, self).parse(stream)
+        finally:
+            finish(self, start)
+
+    def iter_parse(self, stream=sys.stdin, eoi=None, line_buffered=None):
+        start = time.perf_counter()
+        try:
+            yield from super(subclass, self).iter_parse(stream, eoi, line_buffered)
+        finally:
+            finish(self, start)
+
+    namespace = {'__init__': __init__, 'init_parser': init_parser,
+                 'parse': parse, 'iter_parse': iter_parse}
+    for name, method in inspect.getmembers(cls, inspect.isfunction):
+        if name.startswith('parse_') and not inspect.isgeneratorfunction(method):
+            namespace[name] = profiled_production(method)
+
+    if issubclass(cls, pratt.PrattCalculator):
+        def binary_actions(self):
+            return {tok: profiled_action(self.stats, tok.name, function)
+                    for tok, function in super(subclass, self).binary_actions().items()}
+
+        def negate(self, n):
+            return profiled_action(self.stats, 'NEG', super(subclass, self).negate)(n)
+
+        def fact(self, n):
+            return profiled_action(self.stats, 'FACT', super(subclass, self).fact)(n)
+
+        namespace.update(binary_actions=binary_actions, negate=negate, fact=fact)
+
+    subclass = type('Profiled' + cls.__name__, (cls,), namespace)
+    subclass.__module__ = __name__
+    return subclass
+
+
+#####################################
+## Fonction principale: les valeurs des calculs du flot et les mesures,
+## ajoutées à stats s'il est donné
+
+ENGINES = {
+    'calc': calc.Calculator,
+    'pratt': pratt.PrattCalculator,
+    'rattrapage': rattrapage.Calculator,
+    'tree': tree.TreeBuilder,
+}
+
+def parse(stream=sys.stdin, engine='calc', stats=None, backend=None):
+    try:
+        cls = ENGINES[engine]
+    except KeyError:
+        raise ValueError("unknown engine " + repr(engine)) from None
+    calculator = profiled(cls)(backend=backend, stats=stats)
+    return calculator.parse(stream), calculator.stats
+
+
+#####################################
+## Test depuis la ligne de commande
+
+if __name__ == "__main__":
+    import argparse
+    args = argparse.ArgumentParser(description="Profile the calculator on standard input.")
+    args.add_argument('--engine', choices=ENGINES, default='calc')
+    args.add_argument('--backend', default=None)
+    args.add_argument('--json', action='store_true', help="print the stats as JSON")
+    args = args.parse_args()
+    result, stats = parse(sys.stdin, args.engine, backend=args.backend)
+    if args.json:
+        print(stats.to_json(indent=2))
+    else:
+        print("@ result = ", repr(result))
+        print(stats.report())
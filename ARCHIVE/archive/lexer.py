@@ -4,9 +4,15 @@
 Projet TL : lexer de la calculatrice
 """
 
+import re
 import sys
 import enum
+import mmap
+import array
+import functools
+import collections
 import definitions as defs
+import numeric
 
 
 # Pour lever une erreur, utiliser: raise LexerError("message décrivant l'erreur dans le lexer")
@@ -14,356 +20,866 @@ class LexerError(Exception):
     pass
 
 
-#################################
-# Variables et fonctions internes (privées)
-
-# Variables privées : les trois prochains caractères de l'entrée
-current_char1 = ''
-current_char2 = ''
-current_char3 = ''
-
-# Initialisation: on vérifie que EOI n'est pas dans V_C et on initialise les prochains caractères
-def init_char():
-    global current_char1, current_char2, current_char3
-    # Vérification de cohérence: EOI n'est pas dans V_C ni dans SEP
-    if defs.EOI in defs.V_C:
-        raise LexerError('character ' + repr(defs.EOI) + ' in V_C')
-    defs.SEP = {' ', '\n', '\t'} - set(defs.EOI)
-    defs.V = set(tuple(defs.V_C) + (defs.EOI,) + tuple(defs.SEP))
-    current_char1 = defs.INPUT_STREAM.read(1)
-    # print("@", repr(current_char1))  # decomment this line may help debugging
-    if current_char1 not in defs.V:
-        raise LexerError('Character ' + repr(current_char1) + ' unsupported')
-    if current_char1 == defs.EOI:
-        current_char2 = defs.EOI
-        current_char3 = defs.EOI
-    else:
-        current_char2 = defs.INPUT_STREAM.read(1)
-        # print("@", repr(current_char2))  # decomment this line may help debugging
-        if current_char2 not in defs.V:
-            raise LexerError('Character ' + repr(current_char2) + ' unsupported')
-        if current_char2 == defs.EOI:
-            current_char3 = defs.EOI
-        else:
-            current_char3 = defs.INPUT_STREAM.read(1)
-            # print("@", repr(current_char3))  # decomment this line may help debugging
-            if current_char3 not in defs.V:
-                raise LexerError('Character ' + repr(current_char3) + ' unsupported')
-
-    return
-
-# Accès aux caractères de prévision
-def peek_char3():
-    global current_char1, current_char2, current_char3
-    return (current_char1 + current_char2 + current_char3)
-
-def peek_char1():
-    global current_char1
-    return current_char1
-
-# Avancée d'un caractère dans l'entrée
-def consume_char():
-    global current_char1, current_char2, current_char3
-    if current_char2 == defs.EOI: # pour ne pas lire au delà du dernier caractère
-        current_char1 = defs.EOI
-        return
-    if current_char3 == defs.EOI: # pour ne pas lire au delà du dernier caractère
-        current_char1 = current_char2
-        current_char2 = defs.EOI
-        return
-    next_char = defs.INPUT_STREAM.read(1)
-    # print("@", repr(next_char))  # decommenting this line may help debugging
-    if next_char in defs.V:
-        current_char1 = current_char2
-        current_char2 = current_char3
-        current_char3 = next_char
-        return
-    raise LexerError('Character ' + repr(next_char) + ' unsupported')
-
 def expected_digit_error(char):
     return LexerError('Expected a digit, but found ' + repr(char))
 
 def unknown_token_error(char):
     return LexerError('Unknown start of token ' + repr(char))
 
-# Initialisation de l'entrée
-def reinit(stream=sys.stdin):
-    global input_stream, current_char1, current_char2, current_char3
-    assert stream.readable()
-    defs.INPUT_STREAM = stream
-    current_char1 = ''
-    current_char2 = ''
-    current_char3 = ''
-    init_char()
+def unsupported_error(char):
+    return LexerError('Character ' + repr(char) + ' unsupported')
+
+def expected_number_error(chars):
+    return LexerError('Expected a number, but found ' + repr(chars))
 
 
 #################################
 ## Automates pour les entiers et les flottants
 
-#Cette fonction représente le 1er automate de l'énoncé
-def read_INT_to_EOI():
+# Les automates sont donnés sous forme de données, puis compilés en une table de transitions:
+# les états sont des entiers (déjà multipliés par NB_CLASSES) et les caractères sont regroupés
+# en classes, si bien qu'une transition est un simple accès table[etat + classe].
+
+# Classes de caractères
+C_DIGIT, C_POINT, C_EXP, C_PLUS, C_MINUS, C_AUTRE = range(6)
+NB_CLASSES = 6
+
+# Tableau de correspondance code ASCII -> classe du caractère
+CHAR_CLASS = [C_AUTRE] * 128
+for _c in defs.DIGITS:
+    CHAR_CLASS[ord(_c)] = C_DIGIT
+CHAR_CLASS[ord('.')] = C_POINT
+CHAR_CLASS[ord('e')] = C_EXP
+CHAR_CLASS[ord('E')] = C_EXP
+CHAR_CLASS[ord('+')] = C_PLUS
+CHAR_CLASS[ord('-')] = C_MINUS
+
+# Le puit est toujours l'état 0
+PUIT = 0
+
+Automaton = collections.namedtuple('Automaton', ['table', 'initial', 'finals', 'names'])
+
+def compile_automaton(transitions, initial, finals):
+    """Compile un automate décrit par un dictionnaire
+       {état: {classe de caractère: état suivant}} ; les transitions absentes vont au puit."""
+    names = ['puit'] + [q for q in transitions if q != 'puit']
+    number = {q: i * NB_CLASSES for i, q in enumerate(names)}
+    table = [PUIT] * (len(names) * NB_CLASSES)
+    for q, trans in transitions.items():
+        for cls, q2 in trans.items():
+            table[number[q] + cls] = number[q2]
+    return Automaton(table, number[initial], frozenset(number[q] for q in finals), names)
+
+# 1er automate de l'énoncé: les entiers
+INT_AUTOMATON = compile_automaton({
+    "q0": {C_DIGIT: "q1"},
+    "q1": {C_DIGIT: "q1"},
+}, "q0", ["q1"])
+
+# 2eme automate de l'énoncé: les flottants sans exposant
+FLOAT_AUTOMATON = compile_automaton({
+    "q0": {C_DIGIT: "q2", C_POINT: "q1"},
+    "q1": {C_DIGIT: "q3"},
+    "q2": {C_DIGIT: "q2", C_POINT: "q3"},
+    "q3": {C_DIGIT: "q3"},
+}, "q0", ["q3"])
+
+# Automate des nombres (entiers ou flottants, avec exposant éventuel)
+NUM_AUTOMATON = compile_automaton({
+    "q0": {C_DIGIT: "q3", C_POINT: "q1"},
+    "q1": {C_DIGIT: "q2"},
+    "q2": {C_DIGIT: "q2", C_EXP: "q4"},
+    "q3": {C_DIGIT: "q3", C_POINT: "q2", C_EXP: "q4"},
+    "q4": {C_DIGIT: "q6", C_PLUS: "q5", C_MINUS: "q5"},
+    "q5": {C_DIGIT: "q6"},
+    "q6": {C_DIGIT: "q6"},
+}, "q0", ["q2", "q3", "q6"])
+
+# Plus long préfixe de lexeme reconnu par l'automate ('' si aucun):
+# un nombre comme 1e+ s'arrête dans un état non final, sa valeur est celle de 1
+def accepted_prefix(automaton, lexeme):
+    table = automaton.table
+    state = automaton.initial
+    length = 0
+    for i, c in enumerate(lexeme):
+        state = table[state + CHAR_CLASS[ord(c)]]
+        if state in automaton.finals:
+            length = i + 1
+    return lexeme[:length]
 
-    etats = ["q0","q1","puit"]
-    etat_finaux = ["q1"]
-    etat_init = "q0"
-    etat = etat_init
-
-    #On fait un match pour traiter chacun des états un à un et on associe leur transition
-    while peek_char1() not in defs.EOI:
-        match etat:
-            case "q0": #q0
-                match peek_char1():
-
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9": #les transitions
-                        etat = "q1"
-                    case _:
-                        etat = "puit"
-
-            case "q1": #q1
-                match peek_char1():
-                
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q1"
-                    case _:
-                        etat = "puit"
-            case "puit": 
-                etat = "puit"
-
-        consume_char()
-
-    return (etat in etat_finaux)
-
-#Cette fonction représente le 2eme automate de l'énoncé
-def read_FLOAT_to_EOI():
+#################################
+## Le lexer
+
+# Taille des blocs lus d'un coup dans le flot d'entrée
+BLOCK_SIZE = 1 << 16
+
+# Un lexer possède son flot d'entrée, son tampon et ses caractères de prévision:
+# plusieurs lexers peuvent donc travailler en même temps sur des flots différents.
+# L'alphabet (EOI, SEP, V) est figé à la création, sans modifier le module definitions.
+class Lexer:
+
+    def __init__(self, stream=sys.stdin, eoi=None, block_size=None, line_buffered=None, backend=None):
+        assert stream.readable()
+        self.stream = stream
+        self._init_state(eoi, block_size, backend)
+        # On utilise readline sur une entrée interactive (ou si line_buffered est vrai,
+        # pour un tube par exemple) pour ne pas attendre la fin d'un bloc
+        if line_buffered is None:
+            line_buffered = stream.isatty()
+        self._read = stream.readline if line_buffered else stream.read
+        self._check_window()
+
+    #################################
+    # Fonctions internes (privées)
+
+    # Alphabet, représentation des nombres et tampon vide: commun à tous les lexers
+    # (Lexer, BytesLexer, PushLexer), qui ne diffèrent que par la lecture de l'entrée
+    def _init_state(self, eoi, block_size, backend):
+        self.block_size = BLOCK_SIZE if block_size is None else block_size
+        # Représentation des nombres (voir numeric.py): float par défaut
+        self.backend = numeric.backend(backend)
+        self.convert = self.backend.convert
+        self.eoi = defs.EOI if eoi is None else eoi
+        # Vérification de cohérence: EOI n'est pas dans V_C ni dans SEP
+        if self.eoi in defs.V_C:
+            raise LexerError('character ' + repr(self.eoi) + ' in V_C')
+        self.sep = {' ', '\n', '\t'} - set(self.eoi)
+        self.V = set(tuple(defs.V_C) + (self.eoi,) + tuple(self.sep))
+        # Tampon des caractères lus et position du prochain caractère.
+        # Les trois prochains caractères de l'entrée sont _buffer[_pos:_pos+3].
+        # Une fois EOI lu, on ne lit plus rien et le tampon est complété par deux EOI.
+        self._buffer = ''
+        self._pos = 0
+        self._mark = -1        # début du lexème en cours de lecture, gardé dans le tampon (-1 si aucun)
+        self._offset = 0       # position dans le flot du caractère _buffer[0]
+        self._eoi_seen = False
+        self._bad = -1         # indice dans _buffer du premier caractère non supporté (-1 si aucun)
+        self._bad_char = ''    # ce caractère ('' si la fin du flot est atteinte avant EOI)
+        self._limit = 0        # _pos + 2 >= _limit => il faut relire ou lever l'erreur
+
+    # Lit un bloc du flot d'entrée et l'ajoute au tampon, en vérifiant ses caractères.
+    def _fill(self):
+        block = self._read(self.block_size)
+        # on oublie les caractères déjà consommés, sauf ceux du lexème en cours de lecture
+        cut = self._cut()
+        self._buffer = self._buffer[cut:]
+        self._pos -= cut
+        self._offset += cut
+        if self._mark >= 0:
+            self._mark -= cut
+        if block == '':
+            # fin du flot sans EOI: comme read(1), on trouve le caractère ''
+            self._bad = len(self._buffer)
+            self._bad_char = ''
+            return
+        eoi = block.find(self.eoi)
+        if eoi >= 0:
+            block = block[:eoi+1] # on ne regarde pas au delà de EOI
+            self._eoi_seen = True
+        if not self.V.issuperset(block):
+            for i, c in enumerate(block):
+                if c not in self.V:
+                    self._bad = len(self._buffer) + i
+                    self._bad_char = c
+                    break
+        self._buffer += block
+        if self._eoi_seen:
+            self._buffer += self.eoi + self.eoi
+
+    # Indice dans le tampon du premier caractère à garder quand on le complète
+    def _cut(self):
+        return self._pos if self._mark < 0 else self._mark
+
+    # Nombre de caractères lus (et vérifiés) au début du tampon
+    def _length(self):
+        return len(self._buffer)
+
+    # Vérifie que les trois prochains caractères sont dans le tampon, en lisant si besoin,
+    # et lève une erreur si l'un d'eux n'est pas supporté.
+    def _check_window(self):
+        while True:
+            if self._bad >= 0:
+                self._limit = self._bad
+                if self._pos + 2 >= self._bad:
+                    raise unsupported_error(self._bad_char)
+                return
+            self._limit = self._length()
+            if self._eoi_seen or self._pos + 2 < self._limit:
+                return
+            self._fill()
+
+    # Nombre de caractères lus dans le flot jusqu'ici (EOI compris)
+    def chars_read(self):
+        return self._offset + len(self._buffer) - (2 if self._eoi_seen else 0)
+
+    # Accès aux caractères de prévision
+    def peek_char3(self):
+        return self._buffer[self._pos:self._pos+3]
+
+    def peek_char1(self):
+        return self._buffer[self._pos]
+
+    # Avancée d'un caractère dans l'entrée
+    def consume_char(self):
+        if self._buffer[self._pos] == self.eoi: # pour ne pas lire au delà du dernier caractère
+            return
+        self._pos += 1
+        if self._pos + 2 >= self._limit:
+            self._check_window()
+
+    #################################
+    ## Automates pour les entiers et les flottants
+
+    # Moteur générique: fait avancer l'automate tant qu'il ne tombe pas dans le puit et qu'on
+    # n'a pas atteint EOI. Le caractère qui mène au puit n'est pas consommé.
+    # Renvoie l'état atteint et l'indice dans le tampon du début des caractères consommés:
+    # le lexème est alors self._buffer[start:self._pos], même si un bloc a été lu entre temps.
+    def run_automaton(self, automaton):
+        table = automaton.table
+        state = automaton.initial
+        eoi = self.eoi
+        # on travaille sur des copies locales, remises à jour après chaque lecture de bloc
+        buffer = self._buffer
+        pos = self._pos
+        limit = self._limit
+        self._mark = pos
+        while True:
+            c = buffer[pos]
+            if c == eoi:
+                break
+            o = ord(c)
+            next_state = table[state + (CHAR_CLASS[o] if o < 128 else C_AUTRE)]
+            if next_state == PUIT:
+                break
+            state = next_state
+            pos += 1
+            if pos + 2 >= limit:
+                self._pos = pos
+                try:
+                    self._check_window()
+                except LexerError:
+                    self._mark = -1
+                    raise
+                buffer = self._buffer
+                pos = self._pos
+                limit = self._limit
+        self._pos = pos
+        start = self._mark
+        self._mark = -1
+        return state, start
+
+    #Cette fonction représente le 1er automate de l'énoncé
+    #On s'arrête dès qu'on tombe dans le puit: le mot n'est alors pas reconnu
+    def read_INT_to_EOI(self):
+        state, _ = self.run_automaton(INT_AUTOMATON)
+        return self.peek_char1() == self.eoi and state in INT_AUTOMATON.finals
+
+    #Cette fonction représente le 2eme automate de l'énoncé
+    def read_FLOAT_to_EOI(self):
+        state, _ = self.run_automaton(FLOAT_AUTOMATON)
+        return self.peek_char1() == self.eoi and state in FLOAT_AUTOMATON.finals
+
+    #################################
+    ## Lecture de l'entrée: entiers, nombres, tokens
+
+    #Lecture d'un chiffre, puis avancée et renvoi de sa valeur
+    def read_digit(self):
+        current_char = self.peek_char1()
+        if current_char not in defs.DIGITS:
+            raise expected_digit_error(current_char)
+        value = eval(current_char)
+        self.consume_char()
+        return value
+
+    # Lecture d'un entier en renvoyant sa valeur
+    def read_INT(self):
+        "Fonction lisant un entier et renvoyant sa valeur"
+        state, start = self.run_automaton(INT_AUTOMATON)
+        if state not in INT_AUTOMATON.finals:
+            raise expected_digit_error(self._buffer[self._pos])
+        return int(self._buffer[start:self._pos])
+
+    # Lecture d'un nombre en renvoyant sa valeur: le lexème est reconnu par l'automate,
+    # puis converti en une fois. S'il s'arrête dans un état non final (1e+ par exemple),
+    # on garde le plus long préfixe reconnu ; s'il n'y en a pas, c'est une erreur.
+    def read_NUM(self):
+        state, start = self.run_automaton(NUM_AUTOMATON)
+        lexeme = self._buffer[start:self._pos]
+        if state not in NUM_AUTOMATON.finals:
+            prefix = accepted_prefix(NUM_AUTOMATON, lexeme)
+            if not prefix:
+                raise expected_number_error(lexeme + self._buffer[self._pos])
+            lexeme = prefix
+        return self.convert(lexeme)
+
+    # Parse un lexème (sans séparateurs) de l'entrée et renvoie son token.
+    # Cela consomme tous les caractères du lexème lu.
+    def read_token_after_separators(self):
+
+        char1 = self._buffer[self._pos]
+        if char1 == self.eoi:
+            self.consume_char()
+            return (defs.V_T.END,None)
+        if char1 in ['+', '-', '*', '/', '^', '!', '(', ')', ';']:
+            self.consume_char()
+            return (defs.TOKEN_MAP[char1],None)
+
+        if char1 == "#":
+            self.consume_char()
+            return (defs.V_T.CALC,self.read_INT())
+
+        return (defs.V_T.NUM,self.read_NUM())
+
+    # Donne le prochain token de l'entrée, en sautant les séparateurs éventuels en tête
+    # et en consommant les caractères du lexème reconnu.
+    def next_token(self):
+
+        sep = self.sep
+        while self._buffer[self._pos] in sep:
+            self.consume_char()
+
+        return self.read_token_after_separators()
+
+    # Position dans le flot du prochain token (après les séparateurs), et ce token
+    def next_token_offset(self):
+        sep = self.sep
+        while self._buffer[self._pos] in sep:
+            self.consume_char()
+        return self._offset + self._pos, self.next_token()
+
+    # Lit tous les tokens jusqu'à END et les renvoie sous forme de tableaux (voir Tokens).
+    # Une erreur du lexer est gardée, pour être levée quand le parser atteint le token fautif.
+    def tokenize(self):
+        tokens = Tokens(type(self.backend) is numeric.FloatBackend)
+        try:
+            while True:
+                offset, (token, value) = self.next_token_offset()
+                tokens.append(token, value, offset)
+                if token == defs.V_T.END:
+                    break
+        except LexerError as e:
+            tokens.error = e
+        return tokens
 
-    etats = ["q0","q1","q2","q3","puit"]
-    etat_finaux = ["q3"]
-    etat_init = "q0"
-    etat = etat_init
 
+#################################
+## Lexer par expression régulière
+## Même tampon, mêmes tokens et mêmes erreurs que Lexer, mais next_token reconnaît
+## les séparateurs et le token suivant avec une seule expression régulière.
+
+# Séparateurs puis un token, dont le groupe est m.lastindex (None si aucun token n'est reconnu).
+# Pour NUM, l'expression suit NUM_AUTOMATON jusqu'au puit, y compris dans ses états
+# non finaux: le lexème peut être un point seul, ou finir par un exposant incomplet (1e+).
+# Avec binary, l'expression s'applique à des octets (voir BytesLexer).
+OPERATOR, NUMBER, REFERENCE, END = 1, 2, 3, 4
+
+@functools.lru_cache(maxsize=None)
+def token_regex(eoi, sep, binary=False):
+    pattern = ("[" + re.escape("".join(sorted(sep))) + "]*"
+               r"(?:([-+*/^!();])"
+               r"|((?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][-+]?[0-9]*)?|\.)"
+               r"|#([0-9]*)"
+               "|(" + re.escape(eoi) + "))?")
+    return re.compile(pattern.encode('ascii') if binary else pattern)
+
+class RegexLexer(Lexer):
+
+    def __init__(self, stream=sys.stdin, eoi=None, block_size=None, line_buffered=None, backend=None):
+        super().__init__(stream, eoi, block_size, line_buffered, backend)
+        self._match = token_regex(self.eoi, frozenset(self.sep)).match
+        self._operators = {c: (defs.TOKEN_MAP[c], None) for c in '+-*/^!();'}
+        self._operator_kinds = {c: defs.TOKEN_MAP[c].value for c in '+-*/^!();'}
+
+    # Avance jusqu'à end. Comme pour Lexer, un caractère non supporté est une erreur
+    # dès qu'il entre dans la fenêtre des trois caractères de prévision.
+    def _advance(self, end):
+        self._pos = end
+        if 0 <= self._bad <= end + 2:
+            raise unsupported_error(self._bad_char)
+
+    # Caractère d'indice i du tampon, pour les messages d'erreur
+    def _char(self, i):
+        return self._buffer[i]
+
+    # Valeur d'un lexème NUM: s'il finit par un exposant incomplet, on garde la mantisse
+    # (le plus long préfixe reconnu) ; un point seul est une erreur.
+    def _number(self, lexeme, end):
+        if lexeme[-1] in 'eE+-':
+            lexeme = lexeme.rstrip('eE+-')
+        elif lexeme == '.':
+            raise expected_number_error('.' + self._char(end))
+        return (defs.V_T.NUM, self.convert(lexeme))
+
+    def next_token(self):
+        m = self._match(self._buffer, self._pos)
+        end = m.end()
+        if end + 2 < self._limit:
+            # cas courant: le lexème et les deux caractères qui le suivent sont dans le tampon,
+            # et aucun n'est un caractère non supporté
+            kind = m.lastindex
+            if kind == OPERATOR:
+                self._pos = end
+                return self._operators[m.group(1)]
+            if kind == NUMBER:
+                self._pos = end
+                return self._number(m.group(2), end)
+            if kind == REFERENCE and end > m.start(3):
+                self._pos = end
+                return (defs.V_T.CALC, int(m.group(3)))
+        return self._next_token_slow()
+
+    def next_token_offset(self):
+        m = self._match(self._buffer, self._pos)
+        kind = m.lastindex
+        if kind is None or m.end() + 2 >= self._limit:
+            # les séparateurs peuvent continuer dans le bloc suivant: on les saute un par un
+            return super().next_token_offset()
+        start = m.start(kind) - 1 if kind == REFERENCE else m.start(kind)
+        return self._offset + start, self.next_token()
+
+    # Comme Lexer.tokenize, mais les opérateurs et les nombres du cas courant
+    # sont rangés directement dans les tableaux, sans passer par next_token
+    def tokenize(self):
+        tokens = Tokens(type(self.backend) is numeric.FloatBackend)
+        kinds = tokens.kinds
+        offsets = tokens.offsets
+        match = self._match
+        operator_kinds = self._operator_kinds
+        num = defs.V_T.NUM.value
+        try:
+            while True:
+                m = match(self._buffer, self._pos)
+                end = m.end()
+                if end + 2 < self._limit:
+                    kind = m.lastindex
+                    if kind == OPERATOR:
+                        self._pos = end
+                        kinds.append(operator_kinds[m.group(1)])
+                        tokens.values.append(0)
+                        offsets.append(self._offset + end - 1)
+                        continue
+                    if kind == NUMBER:
+                        self._pos = end
+                        tokens.values.append(self._number(m.group(2), end)[1])
+                        kinds.append(num)
+                        offsets.append(self._offset + m.start(2))
+                        continue
+                offset, (token, value) = self.next_token_offset()
+                tokens.append(token, value, offset)
+                if token == defs.V_T.END:
+                    break
+        except LexerError as e:
+            tokens.error = e
+        return tokens
+
+    # Lecture de la suite de l'entrée si besoin, puis erreurs dans le même ordre que Lexer
+    def _next_token_slow(self):
+        while True:
+            m = self._match(self._buffer, self._pos)
+            end = m.end()
+            if end + 2 < self._length() or self._eoi_seen or self._bad >= 0:
+                break
+            self._mark = self._pos
+            self._fill()
+            self._mark = -1
+        self._limit = self._bad if self._bad >= 0 else self._length()
+        kind = m.lastindex
+        if kind is None:
+            self._advance(end)
+            raise expected_number_error(self._char(end))
+        if kind == REFERENCE:
+            start = m.start(3) - 1
+            self._advance(start + 1)
+        else:
+            self._advance(m.start(kind))
+        if kind == END:
+            return (defs.V_T.END, None)
+        self._advance(end)
+        if kind == OPERATOR:
+            return self._operators[m.group(1)]
+        if kind == NUMBER:
+            return self._number(m.group(2), end)
+        if end == start + 1:
+            raise expected_digit_error(self._char(end))
+        return (defs.V_T.CALC, int(m.group(3)))
 
-    while peek_char1() not in defs.EOI:
-        match etat:
-            case "q0":
-                match peek_char1():
 
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q2"
-                    case ".":
-                        etat = "q1"
-                    case _:
-                        etat = "puit"
+#################################
+## Lexer sur des octets
+## Les mêmes tokens que RegexLexer, lus directement dans des octets (bytes, ou un fichier
+## projeté en mémoire par mmap), sans les décoder ni les copier. Les caractères de V_C sont
+## en ASCII ; tout autre octet est un caractère non supporté. Les octets sont vérifiés
+## bloc par bloc, au fur et à mesure de l'analyse, comme les blocs lus par Lexer: les pages
+## d'un fichier projeté ne sont lues qu'au moment où le lexer les atteint.
+## Seuls next_token et tokenize sont disponibles (pas les fonctions caractère par caractère).
+
+class BytesLexer(RegexLexer):
+
+    # line_buffered n'a pas de sens ici: il est accepté pour être appelé comme les autres lexers
+    def __init__(self, data, eoi=None, block_size=None, line_buffered=None, backend=None):
+        self._init_state(eoi, block_size, backend)
+        self._bad_byte = re.compile(b"[^" + re.escape("".join(sorted(self.V)).encode('ascii')) + b"]").search
+        self._eoi_byte = self.eoi.encode('ascii')
+        self._buffer = data     # le tampon est l'entrée entière
+        self._scanned = 0       # octets déjà vérifiés
+        self._match = token_regex(self.eoi, frozenset(self.sep), True).match
+        self._operators = {c.encode('ascii'): (defs.TOKEN_MAP[c], None) for c in '+-*/^!();'}
+        self._operator_kinds = {c.encode('ascii'): defs.TOKEN_MAP[c].value for c in '+-*/^!();'}
+        self._check_window()
+
+    # Vérifie le bloc suivant, sans rien lire au delà de EOI
+    def _fill(self):
+        data = self._buffer
+        start = self._scanned
+        if start >= len(data):
+            # fin des données sans EOI
+            self._bad = len(data)
+            self._bad_char = ''
+            return
+        end = min(start + self.block_size, len(data))
+        eoi = data.find(self._eoi_byte, start, end)
+        if eoi >= 0:
+            end = eoi + 1
+            self._eoi_seen = True
+        bad = self._bad_byte(data, start, end)
+        if bad:
+            self._bad = bad.start()
+            # le caractère UTF-8 commençant à cet octet, comme le lirait un flot de texte
+            self._bad_char = bytes(data[self._bad:self._bad+4]).decode('utf-8', 'replace')[0]
+        self._scanned = end
+
+    def chars_read(self):
+        return self._scanned
+
+    # Comme Lexer, qui complète le tampon par deux EOI après EOI
+    def _length(self):
+        return self._scanned + 2 if self._eoi_seen else self._scanned
+
+    def _char(self, i):
+        return chr(self._buffer[i])
+
+    # Le lexème est converti depuis l'ASCII: seuls ses quelques octets sont décodés
+    def _number(self, lexeme, end):
+        return super()._number(lexeme.decode('ascii'), end)
+
+    # Tous les octets sont dans le tampon: seuls les blocs à vérifier sont à lire
+    def next_token_offset(self):
+        while True:
+            m = self._match(self._buffer, self._pos)
+            if m.end() + 2 < self._length() or self._eoi_seen or self._bad >= 0:
+                break
+            self._fill()
+        kind = m.lastindex
+        if kind is None:
+            return m.end(), self.next_token()
+        return (m.start(kind) - 1 if kind == REFERENCE else m.start(kind)), self.next_token()
 
-            case "q1":
-                match peek_char1():
 
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q3"
-                    case _:
-                        etat = "puit"
+#################################
+## Lexer alimenté par morceaux
+## Au lieu de lire son flot, le lexer reçoit l'entrée par feed(chunk), morceau par morceau
+## (tampons réseau, boucle d'événements, ...), et renvoie à chaque fois les tokens terminés.
+## Il lit les tokens comme Lexer (ou RegexLexer), avec la même fenêtre de trois caractères:
+## quand un token a besoin de caractères pas encore reçus (12.5e en attendant -3, ou
+## simplement les deux caractères qui suivent le token), sa lecture est abandonnée et
+## reprise depuis son début au prochain morceau. Le tampon garde donc le token en cours.
+## Pour que chaque caractère ne soit lu qu'une fois, même reçu octet par octet, les
+## séparateurs sont consommés pour de bon avant le token, et la fin d'un token long
+## (nombre, #n) est cherchée par son automate, repris là où le morceau précédent l'a laissé:
+## le token n'est relu qu'une fois tous ses caractères reçus.
+
+# Premiers caractères d'un nombre (voir NUM_AUTOMATON)
+NUM_FIRST = defs.DIGITS | {'.'}
+
+# Levée par PushLexer._fill quand les caractères reçus ne suffisent pas (interne au lexer)
+class NeedMoreData(Exception):
+    pass
 
-            case "q2":
-                match peek_char1():
+class PushLexer(Lexer):
+
+    def __init__(self, eoi=None, backend=None):
+        self._init_state(eoi, None, backend)
+        self._read = self._next_chunk
+        self._chunks = []       # morceaux reçus, pas encore dans le tampon
+        self._closed = False    # fin de l'entrée annoncée par close()
+        self._start = 0         # position dans le flot du token en cours de lecture
+        self._scan = None       # (automate, état, position dans le flot) de la fin du token cherchée
+        self.finished = False   # END a été renvoyé
+        self.error = None       # erreur du lexer, levée à nouveau par les appels suivants
+
+    # Les morceaux reçus ; '' si l'entrée est finie (comme un flot vide)
+    def _next_chunk(self, size):
+        if self._chunks:
+            block = ''.join(self._chunks)
+            self._chunks.clear()
+            return block
+        if self._closed:
+            return ''
+        raise NeedMoreData()
+
+    # Le tampon garde le token en cours depuis son début, pour pouvoir le relire
+    def _cut(self):
+        return self._start - self._offset
+
+    # Saute les séparateurs en tête, comme next_token, mais en les oubliant au fur et
+    # à mesure: une reprise au prochain morceau ne les relit pas
+    def _skip_separators(self):
+        sep = self.sep
+        while self._buffer[self._pos] in sep:
+            self._pos += 1
+            self._start = self._offset + self._pos
+            if self._pos + 2 >= self._limit:
+                self._check_window()
+
+    # Attend que le token commençant à _pos, et les deux caractères qui le suivent, soient
+    # dans le tampon. Pour un nombre ou #n, l'automate avance sur les caractères reçus
+    # depuis le morceau précédent seulement ; les autres tokens n'ont qu'un caractère.
+    def _wait_token(self):
+        if self._scan is None:
+            c = self._buffer[self._pos]
+            if c == '#':
+                automaton, i = INT_AUTOMATON, self._pos + 1
+            elif c in NUM_FIRST:
+                automaton, i = NUM_AUTOMATON, self._pos
+            else:
+                return
+            self._scan = (automaton, automaton.initial, self._offset + i)
+        automaton, state, i = self._scan
+        table = automaton.table
+        eoi = self.eoi
+        while True:
+            buffer = self._buffer
+            i -= self._offset
+            length = len(buffer)
+            while i < length:
+                c = buffer[i]
+                if c == eoi:
+                    break
+                o = ord(c)
+                next_state = table[state + (CHAR_CLASS[o] if o < 128 else C_AUTRE)]
+                if next_state == PUIT:
+                    break
+                state = next_state
+                i += 1
+            if i + 2 < length or self._eoi_seen or self._bad >= 0:
+                break
+            self._scan = (automaton, state, self._offset + i)
+            self._fill()
+            self._check_window()
+            i = self._scan[2]
+        self._scan = None
+
+    # Tokens terminés avec les caractères reçus. Une erreur est levée tout de suite
+    # si aucun token n'a été terminé avant elle ; sinon, par l'appel suivant.
+    def _tokens(self):
+        tokens = []
+        try:
+            self._check_window()
+            while not self.finished:
+                self._skip_separators()
+                self._start = self._offset + self._pos
+                self._wait_token()
+                token = self.next_token()
+                tokens.append(token)
+                self.finished = token[0] == defs.V_T.END
+        except NeedMoreData:
+            # reprise au début du token au prochain morceau
+            self._pos = self._start - self._offset
+            self._mark = -1
+        except LexerError as e:
+            self.error = e
+            if not tokens:
+                raise
+        return tokens
+
+    # Ajoute le morceau chunk à l'entrée ; renvoie la liste des tokens terminés depuis
+    # l'appel précédent (vide s'il faut d'autres caractères). Après END, rien n'est lu.
+    def feed(self, chunk):
+        if self.error is not None:
+            raise self.error
+        if self.finished:
+            return []
+        if chunk:
+            self._chunks.append(chunk)
+        return self._tokens()
+
+    # Fin de l'entrée: renvoie les derniers tokens. Sans EOI, c'est l'erreur de Lexer
+    # pour un flot fini avant EOI (caractère '' non supporté).
+    def close(self):
+        if self.error is not None:
+            raise self.error
+        self._closed = True
+        if self.finished:
+            return []
+        return self._tokens()
+
+
+# Même lecture par morceaux, avec l'expression régulière de RegexLexer
+class RegexPushLexer(PushLexer, RegexLexer):
+
+    def __init__(self, eoi=None, backend=None):
+        super().__init__(eoi, backend)
+        self._match = token_regex(self.eoi, frozenset(self.sep)).match
+        self._operators = {c: (defs.TOKEN_MAP[c], None) for c in '+-*/^!();'}
+        self._operator_kinds = {c: defs.TOKEN_MAP[c].value for c in '+-*/^!();'}
 
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q2"
-                    case ".":
-                        etat = "q3"
-                    case _ :
-                        etat = "puit"
 
-            case "q3":
-                match peek_char1():
+#################################
+## Tokens lus d'avance
+## Les tokens d'une entrée sont rangés dans trois tableaux parallèles: leurs types (V_T.value),
+## leurs attributs (0 si aucun) et leur position dans le flot. Aucun tuple n'est gardé par token,
+## et le résultat peut être conservé (ou sérialisé) pour analyser plusieurs fois la même entrée.
+
+# Plus grand indice #n gardé dans un tableau de flottants
+MAX_EXACT_INDEX = 1 << 53
+
+KINDS = tuple(defs.V_T)
+
+class Tokens:
+    __slots__ = ('kinds', 'values', 'offsets', 'error')
+
+    # Les attributs sont des flottants (float_values), ou des objets quelconques
+    # pour les autres représentations des nombres
+    def __init__(self, float_values=True):
+        self.kinds = array.array('B')
+        self.values = array.array('d') if float_values else []
+        self.offsets = array.array('Q')
+        self.error = None  # LexerError levée après le dernier token (None si l'entrée finit par END)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    # Ajoute un token, tel que renvoyé par next_token, et sa position dans le flot
+    def append(self, token, value, offset):
+        if value is None:
+            value = 0
+        elif token == defs.V_T.CALC and value > MAX_EXACT_INDEX and type(self.values) is not list:
+            self.values = list(self.values)  # indice non représentable exactement par un flottant
+        self.kinds.append(token.value)
+        self.values.append(value)
+        self.offsets.append(offset)
+
+    # Le i-ème token, tel que renvoyé par next_token
+    def token(self, i):
+        kind = KINDS[self.kinds[i]]
+        if kind == defs.V_T.NUM:
+            return (kind, self.values[i])
+        if kind == defs.V_T.CALC:
+            return (kind, int(self.values[i]))
+        return (kind, None)
+
+    def __iter__(self):
+        return map(self.token, range(len(self.kinds)))
+
+    def reader(self):
+        return TokenReader(self)
+
+    def __repr__(self):
+        return "Tokens({0} tokens{1})".format(len(self.kinds), ", " + repr(self.error) if self.error else "")
+
+# Lecture des tokens par leur indice: un TokenReader remplace un lexer pour les parsers
+class TokenReader:
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0  # indice du prochain token
+        self._kinds = tokens.kinds
+        self._values = tokens.values
+
+    def next_token(self):
+        i = self.index
+        if i == len(self._kinds):
+            if self.tokens.error is not None:
+                raise self.tokens.error
+            return (defs.V_T.END, None)  # comme un lexer, qui ne lit rien au delà de EOI
+        self.index = i + 1
+        kind = KINDS[self._kinds[i]]
+        if kind is defs.V_T.NUM:
+            return (kind, self._values[i])
+        if kind is defs.V_T.CALC:
+            return (kind, int(self._values[i]))
+        return (kind, None)
+
+    # Position dans le flot du dernier token renvoyé
+    def offset(self):
+        return self.tokens.offsets[self.index - 1]
+
+    # Les caractères ont été lus par tokenize_all, pas par le lecteur
+    def chars_read(self):
+        return 0
 
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q3"
-                    case _ :
-                        etat = "puit"
 
-            case "puit": 
-                etat = "puit"
+#################################
+## Lexer par défaut et fonctions du module
+## Les fonctions ci-dessous s'appliquent au lexer créé par le dernier appel à reinit.
+
+# Les lexers disponibles, et celui que make_lexer crée par défaut
+LEXERS = {
+    'automaton': Lexer,
+    'regex': RegexLexer,
+}
+KIND = 'automaton'
+
+# Les lexers alimentés par morceaux, de même type que ceux de LEXERS
+PUSH_LEXERS = {
+    'automaton': PushLexer,
+    'regex': RegexPushLexer,
+}
+
+# Entrées lues par BytesLexer plutôt que comme un flot de caractères
+BINARY_INPUTS = (bytes, bytearray, memoryview, mmap.mmap)
+
+# Nouveau lexer de type kind (KIND par défaut), avec les options de Lexer ;
+# sur des octets (un fichier projeté en mémoire par exemple), c'est toujours un BytesLexer
+def make_lexer(stream=sys.stdin, kind=None, **options):
+    if isinstance(stream, BINARY_INPUTS):
+        return BytesLexer(stream, **options)
+    return LEXERS[KIND if kind is None else kind](stream, **options)
+
+# Nouveau lexer alimenté par morceaux (voir PushLexer), de type kind
+def make_push_lexer(kind=None, eoi=None, backend=None):
+    return PUSH_LEXERS[KIND if kind is None else kind](eoi, backend)
+
+# Tous les tokens du flot jusqu'à END (voir Tokens), lus par un lexer de make_lexer
+def tokenize_all(stream=sys.stdin, kind=None, **options):
+    return make_lexer(stream, kind, **options).tokenize()
+
+_lexer = None
 
-        consume_char()
-    
-    return (etat in etat_finaux) 
+# Initialisation de l'entrée
+def reinit(stream=sys.stdin, kind=None):
+    global _lexer
+    _lexer = make_lexer(stream, kind)
 
+def peek_char3():
+    return _lexer.peek_char3()
 
-#################################
-## Lecture de l'entrée: entiers, nombres, tokens
+def peek_char1():
+    return _lexer.peek_char1()
 
-#Lecture d'un chiffre, puis avancée et renvoi de sa valeur
-def read_digit():
-    current_char = peek_char1()
-    if current_char not in defs.DIGITS:
-        raise expected_digit_error(current_char)
-    value = eval(current_char)
-    consume_char()
-    return value
+def consume_char():
+    _lexer.consume_char()
 
+def read_INT_to_EOI():
+    return _lexer.read_INT_to_EOI()
+
+def read_FLOAT_to_EOI():
+    return _lexer.read_FLOAT_to_EOI()
+
+def read_digit():
+    return _lexer.read_digit()
 
-# Lecture d'un entier en renvoyant sa valeur
 def read_INT():
-    "Fonction lisant un entier et renvoyant sa valeur"
-    current_char = peek_char1()
-    if current_char not in defs.DIGITS:
-        raise expected_digit_error(current_char1)
-
-    value = 0
-    # On continue jusqu'à ce qu'on trouve un EOI
-    while current_char in defs.DIGITS:
-        digit = read_digit()   # lit + consomme un chiffre
-        value = value * 10 + digit 
-        current_char = peek_char1()
-    return value
-
-global int_value
-global exp_value
-global sign_value
-
-# Lecture d'un nombre en renvoyant sa valeur
+    return _lexer.read_INT()
+
 def read_NUM():
+    return _lexer.read_NUM()
 
-    etats = ["q0","q1","q2","q3","q4","q5","q6","puit"]
-    etat_finaux = ["q2","q3","q6"]
-    etat_init = "q0"
-    etat = etat_init
-
-    max = "" #Pour stocker le lexème  de taille maximal reconnu pour l'instant
-
-    mantisse = 0.0 
-    exposant_signe = None
-    exposant_valeur = 0.0
-
-    div = 0.1  #Pour la partie après la virgule, on divisera par 10 à chaque chiffre lu
-
-    while peek_char1() not in defs.EOI and etat != "puit": #etat != "puit" pour s'arrêter dès qu'on est dans le puit et ne pas consomer + que le max sinon on "mange" les prochains lexèmes, problématique pour la fonction next_token
-        #On traite les états et chacune de leurs transitions une à une
-        match etat:
-            case "q0":
-                match peek_char1():
-
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q3"
-                        mantisse = mantisse * 10 + float(peek_char1()) #On ajoute la valeur du nouveau chiffre en "décalant" la mantisse sur la gauche (*10)
-                    case ".":
-                        etat = "q1"
-                    case _:
-                        etat = "puit"
-
-            case "q1":
-                match peek_char1():
-
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q2"
-                        mantisse = mantisse + float(peek_char1())*div
-                        div = div/10 #On divise par 10 pour le prochain chiffre après la virgule
-                    case _:
-                        etat = "puit"
-
-            case "q2":
-                match peek_char1():
-
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q2"
-                        mantisse = mantisse + float(peek_char1())*div
-                        div = div/10
-                    case "E"|"e":
-                        etat = "q4"
-                        exposant_signe = "+" 
-                    case _:
-                        etat = "puit"
-
-            case "q3":
-                match peek_char1():
-
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q3"
-                        mantisse = mantisse * 10 + float(peek_char1())
-                    case ".":
-                        etat = "q2"
-                    case "E"|"e":
-                        etat = "q4"
-                        exposant_signe = "+" 
-                    case _:
-                        etat = "puit"
-            
-            case "q4":
-                match peek_char1():
-
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q6"
-                        exposant_valeur = exposant_valeur*10 + float(peek_char1())
-                    case "+":
-                        etat = "q5"
-                        exposant_signe = "+"
-                    case "-":
-                        etat = "q5"
-                        exposant_signe = "-"
-                    case _:
-                        etat = "puit"
-
-            case "q5":
-                match peek_char1():
-
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q6"
-                        exposant_valeur = exposant_valeur*10 + float(peek_char1())
-                    case _:
-                        etat = "puit"
-
-            case "q6":
-                match peek_char1():
-
-                    case "0"|"1"|"2"|"3"|"4"|"5"|"6"|"7"|"8"|"9":
-                        etat = "q6"
-                        exposant_valeur = exposant_valeur*10 + float(peek_char1())
-                    case _:
-                        etat = "puit"
-
-            case "puit": 
-                etat = "puit"
-
-        if etat != "puit":
-            consume_char()
-        
-        if (etat in etat_finaux):
-            max = max + peek_char1()
-
-    if exposant_signe == "+":
-        exposant_signe = 1
-    if exposant_signe == "-":
-        exposant_signe = -1
-    if exposant_signe == None:
-        exposant_signe = 0
-    return (mantisse) * (10**(exposant_signe*exposant_valeur))
-
-
-# Parse un lexème (sans séparateurs) de l'entrée et renvoie son token.
-# Cela consomme tous les caractères du lexème lu.
 def read_token_after_separators():
+    return _lexer.read_token_after_separators()
 
-    char1 = peek_char1()
-    if char1 in defs.EOI:
-        consume_char()
-        return (defs.V_T.END,None)
-    if char1 in ['+', '-', '*', '/', '^', '!', '(', ')', ';']:
-        consume_char()
-        return (defs.TOKEN_MAP[char1],None)
-
-    if char1 == "#":
-        consume_char()
-        return (defs.V_T.CALC,read_INT())
-        
-    return (defs.V_T.NUM,read_NUM())
-
-# Donne le prochain token de l'entrée, en sautant les séparateurs éventuels en tête
-# et en consommant les caractères du lexème reconnu.
 def next_token():
-
-    while peek_char1() in defs.SEP:
-        consume_char()
-
-    return read_token_after_separators()
+    return _lexer.next_token()
 
 
 #################################
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : représentations des nombres de la calculatrice (float, Decimal, Fraction)
+"""
+
+import sys
+import decimal
+import functools
+import operator
+import contextlib
+from fractions import Fraction
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+import power
+from definitions import V_T
+
+#####
+# Une représentation des nombres fournit:
+# - convert(lexeme): la valeur d'un lexème NUM, convertie en une seule fois
+# - pow(n, n_1): la puissance (les autres opérations sont celles de Python)
+# - scope(): le contexte dans lequel les calculs sont faits (contexte decimal, ...)
+# Les valeurs de factorial et des références #n restent celles de Python.
+
+class FloatBackend:
+    name = 'float'
+
+    # float() arrondit correctement, contrairement à la somme chiffre à chiffre
+    def convert(self, lexeme):
+        return float(lexeme)
+
+    def pow(self, n, n_1):
+        return power.power(n, n_1)
+
+    def scope(self):
+        return contextlib.nullcontext()
+
+    @functools.cached_property
+    def operators(self):
+        return {
+            V_T.ADD: operator.add,
+            V_T.SUB: operator.sub,
+            V_T.MUL: operator.mul,
+            V_T.DIV: operator.truediv,
+            V_T.POW: self.pow,
+        }
+
+    def __repr__(self):
+        return self.name
+
+
+# Décimaux, avec la précision et les arrondis du contexte donné (28 chiffres par défaut)
+class DecimalBackend(FloatBackend):
+    name = 'decimal'
+
+    def __init__(self, context=None):
+        self.context = decimal.Context() if context is None else context
+
+    def convert(self, lexeme):
+        return self.context.create_decimal(lexeme)
+
+    def scope(self):
+        return decimal.localcontext(self.context)
+
+    def __repr__(self):
+        return "decimal(prec={0})".format(self.context.prec)
+
+
+# Rationnels exacts. Une puissance d'exposant non entier donne un flottant, comme en Python.
+class FractionBackend(FloatBackend):
+    name = 'fraction'
+
+    def convert(self, lexeme):
+        return Fraction(lexeme)
+
+    # Un exposant entier (Fraction de dénominateur 1) est passé comme int, pour que
+    # power.GUARD vérifie le coût du calcul exact ; un entier (n! par exemple) à une
+    # puissance négative reste exact, comme avec Fraction.__rpow__.
+    def pow(self, n, n_1):
+        if isinstance(n_1, Fraction) and n_1.denominator == 1:
+            n_1 = int(n_1)
+            if type(n) is int and n_1 < 0:
+                n = Fraction(n)
+        return power.power(n, n_1)
+
+
+FLOAT = FloatBackend()
+BACKENDS = {
+    'float': FloatBackend,
+    'decimal': DecimalBackend,
+    'fraction': FractionBackend,
+}
+
+# La représentation de nom name (ou déjà construite)
+def backend(name=None):
+    if name is None:
+        return FLOAT
+    if isinstance(name, str):
+        try:
+            return BACKENDS[name]()
+        except KeyError:
+            raise ValueError("unknown numeric backend " + repr(name)) from None
+    return name
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : optimisation des programmes (propagation des constantes)
+            et analyse des dépendances entre calculs par les références #n
+"""
+
+import sys
+from decimal import Decimal
+from fractions import Fraction
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+import tree
+import numeric
+from tree import Num, Ref, Neg, Fact, BinOp
+
+# Valeurs gardées dans l'arbre
+NUMBERS = (int, float, Decimal, Fraction)
+
+#####
+# Propagation des constantes
+
+# Remplace node, dont les fils sont déjà simplifiés, par sa valeur s'ils sont tous constants.
+# Si le calcul échoue (division par zéro, ...), on garde le noeud: l'erreur sera levée
+# à l'évaluation, au même moment que sans optimisation.
+# Avec une représentation des nombres backend, l'appelant active son contexte.
+def fold_node(node, backend=None):
+    if type(node) is BinOp:
+        constant = type(node.left) is Num and type(node.right) is Num
+    else:
+        constant = type(node.operand) is Num
+    if not constant:
+        return node
+    try:
+        value = tree.evaluate(node, (), backend)
+    except (ArithmeticError, ValueError, TypeError):
+        return node
+    if not isinstance(value, NUMBERS):
+        return node  # résultat complexe, par exemple
+    return Num(value)
+
+# Renvoie l'arbre ast où les sous-arbres constants sont remplacés par leur valeur.
+# Si length est donné (nombre de valeurs de l'historique avant ce calcul), les références
+# #i sont de plus remplacées par des références absolues: #0 désigne par exemple
+# le calcul précédent, comme history[-1] dans calc.py.
+def fold_constants(ast, length=None, backend=None):
+    done = []
+    todo = [ast]
+    while todo:
+        node = todo.pop()
+        t = type(node)
+        if t is Num:
+            done.append(node)
+        elif t is Ref:
+            done.append(Ref(absolute_index(node.index, length) or node.index)
+                        if length is not None else node)
+        elif t is tuple:
+            # (noeud,): ses fils sont simplifiés, en haut de done
+            node = node[0]
+            if type(node) is BinOp:
+                right = done.pop()
+                done[-1] = fold_node(BinOp(node.op, done[-1], right), backend)
+            else:
+                done[-1] = fold_node(type(node)(done[-1]), backend)
+        elif t is BinOp:
+            todo.append((node,))
+            todo.append(node.right)
+            todo.append(node.left)
+        elif t is Neg or t is Fact:
+            todo.append((node,))
+            todo.append(node.operand)
+        else:
+            raise TypeError("Unknown node " + repr(node))
+    return done[0]
+
+
+#####
+# Dépendances entre calculs
+
+# Numéro (à partir de 1) du calcul désigné par #i quand l'historique contient length valeurs,
+# ou None si la référence est invalide
+def absolute_index(i, length):
+    if -length <= i - 1 < length:
+        return (i - 1) % length + 1
+    return None
+
+# Les indices i des références #i de l'arbre ast
+def references(ast):
+    found = []
+    todo = [ast]
+    while todo:
+        node = todo.pop()
+        t = type(node)
+        if t is Ref:
+            found.append(node.index)
+        elif t is BinOp:
+            todo.append(node.right)
+            todo.append(node.left)
+        elif t is Neg or t is Fact:
+            todo.append(node.operand)
+    return found
+
+# Résultat de l'analyse d'un programme dont le premier calcul porte le numéro start+1
+class Analysis:
+
+    def __init__(self, program, start=0):
+        self.start = start
+        self.numbers = list(range(start + 1, start + len(program) + 1))
+        # pour chaque calcul, les calculs du programme dont il dépend directement
+        self.deps = {}
+        # calculs contenant une référence invalide (ils lèveront une erreur)
+        self.invalid = []
+        for n, ast in zip(self.numbers, program):
+            deps = set()
+            for i in references(ast):
+                j = absolute_index(i, n - 1)
+                if j is None:
+                    self.invalid.append(n)
+                elif j > start:
+                    deps.add(j)
+            self.deps[n] = deps
+        self.independent = [n for n in self.numbers if not self.deps[n]]
+        self.levels = self.compute_levels()
+        self.components = self.compute_components()
+
+    # Niveaux: un calcul ne dépend que de calculs des niveaux précédents,
+    # si bien que les calculs d'un même niveau peuvent être évalués en même temps
+    def compute_levels(self):
+        level = {}
+        levels = []
+        for n in self.numbers:
+            k = 1 + max((level[j] for j in self.deps[n]), default=-1)
+            level[n] = k
+            if k == len(levels):
+                levels.append([])
+            levels[k].append(n)
+        return levels
+
+    # Composantes connexes du graphe des dépendances (union-find):
+    # deux composantes différentes peuvent être évaluées indépendamment
+    def compute_components(self):
+        parent = {n: n for n in self.numbers}
+        def find(n):
+            while parent[n] != n:
+                parent[n] = parent[parent[n]]
+                n = parent[n]
+            return n
+        for n in self.numbers:
+            for j in self.deps[n]:
+                parent[find(n)] = find(j)
+        components = {}
+        for n in self.numbers:
+            components.setdefault(find(n), []).append(n)
+        return list(components.values())
+
+    # Nombre moyen de calculs évaluables en même temps
+    def parallelism(self):
+        return len(self.numbers) / len(self.levels) if self.levels else 0.0
+
+    def report(self):
+        lines = ["calculs: {0}".format(len(self.numbers)),
+                 "indépendants: {0}".format(len(self.independent)),
+                 "composantes: {0}".format(len(self.components)),
+                 "niveaux: {0} (au plus {1} calculs par niveau)".format(
+                     len(self.levels), max((len(l) for l in self.levels), default=0)),
+                 "parallélisme moyen: {0:.2f}".format(self.parallelism())]
+        if self.invalid:
+            lines.append("calculs avec une référence invalide: " + ", ".join(str(n) for n in self.invalid))
+        return "\n".join(lines)
+
+# Programme optimisé (constantes propagées, références absolues) et son analyse
+def optimize(program, start=0, backend=None):
+    backend = numeric.backend(backend)
+    with backend.scope():
+        folded = [fold_constants(ast, start + k, backend) for k, ast in enumerate(program)]
+    return folded, Analysis(program, start)
+
+
+#####################################
+## Test depuis la ligne de commande
+
+if __name__ == "__main__":
+    print("@ Analysing a calculator program in infix syntax.")
+    program, analysis = optimize(tree.parse())
+    for ast in program:
+        print("@", repr(ast))
+    print(analysis.report())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : évaluation en parallèle des calculs indépendants d'un programme
+"""
+
+import os
+import sys
+import pickle
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+import tree
+import numeric
+import optimize
+
+#####
+# Les calculs sont d'abord tous analysés (tree.py), puis répartis par composantes
+# connexes du graphe des dépendances (optimize.py): une composante ne référence
+# aucun calcul d'une autre, et peut donc être évaluée dans un autre processus.
+# Les erreurs de syntaxe sont donc signalées avant les erreurs d'évaluation.
+# Ce processus ne fait aucun calcul: la propagation des constantes, qui calcule les
+# sous-arbres constants (300!, 2^1000, ...), est faite par les processus du pool.
+
+# Nombre de tâches par processus, pour équilibrer les composantes de tailles différentes
+TASKS_PER_WORKER = 4
+
+# Évalue dans l'ordre une liste de (numéro, arbre), après propagation des constantes
+# et passage aux références absolues ; renvoie les valeurs calculées et, si un calcul
+# échoue, son numéro et l'exception.
+# Les calculs d'une composante étant dans l'ordre, le premier qui échoue est le plus petit.
+def evaluate_statements(task, backend):
+    values = {}  # values[n-1] = valeur du calcul n, comme history[n-1]
+    with backend.scope():
+        for n, ast in task:
+            try:
+                ast = optimize.fold_constants(ast, n - 1, backend)
+                values[n-1] = tree.evaluate(ast, values, backend)
+            except Exception as e:
+                return values, n, e
+    return values, None, None
+
+# Exécutée dans un processus du pool
+def evaluate_task(data):
+    return evaluate_statements(*pickle.loads(data))
+
+# Regroupe les composantes en au plus count tâches de tailles voisines
+def make_tasks(components, program, count):
+    tasks = [[] for _ in range(min(count, len(components)))]
+    sizes = [0] * len(tasks)
+    for component in sorted(components, key=len, reverse=True):
+        k = sizes.index(min(sizes))
+        tasks[k].extend(component)
+        sizes[k] += len(component)
+    return [[(n, program[n-1]) for n in sorted(task)] for task in tasks]
+
+# Ajoute le résultat d'une tâche aux valeurs et aux erreurs déjà obtenues
+def merge(result, values, errors):
+    task_values, n, e = result
+    values.update(task_values)
+    if n is not None:
+        errors.append((n, e))
+
+# Évalue la liste d'arbres program ; renvoie la liste de leurs valeurs, dans l'ordre,
+# ou lève l'erreur du premier calcul qui échoue, comme tree.evaluate_program.
+# Dès qu'un calcul n échoue, seules les tâches commençant avant n sont attendues:
+# les autres ne peuvent pas échouer plus tôt.
+def evaluate_program(program, workers=None, executor=None, backend=None):
+    backend = numeric.backend(backend)
+    analysis = optimize.Analysis(program)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if analysis.invalid or len(analysis.components) < 2 or workers < 2:
+        return tree.evaluate_program(program, backend=backend)
+
+    values = {}
+    errors = []
+    pending = {}  # tâche en cours -> numéro de son premier calcul
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for task in make_tasks(analysis.components, program, workers * TASKS_PER_WORKER):
+            try:
+                data = pickle.dumps((task, backend))
+            except RecursionError:
+                # arbre trop profond pour pickle: évalué dans ce processus
+                merge(evaluate_statements(task, backend), values, errors)
+            else:
+                pending[executor.submit(evaluate_task, data)] = task[0][0]
+        while pending:
+            if errors:
+                first = min(n for n, e in errors)
+                pending = {future: n for future, n in pending.items() if n < first}
+                if not pending:
+                    break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                del pending[future]
+                merge(future.result(), values, errors)
+    finally:
+        if own_executor:
+            # les tâches qui ne peuvent plus changer le résultat ne sont pas attendues
+            executor.shutdown(wait=not errors, cancel_futures=True)
+
+    if errors:
+        raise min(errors, key=lambda error: error[0])[1]
+    return [values[n-1] for n in analysis.numbers]
+
+
+#####################################
+## Fonction principale: la liste des valeurs des calculs du flot
+
+def parse(stream=sys.stdin, workers=None, executor=None, backend=None):
+    backend = numeric.backend(backend)
+    return evaluate_program(tree.parse(stream, backend), workers, executor, backend)
+
+
+#####################################
+## Test depuis la ligne de commande
+
+if __name__ == "__main__":
+    print("@ Testing the calculator in infix syntax (parallel).")
+    result = parse()
+    print("@ result = ", repr(result))
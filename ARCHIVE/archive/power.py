@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : puissance (POW) avec estimation du coût et limites configurables
+"""
+
+import sys
+import math
+import time
+from fractions import Fraction
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+# Limites par défaut: taille du résultat (en bits) et temps de calcul estimé (en secondes)
+MAX_BITS = 1 << 26
+MAX_SECONDS = 2.0
+
+# Modes, quand le résultat exact dépasse les limites:
+# - EXACT: on lève PowerLimitError
+# - FLOAT: on calcule en flottants (PowerLimitError si le flottant déborde)
+# - LOG: on calcule en flottants, et en LogNumber si le flottant déborde
+EXACT, FLOAT, LOG = 'exact', 'float', 'log'
+
+class PowerLimitError(ArithmeticError):
+    pass
+
+
+#####
+# Nombres trop grands pour un flottant, représentés par leur signe et le log10
+# de leur valeur absolue. Les opérations de la calculatrice y sont approchées.
+
+def to_log(x):
+    if isinstance(x, LogNumber):
+        return x.sign, x.log10
+    if x == 0:
+        return 0, -math.inf
+    return (1 if x > 0 else -1), math.log10(abs(x))
+
+# Un flottant si la valeur est représentable, un LogNumber sinon
+def log_number(sign, log10):
+    if sign == 0:
+        return 0.0
+    if -300 < log10 < 300:
+        return sign * 10.0**log10
+    return LogNumber(sign, log10)
+
+class LogNumber:
+    __slots__ = ('sign', 'log10')
+
+    def __init__(self, sign, log10):
+        self.sign = sign
+        self.log10 = log10
+
+    def __repr__(self):
+        e = math.floor(self.log10)
+        return "LogNumber({0}{1:.6f}e{2:+d})".format('-' if self.sign < 0 else '', 10**(self.log10 - e), e)
+
+    def __eq__(self, other):
+        return to_log(self) == to_log(other)
+
+    def __float__(self):
+        return self.sign * 10.0**self.log10  # OverflowError si trop grand
+
+    def __int__(self):
+        return int(float(self))
+
+    def __neg__(self):
+        return LogNumber(-self.sign, self.log10)
+
+    def __abs__(self):
+        return LogNumber(abs(self.sign), self.log10)
+
+    def __mul__(self, other):
+        s1, l1 = to_log(self)
+        s2, l2 = to_log(other)
+        return log_number(s1 * s2, l1 + l2)
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        s1, l1 = to_log(self)
+        s2, l2 = to_log(other)
+        if s2 == 0:
+            raise ZeroDivisionError("division by zero")
+        return log_number(s1 * s2, l1 - l2)
+
+    def __rtruediv__(self, other):
+        return LogNumber(*to_log(other)) / self
+
+    def __add__(self, other):
+        s1, l1 = to_log(self)
+        s2, l2 = to_log(other)
+        if l1 < l2:
+            s1, l1, s2, l2 = s2, l2, s1, l1
+        if s2 == 0:
+            return log_number(s1, l1)
+        # |a| >= |b|: |a + b| = |a| * (1 ± 10**(l2 - l1))
+        r = 1 + s1 * s2 * 10**(l2 - l1)
+        if r == 0:
+            return 0.0
+        return log_number(s1, l1 + math.log10(r))
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self + -LogNumber(*to_log(other)) if isinstance(other, LogNumber) else self + -other
+
+    def __rsub__(self, other):
+        return -self + other
+
+    def __pow__(self, other):
+        return power(self, other)
+
+    def __rpow__(self, other):
+        return power(other, self)
+
+
+#####
+# La puissance
+
+# Temps d'une multiplication d'entiers de REF_BITS bits, mesuré à la première utilisation
+REF_BITS = 1 << 16
+_ref_seconds = None
+
+def multiplication_time(bits):
+    global _ref_seconds
+    if _ref_seconds is None:
+        x = (1 << REF_BITS) - 1
+        start = time.perf_counter()
+        x * x
+        _ref_seconds = max(time.perf_counter() - start, 1e-6)
+    # Karatsuba: de l'ordre de bits**1.6
+    return _ref_seconds * (bits / REF_BITS)**1.6
+
+# Nombre de bits estimé de base**exp (entiers), et temps de calcul estimé:
+# celui de la dernière élévation au carré, qui domine l'exponentiation rapide
+def estimate(base, exp):
+    try:
+        bits = exp * math.log2(abs(base)) + 1
+    except OverflowError:  # exposant trop grand pour un flottant
+        return math.inf, math.inf
+    if bits < REF_BITS:
+        return bits, 0.0
+    return bits, multiplication_time(bits / 2)
+
+# Texte court d'un entier (ou d'une fraction) dans les messages d'erreur
+def describe(n):
+    if isinstance(n, Fraction):
+        if n.denominator == 1:
+            return describe(n.numerator)
+        return describe(n.numerator) + "/" + describe(n.denominator)
+    if n.bit_length() <= 64:
+        return str(n)
+    return "<{0}-bit integer>".format(n.bit_length())
+
+# Taille de la valeur exacte base (le plus grand terme d'une fraction), et exposant dont
+# dépend le coût de base**exp ; None si le calcul n'est pas exact (flottant, ...).
+# Un entier à une puissance négative donne un flottant: son calcul est immédiat.
+def exact_size(base, exp):
+    if type(exp) is not int:
+        return None
+    if type(base) is int:
+        return (abs(base), exp) if exp > 1 else None
+    if type(base) is Fraction:
+        return max(abs(base.numerator), base.denominator), abs(exp)
+    return None
+
+class Power:
+
+    def __init__(self, max_bits=MAX_BITS, max_seconds=MAX_SECONDS, mode=EXACT):
+        self.max_bits = max_bits
+        self.max_seconds = max_seconds
+        self.mode = mode
+
+    def __call__(self, base, exp):
+        if isinstance(base, LogNumber) or isinstance(exp, LogNumber):
+            return self.log_power(base, exp)
+        # Seule la puissance exacte (entiers, fractions) peut être coûteuse: avec un flottant,
+        # le calcul est immédiat (ou lève OverflowError)
+        size = exact_size(base, exp)
+        if size is not None and size[0] > 1 and size[1] > 1:
+            bits, seconds = estimate(*size)
+            if bits > self.max_bits or seconds > self.max_seconds:
+                if self.mode == EXACT:
+                    raise PowerLimitError("{0}^{1} would have about {2:.3g} bits (limits: {3} bits, {4} s)"
+                                          .format(describe(base), describe(exp), bits,
+                                                  self.max_bits, self.max_seconds))
+                try:
+                    return float(base)**float(exp)
+                except OverflowError:
+                    if self.mode == FLOAT:
+                        raise PowerLimitError("{0}^{1} overflows a float".format(describe(base), describe(exp)))
+                    return self.log_power(base, exp)
+        try:
+            return base**exp
+        except OverflowError:
+            if self.mode != LOG:
+                raise
+            return self.log_power(base, exp)
+
+    def log_power(self, base, exp):
+        if self.mode != LOG:
+            raise PowerLimitError("log-space numbers need the '" + LOG + "' mode")
+        s, l = to_log(base)
+        try:
+            e = float(exp)
+        except OverflowError:
+            # exposant hors des flottants: seuls 0 et 1 ont une puissance représentable
+            if s == 0 and exp.sign > 0 or s == 1 and l == 0:
+                return float(base)
+            raise PowerLimitError("exponent too large, even in log-space")
+        if s < 0 and not e.is_integer():
+            raise ValueError("negative number to a fractional power")
+        if s == 0:
+            return 0.0 if e > 0 else float(base)**e
+        return log_number(-1 if s < 0 and e % 2 == 1 else 1, l * e)
+
+
+# Puissance partagée par les calculatrices ; ses limites et son mode se changent par configure
+GUARD = Power()
+
+def power(base, exp):
+    return GUARD(base, exp)
+
+def configure(max_bits=None, max_seconds=None, mode=None):
+    if max_bits is not None:
+        GUARD.max_bits = max_bits
+    if max_seconds is not None:
+        GUARD.max_seconds = max_seconds
+    if mode is not None:
+        if mode not in (EXACT, FLOAT, LOG):
+            raise ValueError("unknown mode " + repr(mode))
+        GUARD.mode = mode
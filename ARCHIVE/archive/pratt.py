@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : calculatrice avec analyse des expressions par précédence d'opérateurs (Pratt)
+"""
+
+import sys
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+import calc
+from calc import ParserError
+from definitions import V_T
+from factorials import factorial
+
+#####
+# Puissances de liaison des opérateurs
+# Un opérateur binaire (gauche, droite) est pris tant que sa puissance gauche dépasse
+# la puissance minimale demandée ; son opérande droit est lu avec sa puissance droite.
+# On retrouve ainsi les priorités de la grammaire LL(1) de calc.py:
+#   ADD, SUB < MUL, DIV < SUB unaire < FACT < POW (associatif à droite)
+
+BINARY_BP = {
+    V_T.ADD: (10, 10),
+    V_T.SUB: (10, 10),
+    V_T.MUL: (20, 20),
+    V_T.DIV: (20, 20),
+    V_T.POW: (50, 49),
+}
+PREFIX_BP = 30   # SUB unaire, interdit dans l'opérande droit de POW (Exp1Bis -> POW Exp1)
+POSTFIX_BP = 40  # FACT
+
+# Tokens pouvant commencer une expression, selon la puissance minimale demandée,
+# avec les messages d'erreur de la fonction correspondante de calc.py
+PREFIX_EXPECTED = {
+    0: "NUM, CALC, OPAR, SUB",     # parse_exp5
+    10: "NUM, CALC, OPAR, SUB",    # parse_exp4
+    20: "SUB, NUM, CALC, OPAR",    # parse_exp3
+    PREFIX_BP: "SUB, NUM, CALC, OPAR",  # parse_exp3
+    49: "NUM, CALC, OPAR",         # parse_exp1
+}
+
+# Tokens pouvant suivre un opérande (parse_exp1_bis) et un FACT (parse_Y)
+ATOM_FOLLOW = frozenset((V_T.POW, V_T.CPAR, V_T.FACT, V_T.MUL, V_T.DIV, V_T.ADD, V_T.SUB, V_T.SEQ))
+ATOM_EXPECTED = "POW, CPAR, FACT, MUL, DIV, ADD, SUB, SEQ"
+FACT_FOLLOW = frozenset((V_T.MUL, V_T.DIV, V_T.CPAR, V_T.ADD, V_T.SUB, V_T.SEQ))
+FACT_EXPECTED = "MUL, DIV, CPAR, ADD, SUB, SEQ"
+
+
+#####
+# La calculatrice: même grammaire, mêmes valeurs et mêmes erreurs que calc.Calculator,
+# mais Exp5 est analysée par une boucle sur la table des puissances de liaison
+# au lieu de la chaîne Exp5 -> Z -> Exp4 -> Y -> ... -> Exp0.
+
+class PrattCalculator(calc.Calculator):
+
+    def __init__(self, history=None, backend=None):
+        super().__init__(history, backend)
+        self.actions = self.binary_actions()
+
+    # Actions sémantiques, que les sous-classes peuvent remplacer:
+    # celles des opérateurs binaires sont données par la représentation des nombres
+    def binary_actions(self):
+        return self.backend.operators
+
+    def number(self, n):
+        return n
+
+    def reference(self, L, i):
+        return L[i-1]
+
+    def negate(self, n):
+        return -1 * n
+
+    def fact(self, n):
+        return factorial(int(n))
+
+    def parse_exp5(self, L):
+        return self.parse_expr(L, 0)
+
+    # Analyse une expression dont les opérateurs lient plus fort que min_bp
+    def parse_expr(self, L, min_bp):
+        # Partie préfixe: un opérande, ou SUB unaire suivi d'une expression
+        tok = self._current_token
+        if tok == V_T.NUM or tok == V_T.CALC:
+            # comme calc.py, le token suivant est lu avant de chercher la valeur de #i:
+            # une erreur du lexer passe avant celle d'une référence hors de l'historique
+            value = self._value
+            self._current_token, self._value = self.lexer.next_token()
+            if tok == V_T.NUM:
+                left = self.number(value)
+            else:
+                left = self.reference(L, value)
+            if self._current_token not in ATOM_FOLLOW:
+                raise self.unexpected_token(ATOM_EXPECTED)
+        elif tok == V_T.OPAR:
+            self._current_token, self._value = self.lexer.next_token()
+            left = self.parse_expr(L, 0)
+            self.consume_token(V_T.CPAR)
+            if self._current_token not in ATOM_FOLLOW:
+                raise self.unexpected_token(ATOM_EXPECTED)
+        elif tok == V_T.SUB and min_bp <= PREFIX_BP:
+            self._current_token, self._value = self.lexer.next_token()
+            left = self.negate(self.parse_expr(L, PREFIX_BP))
+        else:
+            raise self.unexpected_token(PREFIX_EXPECTED[min_bp])
+
+        # Opérateurs postfixes et binaires, tant qu'ils lient plus fort que min_bp
+        while True:
+            tok = self._current_token
+            if tok == V_T.FACT:
+                if POSTFIX_BP <= min_bp:
+                    return left
+                self._current_token, self._value = self.lexer.next_token()
+                left = self.fact(left)
+                if self._current_token not in FACT_FOLLOW:
+                    raise self.unexpected_token(FACT_EXPECTED)
+                continue
+            bp = BINARY_BP.get(tok)
+            if bp is None or bp[0] <= min_bp:
+                return left
+            self._current_token, self._value = self.lexer.next_token()
+            right = self.parse_expr(L, bp[1])
+            left = self.actions[tok](left, right)
+
+
+#####################################
+## Fonction principale de la calculatrice
+
+def parse(stream=sys.stdin, backend=None):
+    return PrattCalculator(backend=backend).parse(stream)
+
+
+#####################################
+## Test depuis la ligne de commande
+
+if __name__ == "__main__":
+    print("@ Testing the calculator in infix syntax (Pratt).")
+    result = parse()
+    print("@ result = ", repr(result))
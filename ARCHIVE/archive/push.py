@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : calculatrice LL(1) à pile explicite, alimentée par morceaux d'entrée
+"""
+
+import sys
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+import calc
+import lexer
+from calc import ParserError
+from definitions import V_T
+from factorials import factorial
+
+#####
+# Même grammaire, mêmes valeurs et mêmes erreurs que calc.Calculator, mais les appels
+# récursifs sont remplacés par une pile explicite: chaque élément de la pile est une méthode,
+# qui développe une production (expand_*) selon le token courant, ou applique l'action
+# sémantique d'un opérateur (apply_*) aux valeurs du haut de la pile des valeurs.
+# Quand le token suivant n'est pas encore arrivé, l'analyse s'arrête simplement: la pile
+# garde l'analyse en cours, qui reprend dès que d'autres tokens arrivent (feed, push_token).
+# Une calculatrice en attente ne bloque donc aucun thread, et la profondeur des
+# parenthèses n'est plus limitée par la pile d'appels de Python.
+#
+# Comme calc.Calculator.consume_token, qui lit le token suivant dès qu'il consomme le
+# token courant, la suite de l'analyse attend ce token suivant: les erreurs (du lexer,
+# de l'analyse ou des calculs) sont levées dans le même ordre que dans calc.py.
+
+class PushCalculator(calc.Calculator):
+
+    def __init__(self, history=None, backend=None, eoi=None):
+        super().__init__(history, backend)
+        self.reset(eoi)
+
+    # Commence une nouvelle entrée (après END, ou une erreur) ; l'historique est gardé
+    def reset(self, eoi=None):
+        self.lexer = lexer.make_push_lexer(eoi=eoi, backend=self.backend)
+        self._current_token = None  # None: token suivant pas encore arrivé
+        self._value = None
+        self._stack = [self.expand_input]
+        self._values = []
+        self._results = []  # couples (numéro, valeur) des calculs terminés, pas encore renvoyés
+        self.finished = False  # END a été atteint
+
+    def consume_token(self, tok):
+        if self._current_token != tok:
+            raise self.unexpected_token(tok.name)
+        old = self._value
+        if tok != V_T.END:
+            self._current_token = None
+        return old
+
+    # Avance l'analyse tant que le token courant est connu
+    def run(self):
+        stack = self._stack
+        while stack and self._current_token is not None:
+            stack.pop()()
+
+    # Donne le token suivant à l'analyse ; renvoie les calculs terminés depuis l'appel
+    # précédent. Après END, les tokens sont ignorés.
+    def push_token(self, token, value=None):
+        if not self.finished:
+            self._current_token, self._value = token, value
+            with self.backend.scope():
+                self.run()
+        results = self._results
+        self._results = []
+        return results
+
+    # Ajoute le morceau chunk à l'entrée (voir lexer.PushLexer) ; renvoie les couples
+    # (numéro, valeur) des calculs terminés, dont les valeurs sont déjà dans l'historique
+    def feed(self, chunk):
+        results = []
+        for token, value in self.lexer.feed(chunk):
+            results += self.push_token(token, value)
+        return results
+
+    # Fin de l'entrée: renvoie les derniers calculs terminés, ou lève l'erreur d'une
+    # entrée incomplète (sans EOI, comme calc.py sur un flot qui se termine avant EOI)
+    def close(self):
+        results = []
+        for token, value in self.lexer.close():
+            results += self.push_token(token, value)
+        return results
+
+    # Analyse et calcule le flot (lu par un lexer de lexer.make_lexer, ou des tokens
+    # déjà lus par lexer.tokenize_all), comme calc.Calculator.parse
+    def parse(self, stream=sys.stdin):
+        return [n for _, n in self.iter_parse(stream)]
+
+    def iter_parse(self, stream=sys.stdin, eoi=None, line_buffered=None):
+        self.reset(eoi)
+        with self.backend.scope():
+            self.init_parser(stream, eoi, line_buffered)
+        while True:
+            for step in self.push_token(self._current_token, self._value):
+                yield step
+            if self.finished:
+                return
+            self._current_token, self._value = self.lexer.next_token()
+
+    #########################
+    ## Productions (voir la grammaire de calc.py): au sommet de la pile,
+    ## le prochain symbole à reconnaître
+
+    # Input -> Exp5 SEQ Input | ε
+    def expand_input(self):
+        match self._current_token:
+            case V_T.END:
+                self.finished = True
+            case V_T.NUM | V_T.CALC | V_T.OPAR | V_T.SUB:
+                self._stack += (self.end_statement, self.expand_exp5)
+            case _:
+                raise self.unexpected_token("NUM, CALC, OPAR, SUB, END")
+
+    # SEQ: la valeur du calcul est ajoutée à l'historique et renvoyée avant de lire la suite
+    def end_statement(self):
+        if self._current_token != V_T.SEQ:
+            raise self.unexpected_token(V_T.SEQ.name)
+        n = self._values.pop()
+        self.history.append(n)
+        self._results.append((len(self.history), n))
+        self.consume_token(V_T.SEQ)
+        self._stack.append(self.expand_input)
+
+    def expand_exp5(self):
+        match self._current_token:
+            case V_T.NUM | V_T.CALC | V_T.OPAR | V_T.SUB:
+                self._stack += (self.expand_Z, self.expand_exp4)
+            case _:
+                raise self.unexpected_token("NUM, CALC, OPAR, SUB")
+
+    def expand_Z(self):
+        match self._current_token:
+            case V_T.ADD | V_T.SUB:
+                self._stack += (self.expand_Z, self.expand_exp5_bis)
+            case V_T.CPAR | V_T.SEQ:
+                pass
+            case _:
+                raise self.unexpected_token("NADD, SUB, CPAR, SEQ")
+
+    def expand_exp5_bis(self):
+        match self._current_token:
+            case V_T.ADD:
+                self.consume_token(V_T.ADD)
+                self._stack += (self.apply_add, self.expand_exp4)
+            case V_T.SUB:
+                self.consume_token(V_T.SUB)
+                self._stack += (self.apply_sub, self.expand_exp4)
+            case _:
+                raise self.unexpected_token("ADD, SUB")
+
+    def expand_exp4(self):
+        match self._current_token:
+            case V_T.NUM | V_T.CALC | V_T.OPAR | V_T.SUB:
+                self._stack += (self.expand_Y, self.expand_exp3)
+            case _:
+                raise self.unexpected_token("NUM, CALC, OPAR, SUB")
+
+    def expand_Y(self):
+        match self._current_token:
+            case V_T.MUL | V_T.DIV:
+                self._stack += (self.expand_Y, self.expand_exp4_bis)
+            case V_T.CPAR | V_T.ADD | V_T.SUB | V_T.SEQ:
+                pass
+            case _:
+                raise self.unexpected_token("MUL, DIV, CPAR, ADD, SUB, SEQ")
+
+    def expand_exp4_bis(self):
+        match self._current_token:
+            case V_T.MUL:
+                self.consume_token(V_T.MUL)
+                self._stack += (self.apply_mul, self.expand_exp3)
+            case V_T.DIV:
+                self.consume_token(V_T.DIV)
+                self._stack += (self.apply_div, self.expand_exp3)
+            case _:
+                raise self.unexpected_token("MUL, DIV")
+
+    def expand_exp3(self):
+        match self._current_token:
+            case V_T.SUB:
+                self.consume_token(V_T.SUB)
+                self._stack += (self.apply_neg, self.expand_exp3)
+            case V_T.NUM | V_T.CALC | V_T.OPAR:
+                self._stack.append(self.expand_exp2)
+            case _:
+                raise self.unexpected_token("SUB, NUM, CALC, OPAR")
+
+    def expand_exp2(self):
+        match self._current_token:
+            case V_T.NUM | V_T.CALC | V_T.OPAR:
+                self._stack += (self.expand_exp2_bis, self.expand_exp1)
+            case _:
+                raise self.unexpected_token("NUM, CALC, OPAR")
+
+    def expand_exp2_bis(self):
+        match self._current_token:
+            case V_T.FACT:
+                self.consume_token(V_T.FACT)
+                self._stack.append(self.apply_fact)
+            case V_T.CPAR | V_T.MUL | V_T.DIV | V_T.ADD | V_T.SUB | V_T.SEQ:
+                pass
+            case _:
+                raise self.unexpected_token("FACT, CPAR, MUL, DIV, ADD, SUB, SEQ")
+
+    def expand_exp1(self):
+        match self._current_token:
+            case V_T.NUM | V_T.CALC | V_T.OPAR:
+                self._stack += (self.expand_exp1_bis, self.expand_exp0)
+            case _:
+                raise self.unexpected_token("NUM, CALC, OPAR")
+
+    def expand_exp1_bis(self):
+        match self._current_token:
+            case V_T.POW:
+                self.consume_token(V_T.POW)
+                self._stack += (self.apply_pow, self.expand_exp1)
+            case V_T.CPAR | V_T.FACT | V_T.MUL | V_T.DIV | V_T.ADD | V_T.SUB | V_T.SEQ:
+                pass
+            case _:
+                raise self.unexpected_token("POW, CPAR, FACT, MUL, DIV, ADD, SUB, SEQ")
+
+    def expand_exp0(self):
+        match self._current_token:
+            case V_T.NUM:
+                self._values.append(self.consume_token(V_T.NUM))
+            case V_T.CALC:
+                self._values.append(self.consume_token(V_T.CALC))
+                self._stack.append(self.apply_reference)
+            case V_T.OPAR:
+                self.consume_token(V_T.OPAR)
+                self._stack += (self.end_parenthesis, self.expand_exp5)
+            case _:
+                raise self.unexpected_token("NUM, CALC, OPAR")
+
+    def end_parenthesis(self):
+        self.consume_token(V_T.CPAR)
+
+    #########################
+    ## Actions sémantiques: l'opérande droit est au sommet de la pile des valeurs
+
+    def apply_add(self):
+        n_2 = self._values.pop()
+        self._values[-1] = self._values[-1] + n_2
+
+    def apply_sub(self):
+        n_2 = self._values.pop()
+        self._values[-1] = self._values[-1] - n_2
+
+    def apply_mul(self):
+        n_2 = self._values.pop()
+        self._values[-1] = self._values[-1] * n_2
+
+    def apply_div(self):
+        n_2 = self._values.pop()
+        self._values[-1] = self._values[-1] / n_2
+
+    def apply_pow(self):
+        n_1 = self._values.pop()
+        self._values[-1] = self.backend.pow(self._values[-1], n_1)
+
+    def apply_neg(self):
+        self._values[-1] = -1 * self._values[-1]
+
+    def apply_fact(self):
+        self._values[-1] = factorial(int(self._values[-1]))
+
+    # #i: la valeur du calcul i de l'historique
+    def apply_reference(self):
+        self._values[-1] = self.history[self._values[-1] - 1]
+
+
+#####################################
+## Fonction principale de la calculatrice
+
+def parse(stream=sys.stdin, backend=None):
+    return PushCalculator(backend=backend).parse(stream)
+
+
+#####################################
+## Test depuis la ligne de commande: l'entrée standard est lue par morceaux,
+## et chaque calcul est affiché dès qu'il est terminé
+
+if __name__ == "__main__":
+    print("@ Testing the calculator in infix syntax (push parser).")
+    calculator = PushCalculator()
+    for chunk in iter(sys.stdin.readline, ''):
+        for n, value in calculator.feed(chunk):
+            print("@ #{0} = {1!r}".format(n, value))
+    for n, value in calculator.close():
+        print("@ #{0} = {1!r}".format(n, value))
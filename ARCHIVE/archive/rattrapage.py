@@ -5,19 +5,13 @@ Projet TL : parser - requires Python version >= 3.10
 """
 
 import sys
-from math import factorial
 
 assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
 
 import lexer
+import numeric
 from definitions import V_T, str_attr_token
-
-#####
-# Variables internes (à ne pas utiliser directement)
-
-_current_token = V_T.END
-_value = None  # attribut du token renvoyé par le lexer
-
+from factorials import factorial
 
 #####
 # Fonctions génériques
@@ -26,180 +20,207 @@ class ParserError(Exception):
     pass
 
 
-def unexpected_token(expected):
-    return ParserError("Found token '" + str_attr_token(_current_token, _value) + "' but expected " + expected)
-
-
-def get_current():
-    return _current_token
-
-
-def init_parser(stream):
-    global _current_token, _value
-    lexer.reinit(stream)
-    _current_token, _value = lexer.next_token()
-    # print("@ init parser on",  repr(str_attr_token(_current, _value)))  # for DEBUGGING
-
-
-def consume_token(tok):
-    # Vérifie que le prochain token est tok ;
-    # si oui, le consomme et renvoie son attribut ; si non, lève une exception
-    global _current_token, _value
-    if _current_token != tok:
-        raise unexpected_token(tok.name)
-    if _current_token != V_T.END:
-        old = _value
-        _current_token, _value = lexer.next_token()
-        return old
-
-def recover(suiv):
-    curr = get_current()
-    while curr not in suiv and curr != V_T.END and curr != V_T.SEQ:
-        consume_token(curr)
-        curr = get_current()
-
-#########################
-## Parsing de input et exp
-
-results = []
-
-def parse_input():
-    global results
-    results = []
-    tok = get_current()
-    if tok == V_T.END:
-        return results
-    while True:
-        # Consommer tous les séparateurs SEQ consécutifs
-        while get_current() == V_T.SEQ:
-            consume_token(V_T.SEQ)
-            continue
-        if get_current() == V_T.END:
-            break
-        val = parse_exp5()
-        results.append(val)
-        recover({V_T.SEQ})
-        
-    return results
-
-
-def parse_exp5():
-    cumul = parse_exp4()
-    n = parse_exp5_prime(cumul)
-    return n
-
-def parse_exp5_prime(cumul):
-    tok = get_current()
-    if tok == V_T.ADD:
-        consume_token(tok)
-        # Vérifier si on peut parser une expression
-        if get_current() in (V_T.END, V_T.SEQ):
-            return cumul  # Ignorer l'opérateur si l'opérande manque
-        n2 = parse_exp4()
-        return parse_exp5_prime(cumul + n2)
-    elif tok == V_T.SUB:
-        consume_token(tok)
-        # Vérifier si on peut parser une expression
-        if get_current() in (V_T.END, V_T.SEQ):
-            return cumul  # Ignorer l'opérateur si l'opérande manque
-        n2 = parse_exp4()
-        return parse_exp5_prime(cumul - n2)
-    else:
-        return cumul
-
-
-def parse_exp4():
-    cumul = parse_exp3()
-    n = parse_exp4_prime(cumul)
-    return n
-
-
-def parse_exp4_prime(cumul):
-    tok = get_current()
-    if tok == V_T.MUL:
-        consume_token(tok)
-        #On verifie si on peut parser une expression (pour éviter la division par zéro)
-        if get_current() in (V_T.END, V_T.SEQ):
-            return cumul  # Ignorer l'opérateur si l'opérande manque
-        n2 = parse_exp3()
-        return parse_exp4_prime(cumul * n2)
-    elif tok == V_T.DIV:
-        consume_token(tok)
-        # On verifie si on peut parser une expression (pour éviter la division par zéro)
-        if get_current() in (V_T.END, V_T.SEQ):
-            return cumul  #On ignore l'opérateur si le nombre suivant est manquant
-        n2 = parse_exp3()
-        return parse_exp4_prime(cumul / n2)
-    else:
-        return cumul
-
-
-def parse_exp3():
-    tok = get_current()
-    if tok == V_T.SUB:
-        consume_token(tok)
-        n = parse_exp3()
-        return -n
-    elif tok in (V_T.NUM, V_T.CALC, V_T.OPAR):
-        return parse_exp2()
-    else:
-        recover((V_T.SUB,V_T.NUM, V_T.CALC,V_T.OPAR))
-        #Note pour souvenir : si après récupération on est à END ou SEQ, on ne peut plus parser une expression
-        if get_current() in (V_T.END, V_T.SEQ):
-            return 0 
-        return parse_exp3()
-
-
-def parse_exp2():
-    cumul = parse_exp1()
-    n = parse_exp2_prime(cumul)
-    return n
-
-
-def parse_exp2_prime(cumul):
-    tok = get_current()
-    if tok == V_T.FACT:
-        consume_token(tok)
-        return parse_exp2_prime(factorial(cumul))
-    else:
-        return cumul
-
-
-def parse_exp1():
-    base = parse_exp0()
-    return parse_exp1_prime(base)
-
-
-def parse_exp1_prime(base):
-    if get_current() == V_T.POW:
-        consume_token(V_T.POW)
-        exp = parse_exp1()
-        return pow(base, exp)
-    return base
-
-
-def parse_exp0():
-    tok = get_current()
-    if tok == V_T.NUM:
-        val = consume_token(tok)
-        return val
-    if tok == V_T.CALC:
-        idx = consume_token(V_T.CALC)
-        if idx <= 0 or idx > len(results):
-            raise ValueError(f"Invalid calcul reference #{idx}")
-        return results[idx - 1]
-    elif tok == V_T.OPAR:
-        consume_token(tok)
-        val = parse_exp5()
-        while get_current() == V_T.CPAR:
-            consume_token(get_current())
-        return val
-    else:
-        recover((V_T.NUM, V_T.CALC, V_T.OPAR))
-        if get_current() == V_T.END:
-            return 0 #Ou raise parseError
-
-        return parse_exp0()
+#####
+# La calculatrice avec rattrapage d'erreurs: chaque instance possède son lexer, son token
+# courant et l'historique de ses calculs, si bien que plusieurs calculs peuvent être menés
+# en même temps.
+
+class Calculator:
+
+    def __init__(self, history=None, backend=None):
+        # Variables internes (à ne pas utiliser directement)
+        self.lexer = None
+        self._current_token = V_T.END
+        self._value = None  # attribut du token renvoyé par le lexer
+        # valeurs des calculs déjà effectués, référencées par #n (une liste, ou voir history.py)
+        self.history = [] if history is None else history
+        # représentation des nombres (float, Decimal, Fraction: voir numeric.py)
+        self.backend = numeric.backend(backend)
+
+    def unexpected_token(self, expected):
+        return ParserError("Found token '" + str_attr_token(self._current_token, self._value) + "' but expected " + expected)
+
+    def get_current(self):
+        return self._current_token
+
+    # stream est un flot de caractères, ou des tokens déjà lus par lexer.tokenize_all
+    def init_parser(self, stream, eoi=None, line_buffered=None):
+        if isinstance(stream, lexer.Tokens):
+            self.lexer = stream.reader()
+        else:
+            self.lexer = lexer.make_lexer(stream, eoi=eoi, line_buffered=line_buffered, backend=self.backend)
+        self._current_token, self._value = self.lexer.next_token()
+        # print("@ init parser on",  repr(str_attr_token(_current, self._value)))  # for DEBUGGING
+
+    def consume_token(self, tok):
+        # Vérifie que le prochain token est tok ;
+        # si oui, le consomme et renvoie son attribut ; si non, lève une exception
+        if self._current_token != tok:
+            raise self.unexpected_token(tok.name)
+        if self._current_token != V_T.END:
+            old = self._value
+            self._current_token, self._value = self.lexer.next_token()
+            return old
+
+    def recover(self, suiv):
+        curr = self.get_current()
+        while curr not in suiv and curr != V_T.END and curr != V_T.SEQ:
+            self.consume_token(curr)
+            curr = self.get_current()
+
+    #########################
+    ## Parsing de input et exp
+
+    # Renvoie le numéro et la valeur de chaque calcul dès qu'il est terminé,
+    # avant de lire la suite du flot
+    def iter_input(self):
+        while True:
+            # Consommer tous les séparateurs SEQ consécutifs
+            while self.get_current() == V_T.SEQ:
+                self.consume_token(V_T.SEQ)
+                continue
+            if self.get_current() == V_T.END:
+                return
+            val = self.parse_exp5()
+            self.history.append(val)
+            self.recover({V_T.SEQ})
+            yield len(self.history), val
+
+    def parse_input(self):
+        return [val for _, val in self.iter_input()]
+
+    def parse_exp5(self):
+        cumul = self.parse_exp4()
+        n = self.parse_exp5_prime(cumul)
+        return n
+
+    def parse_exp5_prime(self, cumul):
+        tok = self.get_current()
+        if tok == V_T.ADD:
+            self.consume_token(tok)
+            # Vérifier si on peut parser une expression
+            if self.get_current() in (V_T.END, V_T.SEQ):
+                return cumul  # Ignorer l'opérateur si l'opérande manque
+            n2 = self.parse_exp4()
+            return self.parse_exp5_prime(cumul + n2)
+        elif tok == V_T.SUB:
+            self.consume_token(tok)
+            # Vérifier si on peut parser une expression
+            if self.get_current() in (V_T.END, V_T.SEQ):
+                return cumul  # Ignorer l'opérateur si l'opérande manque
+            n2 = self.parse_exp4()
+            return self.parse_exp5_prime(cumul - n2)
+        else:
+            return cumul
+
+    def parse_exp4(self):
+        cumul = self.parse_exp3()
+        n = self.parse_exp4_prime(cumul)
+        return n
+
+    def parse_exp4_prime(self, cumul):
+        tok = self.get_current()
+        if tok == V_T.MUL:
+            self.consume_token(tok)
+            #On verifie si on peut parser une expression (pour éviter la division par zéro)
+            if self.get_current() in (V_T.END, V_T.SEQ):
+                return cumul  # Ignorer l'opérateur si l'opérande manque
+            n2 = self.parse_exp3()
+            return self.parse_exp4_prime(cumul * n2)
+        elif tok == V_T.DIV:
+            self.consume_token(tok)
+            # On verifie si on peut parser une expression (pour éviter la division par zéro)
+            if self.get_current() in (V_T.END, V_T.SEQ):
+                return cumul  #On ignore l'opérateur si le nombre suivant est manquant
+            n2 = self.parse_exp3()
+            return self.parse_exp4_prime(cumul / n2)
+        else:
+            return cumul
+
+    def parse_exp3(self):
+        tok = self.get_current()
+        if tok == V_T.SUB:
+            self.consume_token(tok)
+            n = self.parse_exp3()
+            return -n
+        elif tok in (V_T.NUM, V_T.CALC, V_T.OPAR):
+            return self.parse_exp2()
+        else:
+            self.recover((V_T.SUB,V_T.NUM, V_T.CALC,V_T.OPAR))
+            #Note pour souvenir : si après récupération on est à END ou SEQ, on ne peut plus parser une expression
+            if self.get_current() in (V_T.END, V_T.SEQ):
+                return 0 
+            return self.parse_exp3()
+
+    def parse_exp2(self):
+        cumul = self.parse_exp1()
+        n = self.parse_exp2_prime(cumul)
+        return n
+
+    def parse_exp2_prime(self, cumul):
+        tok = self.get_current()
+        if tok == V_T.FACT:
+            self.consume_token(tok)
+            return self.parse_exp2_prime(factorial(cumul))
+        else:
+            return cumul
+
+    def parse_exp1(self):
+        base = self.parse_exp0()
+        return self.parse_exp1_prime(base)
+
+    def parse_exp1_prime(self, base):
+        if self.get_current() == V_T.POW:
+            self.consume_token(V_T.POW)
+            exp = self.parse_exp1()
+            return self.backend.pow(base, exp)
+        return base
+
+    def parse_exp0(self):
+        tok = self.get_current()
+        if tok == V_T.NUM:
+            val = self.consume_token(tok)
+            return val
+        if tok == V_T.CALC:
+            idx = self.consume_token(V_T.CALC)
+            if idx <= 0 or idx > len(self.history):
+                raise ValueError(f"Invalid calcul reference #{idx}")
+            return self.history[idx - 1]
+        elif tok == V_T.OPAR:
+            self.consume_token(tok)
+            val = self.parse_exp5()
+            while self.get_current() == V_T.CPAR:
+                self.consume_token(self.get_current())
+            return val
+        else:
+            self.recover((V_T.NUM, V_T.CALC, V_T.OPAR))
+            if self.get_current() == V_T.END:
+                return 0 #Ou raise parseError
+
+            return self.parse_exp0()
+
+    # Analyse et calcule le flot ; renvoie la liste des valeurs de ses calculs.
+    # Ces valeurs s'ajoutent à l'historique, qui est conservé d'un appel à l'autre.
+    def parse(self, stream=sys.stdin):
+        with self.backend.scope():
+            self.init_parser(stream)
+            l = self.parse_input()
+            self.consume_token(V_T.END)
+        return l
+
+    # Comme parse, mais renvoie les couples (numéro, valeur) des calculs au fur et à mesure.
+    # Le contexte des calculs n'est actif que pendant l'analyse, pas entre deux valeurs.
+    def iter_parse(self, stream=sys.stdin, eoi=None, line_buffered=None):
+        with self.backend.scope():
+            self.init_parser(stream, eoi, line_buffered)
+        steps = self.iter_input()
+        while True:
+            with self.backend.scope():
+                step = next(steps, None)
+                if step is None:
+                    self.consume_token(V_T.END)
+                    return
+            yield step
 
 
 #####################################
@@ -208,11 +229,17 @@ def parse_exp0():
 ## - None sans les attributs
 ## - la liste des valeurs des calculs avec les attributs
 
-def parse(stream=sys.stdin):
-    init_parser(stream)
-    l = parse_input()
-    consume_token(V_T.END)
-    return l
+def parse(stream=sys.stdin, backend=None):
+    return Calculator(backend=backend).parse(stream)
+
+## Générateur des couples (numéro, valeur) des calculs, lus ligne à ligne dans le flot ;
+## avec keep, seules les keep dernières valeurs sont gardées (voir history.RingHistory)
+
+def iter_parse(stream=sys.stdin, keep=None, eoi=None, line_buffered=True, backend=None):
+    if keep is None:
+        return Calculator(backend=backend).iter_parse(stream, eoi, line_buffered)
+    import history
+    return Calculator(history.RingHistory(keep), backend).iter_parse(stream, eoi, line_buffered)
 
 
 #####################################
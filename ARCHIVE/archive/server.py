@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : serveur de calcul asyncio (TCP ou socket Unix), une session par connexion
+"""
+
+import sys
+import asyncio
+import concurrent.futures
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+import calc
+import numeric
+import pratt
+import rattrapage
+import history
+
+#####
+# Protocole, ligne par ligne: le client envoie des calculs séparés par ';', chaque ligne
+# étant terminée par '\n' (EOI). Le serveur répond une ligne par calcul, dès qu'il est fini:
+#   #n = valeur
+# et, si la ligne contient une erreur, une dernière ligne pour elle ; la suite de la ligne
+# est alors ignorée, mais les calculs précédents restent dans l'historique:
+#   ! ParserError: Found token 'SEQ' but expected NUM, CALC, OPAR, SUB
+# Chaque connexion a sa calculatrice, donc son historique #n.
+# Les octets d'une ligne sont analysés directement (voir lexer.BytesLexer), dans un thread
+# de l'executor: un calcul long (grande factorielle, puissance, ...) ne bloque pas la boucle
+# d'événements, qui continue de servir les autres connexions.
+
+ENGINES = {
+    'calc': calc.Calculator,
+    'pratt': pratt.PrattCalculator,
+    'rattrapage': rattrapage.Calculator,
+}
+
+EOI = '\n'
+# Longueur maximale d'une ligne (limite du StreamReader): au delà, la connexion est fermée
+LINE_LIMIT = 1 << 20
+
+def format_value(n, value):
+    return "#{0} = {1}\n".format(n, value).encode()
+
+def format_error(e):
+    return "! {0}: {1}\n".format(type(e).__name__, e).encode()
+
+
+class Session:
+
+    def __init__(self, engine='calc', backend=None, keep=None):
+        # avec keep, seules les keep dernières valeurs sont gardées (mémoire bornée par session)
+        values = None if keep is None else history.RingHistory(keep)
+        self.calculator = ENGINES[engine](values, backend)
+        self.lines = 0
+
+    # Analyse et calcule la ligne (des octets terminés par EOI) ; chaque réponse est
+    # donnée à send dès que son calcul est fini. Exécutée dans un thread de l'executor.
+    def run_line(self, line, send):
+        self.lines += 1
+        try:
+            for n, value in self.calculator.iter_parse(line, EOI):
+                send(format_value(n, value))
+        except Exception as e:
+            send(format_error(e))
+
+
+class CalculatorServer:
+
+    def __init__(self, engine='calc', backend=None, keep=None, executor=None, limit=LINE_LIMIT):
+        if engine not in ENGINES:
+            raise ValueError("unknown engine " + repr(engine))
+        self.engine = engine
+        self.backend = numeric.backend(backend)  # partagée par les sessions
+        self.keep = keep
+        self.executor = executor  # None: l'executor par défaut de la boucle
+        self.limit = limit
+        self.sessions = 0  # connexions ouvertes
+        self.server = None
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        session = Session(self.engine, self.backend, self.keep)
+        self.sessions += 1
+
+        # les réponses sont écrites depuis le thread de calcul, par la boucle
+        def send(data):
+            loop.call_soon_threadsafe(writer.write, data)
+
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(EOI.encode())
+                except asyncio.IncompleteReadError as e:
+                    line = e.partial  # fin du flot: la dernière ligne, sans EOI
+                    if not line:
+                        break
+                    line += EOI.encode()
+                except asyncio.LimitOverrunError:
+                    writer.write(format_error(ValueError("line longer than {0} bytes".format(self.limit))))
+                    break
+                await loop.run_in_executor(self.executor, session.run_line, line, send)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, host=None, port=None, path=None):
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path, limit=self.limit)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port, limit=self.limit)
+        return self.server
+
+    # Adresses d'écoute: (hôte, port) en TCP, le chemin du socket Unix
+    def addresses(self):
+        return [sock.getsockname() for sock in self.server.sockets]
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        self.server.close()
+
+
+#####################################
+## Fonction principale: sert les connexions jusqu'à son annulation (Ctrl-C)
+
+async def serve(host='127.0.0.1', port=8888, path=None, engine='calc', backend=None, keep=None, workers=None):
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        server = CalculatorServer(engine, backend, keep, executor)
+        await server.start(host, port, path)
+        print("@ Serving the calculator on", ", ".join(map(str, server.addresses())), file=sys.stderr)
+        await server.serve_forever()
+
+
+#####################################
+## Test depuis la ligne de commande
+
+if __name__ == "__main__":
+    import argparse
+    args = argparse.ArgumentParser(description="Serve the calculator over TCP or a Unix socket.")
+    args.add_argument('--host', default='127.0.0.1')
+    args.add_argument('--port', type=int, default=8888)
+    args.add_argument('--unix', metavar='PATH', default=None, help="listen on a Unix socket instead")
+    args.add_argument('--engine', choices=ENGINES, default='calc')
+    args.add_argument('--backend', default=None)
+    args.add_argument('--keep', type=int, default=None, help="values kept in each session's history")
+    args.add_argument('--workers', type=int, default=None, help="threads of the executor")
+    args = args.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.engine, args.backend, args.keep, args.workers))
+    except KeyboardInterrupt:
+        pass
@@ -80,6 +80,11 @@ for i in range(1, N1-1):
 l.append("#{0};".format(N1-1))
 test_result("".join(l), r)
 
+# Un grand nombre de calculs ne doit pas dépasser la limite de récursion
+N2 = 5000
+test_result("1;" + "".join(["{0}+#{1};".format(i,i-1) for i in range(2,N2)]),
+            [i * (i+1)//2 for i in range(1,N2)])
+
 # Tests de k parmi n
 k_parmi_n="#2-#1;#1!;#2!;#3!;#5/#4/#6;"
 test_result("1;2;"+k_parmi_n, [1, 2, 1, 1, 2, 1, 2])
@@ -101,3 +106,81 @@ test_parsing_error("- ((1 + 2 * - ((3 - 5))) ; ")
 test_parsing_error("- (1 + 2)) * - ((3 - 5)) ; ")
 test_parsing_error("!5;")
 test_parsing_error("5! / ;")
+
+# Calculs indépendants menés en même temps par plusieurs threads
+from concurrent.futures import ThreadPoolExecutor
+inputs = ["{0};#1*#1;#2-{0};".format(i) for i in range(1, 50)]
+with ThreadPoolExecutor(max_workers=8) as pool:
+    found = list(pool.map(run, inputs))
+assert found == [[i, i*i, i*i-i] for i in range(1, 50)], "found {0}".format(found)
+print("@ threads => OK")
+
+# Valeurs renvoyées au fur et à mesure, sans attendre la fin du flot
+from calc import iter_parse
+
+class Feed(io.StringIO):
+    def __init__(self, lines):
+        super().__init__()
+        self.lines = lines
+    def readline(self, size=-1):
+        assert self.lines, "read past the available input"
+        return self.lines.pop(0)
+
+# (le lexer lit au plus une ligne d'avance pour ses trois caractères de prévision)
+feed = Feed(["1+2;\n", "#1*2;\n", "#2-#1;\n", "4;$"])
+results = iter_parse(feed, eoi='$')
+assert next(results) == (1, 3) and len(feed.lines) >= 2
+assert next(results) == (2, 6) and len(feed.lines) >= 1
+assert next(results) == (3, 3)
+assert list(results) == [(4, 4)]
+print("@ iter_parse => OK")
+
+# Historique borné: seules les dernières valeurs restent accessibles
+calc_input = "0;" + "".join("{0}+#0;".format(i) for i in range(1, 1001))
+found = list(iter_parse(io.StringIO(calc_input + defs.EOI), keep=2))
+assert found[-1] == (1001, 1000 * 1001 // 2), "found {0}".format(found[-1])
+try:
+    list(iter_parse(io.StringIO("1;2;3;#1;" + defs.EOI), keep=2))
+    assert False
+except IndexError as e:
+    print("@ error found:", e)
+print("@ iter_parse keep => OK")
+
+# Tokens lus une seule fois (lexer.tokenize_all), puis analysés plusieurs fois
+import lexer
+calc_input = "1;2;" + k_parmi_n + "(#1 + 2.5e1) * -3;"
+tokens = lexer.tokenize_all(io.StringIO(calc_input + defs.EOI))
+expected = run(calc_input)
+for _ in range(2):
+    found = PARSER_UNDER_TEST(tokens)
+    assert found == expected, "found {0} vs {1} expected".format(found, expected)
+try:
+    PARSER_UNDER_TEST(lexer.tokenize_all(io.StringIO("1;2;(3 4;" + defs.EOI)))
+    assert False
+except ParserError as e:
+    print("@ parsing error found:", e)
+try:
+    PARSER_UNDER_TEST(lexer.tokenize_all(io.StringIO("1;2;3 a;" + defs.EOI)))
+    assert False
+except lexer.LexerError as e:
+    print("@ lexer error found:", e)
+print("@ tokenize_all => OK")
+
+# Fichier projeté en mémoire, analysé sans décodage
+import os
+import tempfile
+from calc import parse_file
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "calculs.txt")
+    with open(path, "w") as f:
+        f.write(calc_input + defs.EOI + "ignored after EOI")
+    found = parse_file(path)
+    assert found == expected, "found {0} vs {1} expected".format(found, expected)
+    with open(path, "w") as f:
+        f.write("1;2;(3 4;" + defs.EOI)
+    try:
+        parse_file(path)
+        assert False
+    except ParserError as e:
+        print("@ parsing error found:", e)
+print("@ parse_file => OK")
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test the factorial cache
+"""
+
+import io
+import math
+import definitions as defs
+import calc
+import factorials
+
+def test_factorial(cache, n):
+    found = cache(n)
+    assert found == math.factorial(n), "wrong value for {0}!".format(n)
+
+cache = factorials.FactorialCache()
+for n in [0, 1, 5, 63, 64, 200, 201, 199, 400, 1000, 250, 1000, 3000, 2999]:
+    test_factorial(cache, n)
+assert cache.hits == 1 and cache.partial_hits == 3 and cache.misses == 6, cache.stats()
+print("@ counters:", cache.stats())
+print("@ => OK")
+
+# Mêmes erreurs que math.factorial
+for n in [-1, -100, 2.0, 'a']:
+    try:
+        cache(n)
+        assert False
+    except (ValueError, TypeError) as e:
+        print("@ error found:", e)
+print("@ errors => OK")
+
+# Taille bornée: les valeurs les moins récemment utilisées sont oubliées
+cache = factorials.FactorialCache(max_bytes=4096)
+for n in range(100, 2000, 10):
+    test_factorial(cache, n)
+    assert cache.bytes <= 4096
+assert 0 < len(cache) < 190
+cache(1990)
+assert cache.hits == 1
+cache = factorials.FactorialCache(max_bytes=10)
+test_factorial(cache, 100)
+assert len(cache) == 0
+print("@ max_bytes => OK")
+
+# Utilisé par la calculatrice
+found = calc.parse(io.StringIO("200;#1!;(#1+1)!;#3/#2;" + defs.EOI))
+assert found == [200, math.factorial(200), math.factorial(201), 201], "found {0}".format(found[-1])
+print("@ calc => OK")
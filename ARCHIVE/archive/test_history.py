@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test the history backends of the calculator
+"""
+
+import io
+from math import factorial
+import definitions as defs
+import calc
+import rattrapage
+import pratt
+import push
+import history
+
+def test_history(h, values):
+    print("@ test", repr(h))
+    for v in values:
+        h.append(v)
+    assert len(h) == len(values)
+    for k in range(-len(values), len(values)):
+        assert h[k] == values[k], "found {0} vs {1} expected at {2}".format(h[k], values[k], k)
+    assert list(h) == values
+    for k in (len(values), -len(values)-1):
+        try:
+            h[k]
+            assert False
+        except IndexError:
+            pass
+    print("@ => OK")
+    print()
+
+values = [1, 2.5, -3, factorial(200), 2**100, 0.1] * 50
+test_history([], values)
+with history.DiskHistory(1) as h:
+    test_history(h, values)
+with history.DiskHistory(7) as h:
+    test_history(h, values)
+with history.DiskHistory(1000) as h:
+    test_history(h, values)
+
+# Fenêtre bornée: les anciennes valeurs ne sont plus accessibles
+h = history.RingHistory(3)
+for v in range(10):
+    h.append(v)
+assert list(h) == [7, 8, 9] and h[-1] == 9 and h[7] == 7 and h[7:] == [7, 8, 9]
+try:
+    h[6]
+    assert False
+except IndexError as e:
+    print("@ error found:", e)
+print("@ RingHistory => OK")
+print()
+
+# parse renvoie toutes les valeurs du flot, même celles déjà sorties de la fenêtre
+for Calculator in (calc.Calculator, pratt.PrattCalculator, rattrapage.Calculator, push.PushCalculator):
+    calculator = Calculator(history=history.RingHistory(2))
+    found = calculator.parse(io.StringIO("1;2;3;" + defs.EOI))
+    assert found == [1, 2, 3], "found {0}".format(found)
+    found = calculator.parse(io.StringIO("#3*2;" + defs.EOI))
+    assert found == [6] and list(calculator.history) == [3, 6], "found {0}".format(found)
+print("@ RingHistory calc => OK")
+print()
+
+# Avec les calculatrices: #n reste valable pour tout n
+calc_input = "1;" + "".join("{0}+#{1};".format(i, i-1) for i in range(2, 500)) + "#1+#250+#499;"
+expected = calc.parse(io.StringIO(calc_input + defs.EOI))
+for Calculator in (calc.Calculator, rattrapage.Calculator):
+    with history.DiskHistory(16) as h:
+        found = Calculator(history=h).parse(io.StringIO(calc_input + defs.EOI))
+        assert found == expected, "found {0}".format(found[-1])
+        assert found[-1] == 1 + 250*251//2 + 499*500//2
+print("@ DiskHistory calc => OK")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test the profiled calculators (counters and timings)
+"""
+
+import io
+import json
+import definitions as defs
+import lexer
+import calc
+import pratt
+import rattrapage
+import tree
+import instrument
+
+# (sans FACT: rattrapage.py ne calcule pas la factorielle d'un flottant)
+calc_input = "1+2*3;-#1/2;2^3;(4-1)*5;"
+expected = calc.parse(io.StringIO(calc_input + defs.EOI))
+
+# Mêmes valeurs que sans mesures, et mêmes tokens pour tous les moteurs
+for engine in ('calc', 'pratt', 'rattrapage'):
+    print("@ test", engine)
+    result, stats = instrument.parse(io.StringIO(calc_input + defs.EOI), engine)
+    assert result == expected, "found {0}".format(result)
+    assert stats.parses == 1
+    assert stats.chars == len(calc_input + defs.EOI), "found {0}".format(stats.chars)
+    assert dict(stats.tokens) == {'NUM': 9, 'ADD': 1, 'SUB': 2, 'MUL': 2, 'DIV': 1, 'POW': 1,
+                                  'OPAR': 1, 'CPAR': 1, 'CALC': 1, 'SEQ': 4, 'END': 1}, \
+        "found {0}".format(stats.tokens)
+    # le premier token est lu par init_parser, les autres par next_token
+    assert stats.lexer[0] == sum(stats.tokens.values()) - 1
+    operators = {name: count for name, (count, seconds) in stats.operators.items()}
+    assert operators == {'ADD': 1, 'SUB': 1, 'MUL': 2, 'DIV': 1, 'POW': 1, 'NEG': 1}, \
+        "found {0}".format(operators)
+    assert all(seconds >= 0 for count, seconds in stats.productions.values())
+    print(stats.report())
+    print("@ => OK")
+    print()
+
+# Productions de la grammaire LL(1) de calc.py
+result, stats = instrument.parse(io.StringIO("(1+2)*3;" + defs.EOI))
+calls = {name: count for name, (count, seconds) in stats.productions.items()}
+assert calls == {'init_parser': 1, 'input': 1, 'exp5': 2, 'Z': 3, 'exp5_bis': 1, 'exp4': 3, 'Y': 4,
+                 'exp4_bis': 1, 'exp3': 4, 'exp2': 4, 'exp2_bis': 4, 'exp1': 4, 'exp1_bis': 4,
+                 'exp0': 4}, "found {0}".format(calls)
+print("@ productions => OK")
+
+# Un Stats partagé, des tokens déjà lus, iter_parse et les arbres
+stats = instrument.Stats()
+Calculator = instrument.profiled(calc.Calculator)
+assert instrument.profiled(calc.Calculator) is Calculator
+Calculator(stats=stats).parse(io.StringIO("1+2;" + defs.EOI))
+Calculator(stats=stats).parse(lexer.tokenize_all(io.StringIO("3*4;" + defs.EOI)))
+values = list(Calculator(stats=stats).iter_parse(io.StringIO("5;6;" + defs.EOI)))
+assert values == [(1, 5.0), (2, 6.0)]
+assert stats.parses == 3 and stats.tokens['SEQ'] == 4 and stats.tokens['NUM'] == 6
+assert stats.chars == len("1+2;" + defs.EOI) + len("5;6;" + defs.EOI)  # tokens déjà lus: 0
+program, stats = instrument.parse(io.StringIO("1+2*-3!;" + defs.EOI), 'tree')
+assert repr(program) == repr(tree.parse(io.StringIO("1+2*-3!;" + defs.EOI)))
+assert set(stats.operators) == {'ADD', 'MUL', 'NEG', 'FACT'}
+print("@ shared stats => OK")
+
+# Les erreurs sont levées comme sans mesures, et ce qui a été lu est compté
+stats = instrument.Stats()
+try:
+    instrument.profiled(pratt.PrattCalculator)(stats=stats).parse(io.StringIO("1+;" + defs.EOI))
+    assert False
+except calc.ParserError as e:
+    print("@ error found:", e)
+assert stats.parses == 1 and stats.tokens['ADD'] == 1
+assert len(stats._nested) == 1  # toutes les mesures commencées sont finies
+print("@ errors => OK")
+
+# Export et import
+data = json.loads(stats.to_json())
+assert data['tokens'] == {'NUM': 1, 'ADD': 1, 'SEQ': 1}
+copy = instrument.Stats.from_dict(data)
+assert copy.to_dict() == stats.to_dict()
+assert copy.merge(stats).tokens['ADD'] == 2
+print("@ json => OK")
+
+# Les calculatrices d'origine ne sont pas modifiées
+for cls in (calc.Calculator, pratt.PrattCalculator, rattrapage.Calculator, tree.TreeBuilder):
+    assert not hasattr(cls(), 'stats')
+    assert not hasattr(cls.parse_exp5, '__wrapped__')
+    assert instrument.profiled(cls).__mro__[1] is cls
+print("@ plain calculators => OK")
@@ -196,8 +196,14 @@ def exec_test_INT():
                        ("0a0", None),
                        ("1a0", None)])
 
-def exec_test_NUM():
-    test_all_ok("lexer.read_NUM",
+# Valeur du prochain token si c'est un nombre, None sinon:
+# les tests de read_NUM s'appliquent ainsi à next_token
+def next_token_NUM():
+    token, value = lexer.next_token()
+    return value if token == defs.V_T.NUM else None
+
+def exec_test_NUM(function_to_test="lexer.read_NUM"):
+    test_all_ok(function_to_test,
                 ["1234567890098700", "203", "0000",
                  "0", "1","2","3","4","5","6","7","8","9",
                  "4.", "5.4", ".5", "0123.", ".123", "678.876",
@@ -208,7 +214,7 @@ def exec_test_NUM():
                  "5e-5","6e7","7e8","8E+9","9e-1", "4.e+43", "5.4E-67",
                  ".5e0", ".3e5", "0123.e-0", ".123E+0", "678.876E-0", "0.e+124",
                  "000.000E+12", ".0e-98500"])
-    test_all_w_result("lexer.read_NUM",
+    test_all_w_result(function_to_test,
                       [("1ee5", 1),
                        ("1e-", 1),
                        ("2.E+", 2.),
@@ -261,11 +267,135 @@ def exec_test_next_token():
          ])
     ])
 
+# Deux lexers indépendants, utilisés en alternance
+def exec_test_two_lexers():
+    print("@---- ", "lexer.make_lexer")
+    lex1 = lexer.make_lexer(io.StringIO("1 + 2.5" + defs.EOI))
+    lex2 = lexer.make_lexer(io.StringIO("#3 * (4)" + defs.EOI))
+    found = []
+    for _ in range(6):
+        found.append(lex1.next_token())
+        found.append(lex2.next_token())
+    expected = [(defs.V_T.NUM, 1), (defs.V_T.CALC, 3),
+                (defs.V_T.ADD, None), (defs.V_T.MUL, None),
+                (defs.V_T.NUM, 2.5), (defs.V_T.OPAR, None),
+                (defs.V_T.END, None), (defs.V_T.NUM, 4),
+                (defs.V_T.END, None), (defs.V_T.CPAR, None),
+                (defs.V_T.END, None), (defs.V_T.END, None)]
+    test("@ two lexers", found == expected, "found " + repr(found))
+    print()
+
+# Lexèmes lus à cheval sur plusieurs blocs de l'entrée
+def exec_test_block_sizes():
+    print("@---- ", "lexer.make_lexer block_size")
+    text = "123456789.123456789e-12 + #12345 * 0.000001 / 98765432109876543210;" + defs.EOI
+    def tokens(block_size):
+        lx = lexer.make_lexer(io.StringIO(text), block_size=block_size)
+        found = [lx.next_token()]
+        while found[-1][0] != defs.V_T.END:
+            found.append(lx.next_token())
+        return found
+    expected = tokens(None)
+    test("@ NUM value", expected[0][1] == 123456789.123456789e-12, "found " + repr(expected[0]))
+    for block_size in [1, 2, 3, 5, 7]:
+        found = tokens(block_size)
+        test("@ block_size " + str(block_size), found == expected, "found " + repr(found))
+    print()
+
+# Tous les tokens lus d'un coup: mêmes tokens, positions et erreurs que next_token
+def exec_test_tokenize_all():
+    print("@---- ", "lexer.tokenize_all")
+    for text in ["1 + 2^3! / (4*5-6) ;#12  3.5e-1", "   1e+ 2", "#1 #", "1 +a", ".e5", ""]:
+        lx = lexer.make_lexer(io.StringIO(text + defs.EOI))
+        expected = []
+        try:
+            while True:
+                expected.append(lx.next_token())
+                if expected[-1][0] == defs.V_T.END:
+                    break
+            error = None
+        except lexer.LexerError as e:
+            error = str(e)
+        tokens = lexer.tokenize_all(io.StringIO(text + defs.EOI))
+        test("@ tokens of " + repr(text), list(tokens) == expected, "found " + repr(list(tokens)))
+        test("@ error of " + repr(text), str(tokens.error or '') == (error or ''), "found " + repr(tokens.error))
+        reader = tokens.reader()
+        found = [reader.next_token() for _ in expected]
+        test("@ reader on " + repr(text), found == expected, "found " + repr(found))
+    tokens = lexer.tokenize_all(io.StringIO("1 +  #2\t*(3" + defs.EOI))
+    test("@ offsets", list(tokens.offsets) == [0, 2, 5, 8, 9, 10, 11], "found " + repr(list(tokens.offsets)))
+    print()
+
+# Lexer sur des octets: mêmes tokens et mêmes erreurs que sur le texte décodé
+def exec_test_bytes():
+    print("@---- ", "lexer.BytesLexer")
+    for text in ["1 + 2^3! / (4*5-6) ;#12  3.5e-1", "   1e+ 2", "#1 #", "1 +a", ".e5", "1 + é", ""]:
+        expected = list(lexer.tokenize_all(io.StringIO(text + defs.EOI)))
+        error = lexer.tokenize_all(io.StringIO(text + defs.EOI)).error
+        for block_size in [None, 1, 2]:
+            tokens = lexer.tokenize_all((text + defs.EOI + "a").encode(), block_size=block_size)
+            test("@ bytes " + repr(text), list(tokens) == expected, "found " + repr(list(tokens)))
+            test("@ bytes error " + repr(text), str(tokens.error) == str(error), "found " + repr(tokens.error))
+    print()
+
+# Tous les tokens et l'erreur éventuelle d'un lexer alimenté par les morceaux chunks
+def push_all(chunks):
+    push = lexer.make_push_lexer()
+    tokens = []
+    try:
+        for chunk in chunks:
+            tokens += push.feed(chunk)
+        tokens += push.close()
+    except lexer.LexerError as e:
+        return tokens, e
+    return tokens, None
+
+# Lexer alimenté par morceaux: mêmes tokens et mêmes erreurs que sur le flot entier,
+# quel que soit le découpage de l'entrée (y compris au milieu d'un token)
+def exec_test_push():
+    print("@---- ", "lexer.PushLexer")
+    for text in ["1 + 2^3! / (4*5-6) ;#12  3.5e-1" + defs.EOI, "12.5e-3;" + defs.EOI + "a", "   1e+ 2" + defs.EOI,
+                 "#1 #" + defs.EOI, "1 +a" + defs.EOI, ".e5" + defs.EOI, "1 + é" + defs.EOI, "1+2", "1 + 2 ", ""]:
+        try:
+            tokens = lexer.tokenize_all(io.StringIO(text))
+            expected = list(tokens), str(tokens.error)
+        except lexer.LexerError as e:  # erreur dès la création du lexer (entrée vide)
+            expected = [], str(e)
+        splits = [[text[:i], text[i:]] for i in range(len(text) + 1)]
+        splits += [list(text), [text[i:i+3] for i in range(0, len(text), 3)]]
+        for chunks in splits:
+            found, error = push_all(chunks)
+            test("@ push " + repr(chunks), (found, str(error)) == expected, "found " + repr((found, error)))
+    push = lexer.make_push_lexer()
+    test("@ push '12.5e'", push.feed("1 + 12.5e") == [(defs.V_T.NUM, 1.0), (defs.V_T.ADD, None)]
+         and push.peek_char3() == "12.", "found " + repr(push.peek_char3()))
+    found = push.feed("-3;  ")
+    test("@ push '-3;  '", found == [(defs.V_T.NUM, 12.5e-3)], "found " + repr(found))
+    found = push.feed(defs.EOI + "1")
+    test("@ push EOI", found == [(defs.V_T.SEQ, None), (defs.V_T.END, None)] and push.finished, "found " + repr(found))
+    # caractère par caractère, de longs séparateurs et un long nombre
+    # (le temps de lecture est mesuré par bench.py --engines)
+    text = " " * 20000 + "1" * 20000 + ";" + defs.EOI
+    found, error = push_all(text)
+    expected = list(lexer.tokenize_all(io.StringIO(text)))
+    test("@ push one char at a time", (found, error) == (expected, None), "found " + repr((found[-3:], error)))
+    print()
+
 # Si ce fichier est lancé directement, on exécute les tests
+# (une fois pour chaque lexer de lexer.LEXERS, qui doivent tous passer les mêmes tests)
 if __name__ == '__main__':
-    exec_test_INT_to_EOI()
-    exec_test_FLOAT_to_EOI()
-    exec_test_INT()
-    #exec_test_NUM()
-    exec_test_next_token()
+    for kind in lexer.LEXERS:
+        print("@======", "lexer", repr(kind))
+        lexer.KIND = kind
+        exec_test_INT_to_EOI()
+        exec_test_FLOAT_to_EOI()
+        exec_test_INT()
+        exec_test_NUM()
+        exec_test_NUM("next_token_NUM")
+        exec_test_next_token()
+        exec_test_two_lexers()
+        exec_test_block_sizes()
+        exec_test_tokenize_all()
+        exec_test_bytes()
+        exec_test_push()
     print("\n@ all tests OK !")
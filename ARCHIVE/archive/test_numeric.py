@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test the numeric backends of the calculator (float, Decimal, Fraction)
+"""
+
+import io
+import decimal
+from decimal import Decimal
+from fractions import Fraction
+import definitions as defs
+import calc
+import pratt
+import tree
+import parallel
+import rattrapage
+import numeric
+
+def parsers(backend):
+    return [
+        ('calc', lambda stream: calc.parse(stream, backend=backend)),
+        ('pratt', lambda stream: pratt.parse(stream, backend=backend)),
+        ('rattrapage', lambda stream: rattrapage.parse(stream, backend=backend)),
+        ('tree', lambda stream: tree.evaluate_program(tree.parse(stream, backend), backend=backend)),
+        ('parallel', lambda stream: parallel.parse(stream, 2, backend=backend)),
+    ]
+
+def test_result(backend, calc_input, expected):
+    for name, parse in parsers(backend):
+        print("@ test {0} ({1}) on input:".format(name, backend), repr(calc_input))
+        found = parse(io.StringIO(calc_input + defs.EOI))
+        assert found == expected, "found {0} vs {1} expected".format(found, expected)
+        assert [type(v) for v in found] == [type(v) for v in expected], "found types {0}".format(found)
+        print("@ => OK")
+    print()
+
+# Conversion du lexème en une fois, correctement arrondie
+test_result('float', "1.23;0.1;1e-300;2.5e+3;.5;7.;", [1.23, 0.1, 1e-300, 2500.0, 0.5, 7.0])
+test_result('float', "123456789.123456789;", [float("123456789.123456789")])
+test_result('float', "1e+;", [1.0])
+
+# Décimaux
+test_result('decimal', "0.1+0.2;1.10*3;2^10;", [Decimal('0.3'), Decimal('3.30'), Decimal('1024')])
+test_result('decimal', "1/3;", [Decimal(1) / Decimal(3)])
+test_result(numeric.DecimalBackend(decimal.Context(prec=5)), "1/3;#1*3;", [Decimal('0.33333'), Decimal('0.99999')])
+
+# Rationnels exacts
+test_result('fraction', "0.1+0.2;1/3+1/6;2^(-2);", [Fraction(3, 10), Fraction(1, 2), Fraction(1, 4)])
+test_result('fraction', "1/3;#1*3;(#1+#2)^2;", [Fraction(1, 3), Fraction(1), Fraction(16, 9)])
+test_result('fraction', "4^0.5;", [2.0])
+
+# Le contexte decimal de l'appelant n'est pas modifié
+ctx = decimal.getcontext().prec
+found = list(calc.iter_parse(io.StringIO("1/3;2/3;" + defs.EOI), backend=numeric.DecimalBackend(decimal.Context(prec=3))))
+assert found == [(1, Decimal('0.333')), (2, Decimal('0.667'))], "found {0}".format(found)
+assert decimal.getcontext().prec == ctx
+print("@ context => OK")
+
+try:
+    numeric.backend('complex')
+    assert False
+except ValueError as e:
+    print("@ error found:", e)
+
+# Puissances exactes de rationnels: mêmes limites et mêmes modes que pour les entiers,
+# que la base soit une fraction ou un entier (n!, #n)
+import power
+# (sauf rattrapage.py, qui ne calcule pas la factorielle d'une fraction)
+fraction_parsers = [(name, parse) for name, parse in parsers('fraction') if name != 'rattrapage']
+for name, parse in fraction_parsers:
+    found = parse(io.StringIO("(3!)^2;(3!)^(-2);(1/2)^(3!);" + defs.EOI))
+    assert found == [36, Fraction(1, 36), Fraction(1, 64)], "found {0}".format(found)
+    assert [type(v) for v in found] == [int, Fraction, Fraction], "found types {0}".format(found)
+for calc_input in ["(3!)^999999999;", "(1/3)^999999999;", "(1/3)^(-999999999);", "1;(#1*2)^999999999;"]:
+    for name, parse in fraction_parsers:
+        try:
+            parse(io.StringIO(calc_input + defs.EOI))
+            assert False, name + " accepted " + repr(calc_input)
+        except power.PowerLimitError as e:
+            error = e
+    print("@ error found:", error)
+power.configure(mode=power.FLOAT)
+try:
+    found = calc.parse(io.StringIO("(1/2)^100000000;(3!)^(-100000000);" + defs.EOI), backend='fraction')
+    assert found == [0.0, 0.0], "found {0}".format(found)
+finally:
+    power.configure(mode=power.EXACT)
+print("@ fraction powers => OK")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test the constant folding and the dependency analysis
+"""
+
+import io
+import definitions as defs
+import tree
+import optimize
+
+def program(calc_input):
+    return tree.parse(io.StringIO(calc_input + defs.EOI))
+
+def test_fold(calc_input, expected):
+    print("@ test fold on input:", repr(calc_input))
+    folded, _ = optimize.optimize(program(calc_input))
+    found = repr(folded)
+    assert found == expected, "found {0} vs {1} expected".format(found, expected)
+    print("@ => OK")
+    print()
+
+def test_analysis(calc_input, deps, levels, components):
+    print("@ test analysis on input:", repr(calc_input))
+    analysis = optimize.Analysis(program(calc_input))
+    assert analysis.deps == deps, "found deps {0}".format(analysis.deps)
+    assert analysis.levels == levels, "found levels {0}".format(analysis.levels)
+    assert analysis.components == components, "found components {0}".format(analysis.components)
+    print("@ => OK")
+    print()
+
+
+# Propagation des constantes
+test_fold("(2^10)*(3!);", "[Num(6144.0)]")
+test_fold("1;#1*(2+3)-4;", "[Num(1.0), BinOp(SUB, BinOp(MUL, Ref(1), Num(5.0)), Num(4.0))]")
+test_fold("1;-(#0);2^(-1);", "[Num(1.0), Neg(Ref(1)), Num(0.5)]")
+test_fold("1/0 + 1;", "[BinOp(ADD, BinOp(DIV, Num(1.0), Num(0.0)), Num(1.0))]")
+test_fold("(-1)!;", "[Fact(Num(-1.0))]")
+
+# Les valeurs ne changent pas
+calc_input = "1;2;#1+#2*(3!);#0^2;(1+2)*(3+4)-#3;"
+folded, _ = optimize.optimize(program(calc_input))
+assert tree.evaluate_program(folded) == tree.evaluate_program(program(calc_input))
+
+# Dépendances
+test_analysis("1;2;#1+#2;5;#4*2;#0+1;",
+              {1: set(), 2: set(), 3: {1, 2}, 4: set(), 5: {4}, 6: {5}},
+              [[1, 2, 4], [3, 5], [6]],
+              [[1, 2, 3], [4, 5, 6]])
+test_analysis("1;#1;#1;#1;", {1: set(), 2: {1}, 3: {1}, 4: {1}}, [[1], [2, 3, 4]], [[1, 2, 3, 4]])
+test_analysis("#1;", {1: set()}, [[1]], [[1]])
+assert optimize.Analysis(program("#1;1;#3;")).invalid == [1, 3]
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test the calculator in infix syntax, with parallel evaluation (parallel.py)
+"""
+
+import io
+import definitions as defs
+from calc import ParserError
+from math import factorial
+import calc
+import parallel
+
+PARSER_NAME = 'parallel'
+
+def parse(stream):
+    return calc.parse(stream, parallel=2)
+
+PARSER_UNDER_TEST = parse
+
+#################################
+## Fonctions génériques de test
+
+def run(string):
+    stream = io.StringIO(string)
+    try:
+        return PARSER_UNDER_TEST(io.StringIO(string+defs.EOI))
+    except Exception as e:
+        stream.close()
+        raise e
+
+def test_result(calc_input, expected):
+    print("@ test {0} on input:".format(PARSER_NAME), repr(calc_input))
+    print("@ result expected:", repr(expected))
+    found = run(calc_input)
+    assert found == expected, "found {0} vs {1} expected".format(found, expected)
+    print("@ => OK")
+    print()
+
+def test_parsing_error(calc_input):
+    print("@ test {0} on input:".format(PARSER_NAME), repr(calc_input))
+    print("@ parsing error expected")
+    try:
+        result=run(calc_input)
+        print("@ unexpected result:", result)
+        assert False
+    except ParserError as e:
+        print("@ parsing error found:", e)
+        pass
+    print("@ => OK")
+    print()
+
+
+#################################
+## Fonctions génériques de test
+
+# Exemples basiques
+test_result("  \n \n  ",[])
+test_result("7;",[7])
+test_result("123+321;",[444])
+test_result("1-2;",[-1])
+test_result("12*3;",[36])
+test_result("12/3;",[4])
+test_result("12^3;",[1728])
+test_result("5!;",[120])
+
+test_result("3 * 4 + 1 - 3 ; #1 * (#1 / 2) ;", [10, 50])
+test_result("1 + 2 * 3 ; -4 + #1 * #1 ;", [7, 45])
+test_result("2*3 + 1 ; #1 * #1 - 4 ;", [7, 45])
+test_result("1 - 1 - 1 ; 1 - (1 - 1) ;", [-1, 1])
+test_result("1 - - 1 - 1 ; 1 - (-1 - 1) ; 1 - -(1 - 1) ;", [1, 3, 1])
+test_result("60 / 10 / 2 ; 60 / (10 / 2) ;", [3, 12])
+test_result("- ((1 + 2) * - ((3 - 5))) ; ", [-6])
+test_result("2^1^3^2;",[2])
+test_result("(2^1)^3^2;",[512])
+
+# Tests autour de n*(n+1)/2
+N1 = 20
+test_result("1;" + "".join(["{0}+#{1};".format(i,i-1) for i in range(2,N1)]),
+            [i * (i+1)//2 for i in range(1,N1)])
+
+r = [i for i in range(1,N1)]
+r.append((N1-1)*N1//2)
+l = [str(i)+";" for i in range(1,N1)]
+for i in range(1, N1-1):
+    l.append("#{0}+".format(i))
+l.append("#{0};".format(N1-1))
+test_result("".join(l), r)
+
+# Un grand nombre de calculs ne doit pas dépasser la limite de récursion
+N2 = 5000
+test_result("1;" + "".join(["{0}+#{1};".format(i,i-1) for i in range(2,N2)]),
+            [i * (i+1)//2 for i in range(1,N2)])
+
+# Tests de k parmi n
+k_parmi_n="#2-#1;#1!;#2!;#3!;#5/#4/#6;"
+test_result("1;2;"+k_parmi_n, [1, 2, 1, 1, 2, 1, 2])
+test_result("1;3;"+k_parmi_n, [1, 3, 2, 1, 6, 2, 3])
+test_result("2;3;"+k_parmi_n, [2, 3, 1, 2, 6, 1, 3])
+test_result("1;4;"+k_parmi_n, [1, 4, 3, 1, 24, 6, 4])
+test_result("2;4;"+k_parmi_n, [2, 4, 2, 2, 24, 2, 6])
+test_result("3;6;"+k_parmi_n, [3, 6, 3, 6, 720, 6, 20])
+
+# Tests avec erreurs
+test_parsing_error(";")
+test_parsing_error("123+321")
+test_parsing_error("123+321; 1")
+test_parsing_error("3 * 4 + 1 - 3 ; #1 (#1 / 2) ;")
+test_parsing_error("3 * / 1 - 3 ; #1 * (#1 / 2) ;")
+test_parsing_error("3 * 4 + 1 - 3 #1 * (#1 / 2) ;")
+test_parsing_error("(1 2 ;")
+test_parsing_error("- ((1 + 2 * - ((3 - 5))) ; ")
+test_parsing_error("- (1 + 2)) * - ((3 - 5)) ; ")
+test_parsing_error("!5;")
+test_parsing_error("5! / ;")
+
+# Composantes indépendantes: résultats dans l'ordre de l'historique
+test_result("".join("{0};#{1}*2;".format(i, 2*i-1) for i in range(1, 20)),
+            [v for i in range(1, 20) for v in (i, 2*i)])
+test_result("300!;400!;#1/#1;2^1000;#2/#2;", [factorial(300), factorial(400), 1, 2**1000, 1])
+
+# L'erreur levée est celle du premier calcul qui échoue, comme avec calc.py
+def test_evaluation_error(calc_input, expected):
+    print("@ test {0} on input:".format(PARSER_NAME), repr(calc_input))
+    print("@ error expected:", expected.__name__)
+    try:
+        result = run(calc_input)
+        print("@ unexpected result:", result)
+        assert False
+    except expected as e:
+        print("@ error found:", repr(e))
+    print("@ => OK")
+    print()
+
+test_evaluation_error("1;2;#2/0;(-1)!;#1;", ZeroDivisionError)
+test_evaluation_error("1;2;(0-1)!;#1/0;", ValueError)
+test_evaluation_error("1;2;#5;", IndexError)
+
+# Un pool déjà créé peut servir à plusieurs programmes
+from concurrent.futures import ProcessPoolExecutor
+with ProcessPoolExecutor(max_workers=2) as pool:
+    for i in range(1, 5):
+        found = parallel.parse(io.StringIO("{0};{0}!;#1*#2;".format(i) + defs.EOI), 2, pool)
+        assert found == [i, factorial(i), i*factorial(i)], "found {0}".format(found)
+print("@ executor => OK")
+
+# Les calculs coûteux sont faits par les processus du pool, pas par ce processus
+# (ni à la propagation des constantes, ni à l'évaluation)
+import time
+import factorials
+factorials.CACHE.clear()
+start = time.process_time()
+factorials.factorial(150000)
+reference = time.process_time() - start
+with ProcessPoolExecutor(max_workers=2) as pool:
+    parallel.parse(io.StringIO("1;2;" + defs.EOI), 2, pool)  # démarrage des processus
+    factorials.CACHE.clear()
+    start = time.process_time()
+    found = parallel.parse(io.StringIO("150000!;150001!;150002!;150003!;" + defs.EOI), 2, pool)
+    spent = time.process_time() - start
+assert found[0] == factorials.factorial(150000)
+assert spent < reference / 2, "this process spent {0:.3f} s vs {1:.3f} s for one factorial".format(spent, reference)
+print("@ heavy work in the pool => OK")
+
+# Une erreur n'attend pas les calculs des autres composantes: l'executor ci-dessous garde
+# la tâche du calcul 2 sans la lancer, et ne la termine qu'à release (au plus tard après
+# 60 s, pour ne pas bloquer le test si elle était attendue)
+import pickle
+import threading
+from concurrent.futures import Executor, Future
+
+class HoldingExecutor(Executor):
+
+    def __init__(self, held):
+        self.held = held
+        self.waiting = []
+        self.released = False
+
+    def submit(self, fn, data):
+        future = Future()
+        task, backend = pickle.loads(data)
+        if any(n in self.held for n, ast in task):
+            self.waiting.append((future, fn, data))
+        else:
+            future.set_result(fn(data))
+        return future
+
+    def release(self):
+        self.released = True
+        for future, fn, data in self.waiting:
+            future.set_result(fn(data))
+
+executor = HoldingExecutor({2})
+timer = threading.Timer(60, executor.release)
+timer.start()
+try:
+    parallel.parse(io.StringIO("1/0;3!;" + defs.EOI), 2, executor)
+    assert False
+except ZeroDivisionError as e:
+    print("@ error found:", repr(e))
+    assert executor.waiting and not executor.released, "the error waited for the other task"
+finally:
+    timer.cancel()
+print("@ early error => OK")
@@ -80,6 +80,11 @@ for i in range(1, N1-1):
 l.append("#{0};".format(N1-1))
 test_result("".join(l), r)
 
+# Un grand nombre de calculs ne doit pas dépasser la limite de récursion
+N2 = 5000
+test_result("1;" + "".join(["{0}+#{1};".format(i,i-1) for i in range(2,N2)]),
+            None)
+
 # Tests de k parmi n
 k_parmi_n="#2-#1;#1!;#2!;#3!;#5/#4/#6;"
 test_result("1;2;"+k_parmi_n, [1, 2, 1, 1, 2, 1, 2])
@@ -101,3 +106,15 @@ test_parsing_error("- ((1 + 2 * - ((3 - 5))) ; ")
 test_parsing_error("- (1 + 2)) * - ((3 - 5)) ; ")
 test_parsing_error("!5;")
 test_parsing_error("5! / ;")
+
+# Tokens lus d'avance et octets, comme pour calc.py
+import lexer
+calc_input = "1;2;" + k_parmi_n + "(#1 + 2.5e1) * -3;"
+assert PARSER_UNDER_TEST(lexer.tokenize_all(io.StringIO(calc_input + defs.EOI))) is None
+assert PARSER_UNDER_TEST((calc_input + defs.EOI).encode()) is None
+try:
+    PARSER_UNDER_TEST(lexer.tokenize_all(io.StringIO("1;2;(3 4;" + defs.EOI)))
+    assert False
+except ParserError as e:
+    print("@ parsing error found:", e)
+print("@ tokenize_all => OK")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test the guarded power of the calculator
+"""
+
+import io
+import math
+import time
+import definitions as defs
+import calc
+import power
+
+def run(calc_input):
+    return calc.parse(io.StringIO(calc_input + defs.EOI))
+
+def test_limit(guard, base, exp):
+    print("@ test limit on:", base, "^", exp)
+    start = time.perf_counter()
+    try:
+        result = guard(base, exp)
+        print("@ unexpected result:", result)
+        assert False
+    except power.PowerLimitError as e:
+        print("@ error found:", e)
+    assert time.perf_counter() - start < 1
+    print("@ => OK")
+    print()
+
+# Résultats exacts sous les limites
+guard = power.Power()
+for base, exp in [(2, 10), (3, 1000), (-7, 33), (2, -2), (0, 5), (1, 10**30), (-1, 10**30+1), (2.5, 3), (2, 0.5)]:
+    assert guard(base, exp) == base**exp, "wrong value for {0}^{1}".format(base, exp)
+
+# Limites en bits et en temps estimé
+test_limit(guard, 24, 24**6)
+test_limit(guard, math.factorial(100), 10**9)
+test_limit(guard, 9, math.factorial(24))
+test_limit(guard, 2, math.factorial(200))
+test_limit(power.Power(max_bits=1000), 3, 1000)
+test_limit(power.Power(max_seconds=1e-9), 3, 10**6)
+test_limit(power.Power(max_bits=100, mode=power.FLOAT), 3, 10**6)
+
+# Repli sur les flottants et sur les LogNumber
+assert power.Power(max_bits=100, mode=power.FLOAT)(3, 100) == 3.0**100
+log = power.Power(mode=power.LOG)
+x = log(9.0, 9.0**9)
+assert isinstance(x, power.LogNumber) and x.sign == 1
+assert abs(x.log10 - 9**9 * math.log10(9)) < 1e-6
+assert x / x == 1.0 and x - x == 0.0 and (x * 2) / 2 == x
+assert (-x).sign == -1 and log(-x, 3).sign == -1 and log(-x, 2).sign == 1
+assert log(x, -1).log10 == -x.log10
+y = log(math.factorial(1000), 10**6)
+assert abs(y.log10 - 10**6 * math.log10(math.factorial(1000))) < 1e-3
+print("@ modes => OK")
+
+# Dans la calculatrice
+assert run("2^10;(3!)^(3!);") == [1024, 6**6]
+try:
+    run("(4!)^((4!)!);")
+    assert False
+except power.PowerLimitError as e:
+    print("@ error found:", e)
+try:
+    run("9^9^9;")
+    assert False
+except OverflowError as e:
+    print("@ error found:", e)
+power.configure(mode=power.LOG)
+try:
+    found = run("9^9^9;#1/#1;")
+finally:
+    power.configure(mode=power.EXACT)
+assert isinstance(found[0], power.LogNumber) and found[1] == 1.0, "found {0}".format(found)
+print("@ calc => OK")
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test the calculator in infix syntax (push parser with an explicit stack)
+"""
+
+import io
+import definitions as defs
+from push import parse, ParserError
+
+PARSER_NAME = 'push'
+PARSER_UNDER_TEST = parse
+
+#################################
+## Fonctions génériques de test
+
+def run(string):
+    stream = io.StringIO(string)
+    try:
+        return PARSER_UNDER_TEST(io.StringIO(string+defs.EOI))
+    except Exception as e:
+        stream.close()
+        raise e
+
+def test_result(calc_input, expected):
+    print("@ test {0} on input:".format(PARSER_NAME), repr(calc_input))
+    print("@ result expected:", repr(expected))
+    found = run(calc_input)
+    assert found == expected, "found {0} vs {1} expected".format(found, expected)
+    print("@ => OK")
+    print()
+
+def test_parsing_error(calc_input):
+    print("@ test {0} on input:".format(PARSER_NAME), repr(calc_input))
+    print("@ parsing error expected")
+    try:
+        result=run(calc_input)
+        print("@ unexpected result:", result)
+        assert False
+    except ParserError as e:
+        print("@ parsing error found:", e)
+        pass
+    print("@ => OK")
+    print()
+
+
+#################################
+## Fonctions génériques de test
+
+# Exemples basiques
+test_result("  \n \n  ",[])
+test_result("7;",[7])
+test_result("123+321;",[444])
+test_result("1-2;",[-1])
+test_result("12*3;",[36])
+test_result("12/3;",[4])
+test_result("12^3;",[1728])
+test_result("5!;",[120])
+
+test_result("3 * 4 + 1 - 3 ; #1 * (#1 / 2) ;", [10, 50])
+test_result("1 + 2 * 3 ; -4 + #1 * #1 ;", [7, 45])
+test_result("2*3 + 1 ; #1 * #1 - 4 ;", [7, 45])
+test_result("1 - 1 - 1 ; 1 - (1 - 1) ;", [-1, 1])
+test_result("1 - - 1 - 1 ; 1 - (-1 - 1) ; 1 - -(1 - 1) ;", [1, 3, 1])
+test_result("60 / 10 / 2 ; 60 / (10 / 2) ;", [3, 12])
+test_result("- ((1 + 2) * - ((3 - 5))) ; ", [-6])
+test_result("2^1^3^2;",[2])
+test_result("(2^1)^3^2;",[512])
+
+# Tests autour de n*(n+1)/2
+N1 = 20
+test_result("1;" + "".join(["{0}+#{1};".format(i,i-1) for i in range(2,N1)]),
+            [i * (i+1)//2 for i in range(1,N1)])
+
+r = [i for i in range(1,N1)]
+r.append((N1-1)*N1//2)
+l = [str(i)+";" for i in range(1,N1)]
+for i in range(1, N1-1):
+    l.append("#{0}+".format(i))
+l.append("#{0};".format(N1-1))
+test_result("".join(l), r)
+
+# Un grand nombre de calculs ne doit pas dépasser la limite de récursion
+N2 = 5000
+test_result("1;" + "".join(["{0}+#{1};".format(i,i-1) for i in range(2,N2)]),
+            [i * (i+1)//2 for i in range(1,N2)])
+
+# Tests de k parmi n
+k_parmi_n="#2-#1;#1!;#2!;#3!;#5/#4/#6;"
+test_result("1;2;"+k_parmi_n, [1, 2, 1, 1, 2, 1, 2])
+test_result("1;3;"+k_parmi_n, [1, 3, 2, 1, 6, 2, 3])
+test_result("2;3;"+k_parmi_n, [2, 3, 1, 2, 6, 1, 3])
+test_result("1;4;"+k_parmi_n, [1, 4, 3, 1, 24, 6, 4])
+test_result("2;4;"+k_parmi_n, [2, 4, 2, 2, 24, 2, 6])
+test_result("3;6;"+k_parmi_n, [3, 6, 3, 6, 720, 6, 20])
+
+# Tests avec erreurs
+test_parsing_error(";")
+test_parsing_error("123+321")
+test_parsing_error("123+321; 1")
+test_parsing_error("3 * 4 + 1 - 3 ; #1 (#1 / 2) ;")
+test_parsing_error("3 * / 1 - 3 ; #1 * (#1 / 2) ;")
+test_parsing_error("3 * 4 + 1 - 3 #1 * (#1 / 2) ;")
+test_parsing_error("(1 2 ;")
+test_parsing_error("- ((1 + 2 * - ((3 - 5))) ; ")
+test_parsing_error("- (1 + 2)) * - ((3 - 5)) ; ")
+test_parsing_error("!5;")
+test_parsing_error("5! / ;")
+
+# Calculs indépendants menés en même temps par plusieurs threads
+from concurrent.futures import ThreadPoolExecutor
+inputs = ["{0};#1*#1;#2-{0};".format(i) for i in range(1, 50)]
+with ThreadPoolExecutor(max_workers=8) as pool:
+    found = list(pool.map(run, inputs))
+assert found == [[i, i*i, i*i-i] for i in range(1, 50)], "found {0}".format(found)
+print("@ threads => OK")
+
+# Mêmes messages d'erreur que la calculatrice LL(1)
+import calc
+for calc_input in [";", "123+321", "1 2;", "(1 2 ;", "1 + * 2;", "1 * * 2;", "- * 2;", "2 ^ - 1;",
+                   "5!!;", "5!^2;", "(1;", "1);", "1; #1 (2);", "2^3 4;"]:
+    try:
+        calc.parse(io.StringIO(calc_input + defs.EOI))
+        assert False, "calc accepted " + repr(calc_input)
+    except ParserError as e:
+        expected = str(e)
+    try:
+        run(calc_input)
+        assert False, "push accepted " + repr(calc_input)
+    except ParserError as e:
+        assert str(e) == expected, "found {0} vs {1} expected".format(str(e), expected)
+print("@ error messages => OK")
+
+# Tokens lus une seule fois (lexer.tokenize_all), puis analysés plusieurs fois
+import lexer
+calc_input = "1;2;" + k_parmi_n + "(#1 + 2.5e1) * -3;"
+tokens = lexer.tokenize_all(io.StringIO(calc_input + defs.EOI))
+expected = run(calc_input)
+for _ in range(2):
+    found = PARSER_UNDER_TEST(tokens)
+    assert found == expected, "found {0} vs {1} expected".format(found, expected)
+try:
+    PARSER_UNDER_TEST(lexer.tokenize_all(io.StringIO("1;2;(3 4;" + defs.EOI)))
+    assert False
+except ParserError as e:
+    print("@ parsing error found:", e)
+try:
+    PARSER_UNDER_TEST(lexer.tokenize_all(io.StringIO("1;2;3 a;" + defs.EOI)))
+    assert False
+except lexer.LexerError as e:
+    print("@ lexer error found:", e)
+print("@ tokenize_all => OK")
+
+# Entrée découpée en morceaux quelconques: mêmes valeurs, mêmes erreurs et même ordre
+# des erreurs (lexer, analyse, calcul) que calc.py, avec les calculs faits avant l'erreur
+import push
+
+def feed_all(chunks):
+    calculator = push.PushCalculator()
+    found = []
+    try:
+        for chunk in chunks:
+            found += calculator.feed(chunk)
+        found += calculator.close()
+    except Exception as e:
+        return calculator.history, repr(e)
+    assert [value for n, value in found] == calculator.history
+    assert [n for n, value in found] == list(range(1, len(found) + 1))
+    return calculator.history, None
+
+def calc_all(text):
+    calculator = calc.Calculator()
+    try:
+        calculator.parse(io.StringIO(text))
+    except Exception as e:
+        return calculator.history, repr(e)
+    return calculator.history, None
+
+for text in ["1 + 2 * 3 ; -4 + #1 * #1 ; 12.5e-3^2;" + defs.EOI, "1;2;" + k_parmi_n + defs.EOI,
+             "1;1/0+;" + defs.EOI, "1;(1/0;" + defs.EOI, "2;1/0 a;" + defs.EOI, "3;3! a;" + defs.EOI,
+             "4;#7;" + defs.EOI, "5;2 ^ - 1;" + defs.EOI, "6;7" + defs.EOI, "7;8;", "8; 9 ;" + defs.EOI + "a"]:
+    expected = calc_all(text)
+    splits = [[text[:i], text[i:]] for i in range(len(text) + 1)] + [list(text)]
+    for chunks in splits:
+        found = feed_all(chunks)
+        assert found == expected, "found {0} vs {1} expected on {2}".format(found, expected, chunks)
+print("@ chunks => OK")
+
+# Suspension au milieu d'un calcul, reprise au morceau suivant
+calculator = push.PushCalculator()
+assert calculator.feed("1 + 2") == []
+assert calculator.feed("; 3 * ") == [(1, 3)]
+assert calculator.feed(" #1 ; 12.5e") == [(2, 9)]
+assert calculator.feed("-3 * 2;   ") == [(3, 0.025)]
+assert calculator.feed(defs.EOI + "1;") == [] and calculator.finished
+calculator.reset()
+assert calculator.feed("#3 * 4;" + defs.EOI) == [(4, 0.1)] and calculator.history[-1] == 0.1
+print("@ suspend and resume => OK")
+
+# Les parenthèses ne sont pas limitées par la pile d'appels de Python
+N3 = 100000
+calculator = push.PushCalculator()
+assert calculator.feed("(" * N3 + "1") == []
+assert calculator.feed(")" * N3 + ";" + defs.EOI) == [(1, 1)]
+print("@ deep parentheses => OK")
+
+# Plusieurs milliers de calculatrices, alimentées à tour de rôle caractère par caractère
+sessions = [push.PushCalculator() for _ in range(2000)]
+inputs = ["{0};#1*#1;#2-{0};".format(i) + defs.EOI for i in range(len(sessions))]
+for k in range(max(map(len, inputs))):
+    for calculator, text in zip(sessions, inputs):
+        calculator.feed(text[k:k+1])
+assert all(calculator.finished for calculator in sessions)
+assert [calculator.history for calculator in sessions] == [[i, i*i, i*i-i] for i in range(len(sessions))]
+print("@ sessions => OK")
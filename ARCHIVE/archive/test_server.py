@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test the asyncio calculator server (server.py)
+"""
+
+import os
+import asyncio
+import tempfile
+import server
+
+# Envoie les lignes l'une après l'autre ; renvoie les réponses lues après chacune
+async def session(address, lines, unix=False):
+    if unix:
+        reader, writer = await asyncio.open_unix_connection(address)
+    else:
+        reader, writer = await asyncio.open_connection(*address[:2])
+    answers = []
+    for line, count in lines:
+        writer.write(line.encode())
+        if not line.endswith("\n"):
+            writer.write_eof()  # la dernière ligne est analysée à la fin du flot
+        await writer.drain()
+        answers.append([(await reader.readline()).decode() for _ in range(count)])
+    writer.close()
+    await writer.wait_closed()
+    return answers
+
+# Ferme le serveur et attend la fin de ses sessions
+async def stop(calc_server):
+    calc_server.close()
+    await calc_server.server.wait_closed()
+    while calc_server.sessions:
+        await asyncio.sleep(0.01)
+
+async def test_tcp():
+    calc_server = server.CalculatorServer()
+    await calc_server.start('127.0.0.1', 0)
+    address = calc_server.addresses()[0]
+
+    print("@ test one session")
+    answers = await session(address, [("1+2;#1*3;\n", 2), ("#2-1;\n", 1), ("\n", 0), ("2^10;", 1)])
+    assert answers == [["#1 = 3.0\n", "#2 = 9.0\n"], ["#3 = 8.0\n"], [], ["#4 = 1024.0\n"]], \
+        "found {0}".format(answers)
+    print("@ => OK")
+
+    print("@ test errors")
+    answers = await session(address, [("1;2+;3;\n", 2), ("#1+1;1/0;\n", 2), ("4;   é;\n", 2), ("#3;\n", 1)])
+    assert answers[0] == ["#1 = 1.0\n", "! ParserError: Found token 'SEQ' but expected NUM, CALC, OPAR, SUB\n"], \
+        "found {0}".format(answers[0])
+    assert answers[1] == ["#2 = 2.0\n", "! ZeroDivisionError: float division by zero\n"], "found {0}".format(answers[1])
+    assert answers[2][0] == "#3 = 4.0\n" and answers[2][1].startswith("! LexerError:"), "found {0}".format(answers[2])
+    assert answers[3] == ["#4 = 4.0\n"]
+    print("@ => OK")
+
+    print("@ test concurrent sessions")
+    clients = [session(address, [("{0};#1*2;\n".format(k), 2), ("#2+#1;\n", 1)]) for k in range(200)]
+    for k, answers in enumerate(await asyncio.gather(*clients)):
+        assert answers == [["#1 = {0}\n".format(float(k)), "#2 = {0}\n".format(2.0 * k)], ["#3 = {0}\n".format(3.0 * k)]], \
+            "found {0}".format(answers)
+    print("@ => OK")
+
+    print("@ test long line")
+    small_server = server.CalculatorServer(limit=64)
+    await small_server.start('127.0.0.1', 0)
+    answers = await session(small_server.addresses()[0], [("1;" * 100 + "\n", 1)])
+    assert answers[0][0].startswith("! ValueError: line longer than 64 bytes"), "found {0}".format(answers)
+    await stop(small_server)
+    print("@ => OK")
+
+    await stop(calc_server)
+
+async def test_unix():
+    print("@ test unix socket, decimal backend, bounded history")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "calc.sock")
+        calc_server = server.CalculatorServer('rattrapage', 'decimal', keep=2)
+        await calc_server.start(path=path)
+        answers = await session(path, [("1/3;0.1+0.2;#2*3;\n", 3), ("#1;\n", 1)], unix=True)
+        assert answers == [["#1 = 0.3333333333333333333333333333\n", "#2 = 0.3\n", "#3 = 0.9\n"],
+                           ["! IndexError: #1 is no longer in the history (window of 2)\n"]], \
+            "found {0}".format(answers)
+        await stop(calc_server)
+    print("@ => OK")
+
+asyncio.run(test_tcp())
+asyncio.run(test_unix())
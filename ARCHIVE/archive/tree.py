@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Projet TL : arbres de syntaxe abstraite des calculs, et leur évaluation
+"""
+
+import sys
+assert sys.version_info >= (3, 10), "Use Python 3.10 or newer !"
+
+import pratt
+import numeric
+from factorials import factorial
+
+#####
+# Noeuds de l'arbre (avec __slots__ pour rester compacts)
+
+class Num:
+    __slots__ = ('value',)
+    def __init__(self, value):
+        self.value = value
+    def __repr__(self):
+        return "Num(" + repr(self.value) + ")"
+
+# Référence #index à un calcul précédent (token CALC)
+class Ref:
+    __slots__ = ('index',)
+    def __init__(self, index):
+        self.index = index
+    def __repr__(self):
+        return "Ref(" + repr(self.index) + ")"
+
+# SUB unaire
+class Neg:
+    __slots__ = ('operand',)
+    def __init__(self, operand):
+        self.operand = operand
+    def __repr__(self):
+        return "Neg(" + repr(self.operand) + ")"
+
+class Fact:
+    __slots__ = ('operand',)
+    def __init__(self, operand):
+        self.operand = operand
+    def __repr__(self):
+        return "Fact(" + repr(self.operand) + ")"
+
+# Opérateurs binaires: op vaut V_T.ADD, V_T.SUB, V_T.MUL, V_T.DIV ou V_T.POW
+class BinOp:
+    __slots__ = ('op', 'left', 'right')
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+    def __repr__(self):
+        return "BinOp(" + self.op.name + ", " + repr(self.left) + ", " + repr(self.right) + ")"
+
+
+#####
+# Construction de l'arbre: même analyse que pratt.PrattCalculator,
+# avec des actions sémantiques qui construisent les noeuds au lieu de calculer.
+
+class TreeBuilder(pratt.PrattCalculator):
+
+    def binary_actions(self):
+        return {tok: (lambda left, right, tok=tok: BinOp(tok, left, right))
+                for tok in pratt.BINARY_BP}
+
+    def number(self, n):
+        return Num(n)
+
+    def reference(self, L, i):
+        return Ref(i)
+
+    def negate(self, n):
+        return Neg(n)
+
+    def fact(self, n):
+        return Fact(n)
+
+
+#####
+# Évaluation
+
+OPERATORS = numeric.FLOAT.operators
+
+# Valeur de l'arbre ast, les références #i désignant history[i-1] comme dans calc.py.
+# Parcours postfixe avec une pile explicite: la profondeur de l'arbre n'est pas limitée
+# par celle de la pile d'appels (longues chaînes de + ou de *, par exemple).
+# backend donne les opérations (voir numeric.py) ; l'appelant active son contexte.
+def evaluate(ast, history, backend=None):
+    operators = OPERATORS if backend is None else backend.operators
+    values = []
+    todo = [ast]
+    while todo:
+        node = todo.pop()
+        t = type(node)
+        if t is Num:
+            values.append(node.value)
+        elif t is Ref:
+            values.append(history[node.index-1])
+        elif t is tuple:
+            # (noeud,): opération dont les opérandes sont déjà calculés
+            node = node[0]
+            t = type(node)
+            if t is BinOp:
+                right = values.pop()
+                values[-1] = operators[node.op](values[-1], right)
+            elif t is Neg:
+                values[-1] = -1 * values[-1]
+            else:
+                values[-1] = factorial(int(values[-1]))
+        elif t is BinOp:
+            todo.append((node,))
+            todo.append(node.right)
+            todo.append(node.left)
+        elif t is Neg or t is Fact:
+            todo.append((node,))
+            todo.append(node.operand)
+        else:
+            raise TypeError("Unknown node " + repr(node))
+    return values[0]
+
+# Évalue les calculs d'un programme dans l'ordre, en ajoutant leurs valeurs à l'historique ;
+# renvoie la liste de ces valeurs
+def evaluate_program(program, history=None, backend=None):
+    if history is None:
+        history = []
+    backend = numeric.backend(backend)
+    values = []
+    with backend.scope():
+        for ast in program:
+            n = evaluate(ast, history, backend)
+            history.append(n)
+            values.append(n)
+    return values
+
+
+#####################################
+## Fonction principale: renvoie la liste des arbres des calculs du flot
+
+def parse(stream=sys.stdin, backend=None):
+    return TreeBuilder(backend=backend).parse(stream)
+
+
+#####################################
+## Test depuis la ligne de commande
+
+if __name__ == "__main__":
+    print("@ Testing the calculator in infix syntax (trees).")
+    program = parse()
+    for ast in program:
+        print("@", repr(ast))
+    print("@ result = ", repr(evaluate_program(program)))